@@ -0,0 +1,33 @@
+"""Purpose of this file
+
+This file contains the management command which corrects the rating aggregates of the contents.
+"""
+
+from django.core.management.base import BaseCommand
+
+from base.models import Content
+
+
+class Command(BaseCommand):
+    """Reconcile ratings
+
+    Recomputes the rating sum and count which are stored with the contents from their
+    ratings and corrects the contents whose aggregates drifted.
+
+    :attr Command.help: The help text of the command
+    :type Command.help: str
+    """
+    help = 'Corrects the rating aggregates of the contents.'
+
+    def handle(self, *args, **options):
+        """Handle
+
+        Reconciles the rating aggregates of the contents.
+
+        :param args: The arguments
+        :type args: Any
+        :param options: The options of the command
+        :type options: dict[str, Any]
+        """
+        count = Content.reconcile_ratings()
+        self.stdout.write(f'Corrected the rating aggregates of {count} contents.')
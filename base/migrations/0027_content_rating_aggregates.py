@@ -0,0 +1,33 @@
+# Generated by Django 3.2.20 on 2026-10-18 18:43
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+class Migration(migrations.Migration):
+
+    def fill_rating_aggregates(apps, schema_editor):
+        Content = apps.get_model("base", "Content")
+        Rating = apps.get_model("base", "Rating")
+        for aggregate in Rating.objects.values('content_id') \
+                .annotate(total=Sum('rating'), count=Count('pk')):
+            Content.objects.filter(pk=aggregate['content_id']) \
+                .update(rating_sum=aggregate['total'], rating_count=aggregate['count'])
+
+    dependencies = [
+        ('base', '0026_auto_20240305_0948'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='content',
+            name='rating_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Rating count'),
+        ),
+        migrations.AddField(
+            model_name='content',
+            name='rating_sum',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Rating sum'),
+        ),
+        migrations.RunPython(fill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 3.2.20 on 2026-10-18 18:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    def index_to_positions(apps, schema_editor):
+        CourseStructureEntry = apps.get_model("base", "CourseStructureEntry")
+        for entry in CourseStructureEntry.objects.all():
+            position, _separator, sub_position = entry.index.partition('/')
+            entry.position = int(position)
+            entry.sub_position = int(sub_position or 0)
+            entry.save(update_fields=['position', 'sub_position'])
+
+    def positions_to_index(apps, schema_editor):
+        CourseStructureEntry = apps.get_model("base", "CourseStructureEntry")
+        for entry in CourseStructureEntry.objects.all():
+            entry.index = f'{entry.position}/{entry.sub_position}' if entry.sub_position \
+                else f'{entry.position}'
+            entry.save(update_fields=['index'])
+
+    dependencies = [
+        ('base', '0027_content_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coursestructureentry',
+            name='position',
+            field=models.PositiveIntegerField(default=0, verbose_name='Position'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='coursestructureentry',
+            name='sub_position',
+            field=models.PositiveIntegerField(default=0, verbose_name='Sub position'),
+        ),
+        migrations.RunPython(index_to_positions, positions_to_index),
+        # The default is only needed to restore the index when the migration is reversed
+        migrations.AlterField(
+            model_name='coursestructureentry',
+            name='index',
+            field=models.CharField(default='', max_length=50, verbose_name='Index'),
+        ),
+        migrations.RemoveField(
+            model_name='coursestructureentry',
+            name='index',
+        ),
+        migrations.AddIndex(
+            model_name='coursestructureentry',
+            index=models.Index(fields=['course', 'position', 'sub_position'],
+                               name='base_course_course__01e916_idx'),
+        ),
+    ]
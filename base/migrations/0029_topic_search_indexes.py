@@ -0,0 +1,23 @@
+# Generated by Django 3.2.20 on 2026-10-18 19:04
+
+from django.db import migrations, models
+import django.db.models.expressions
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0028_course_structure_positions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(django.db.models.functions.text.Upper('title'), name='base_topic_upper_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(django.db.models.expressions.F('category'), django.db.models.functions.text.Upper('title'), name='base_topic_cat_title_idx'),
+        ),
+    ]
@@ -0,0 +1,156 @@
+# Generated by Django 3.2.20 on 2026-10-18 19:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# The full-text index of the documents on SQLite, which is kept in sync by triggers. Note that
+# SQLite drops the triggers if a later migration remakes the table of the documents, they are
+# recreated by frontend.search.ensure_index after every migrate.
+SQLITE_INDEX = [
+    "CREATE VIRTUAL TABLE base_searchdocument_fts USING fts5("
+    "title, body, content='base_searchdocument', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER base_searchdocument_fts_insert AFTER INSERT ON base_searchdocument BEGIN "
+    "INSERT INTO base_searchdocument_fts(rowid, title, body) "
+    "VALUES (new.id, new.title, new.body); END",
+    "CREATE TRIGGER base_searchdocument_fts_delete AFTER DELETE ON base_searchdocument BEGIN "
+    "INSERT INTO base_searchdocument_fts(base_searchdocument_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); END",
+    "CREATE TRIGGER base_searchdocument_fts_update AFTER UPDATE ON base_searchdocument BEGIN "
+    "INSERT INTO base_searchdocument_fts(base_searchdocument_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); "
+    "INSERT INTO base_searchdocument_fts(rowid, title, body) "
+    "VALUES (new.id, new.title, new.body); END",
+]
+
+SQLITE_INDEX_REVERSE = [
+    "DROP TRIGGER base_searchdocument_fts_update",
+    "DROP TRIGGER base_searchdocument_fts_delete",
+    "DROP TRIGGER base_searchdocument_fts_insert",
+    "DROP TABLE base_searchdocument_fts",
+]
+
+# The full-text index of the documents on PostgreSQL (12 or newer), the generated vector is
+# updated by the database
+POSTGRESQL_INDEX = [
+    "ALTER TABLE base_searchdocument ADD COLUMN search_vector tsvector GENERATED ALWAYS AS "
+    "(setweight(to_tsvector('simple', title), 'A') || "
+    "setweight(to_tsvector('simple', body), 'B')) STORED",
+    "CREATE INDEX base_searchdocument_vector_idx ON base_searchdocument "
+    "USING GIN (search_vector)",
+]
+
+POSTGRESQL_INDEX_REVERSE = [
+    "DROP INDEX base_searchdocument_vector_idx",
+    "ALTER TABLE base_searchdocument DROP COLUMN search_vector",
+]
+
+
+def has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        return ('ENABLE_FTS5',) in cursor.fetchall()
+
+
+def statements(schema_editor, reverse):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        return POSTGRESQL_INDEX_REVERSE if reverse else POSTGRESQL_INDEX
+    if connection.vendor == 'sqlite' and has_fts5(connection):
+        return SQLITE_INDEX_REVERSE if reverse else SQLITE_INDEX
+    # Other databases are searched without index
+    return []
+
+
+# The models and fields of the content types whose text is searched
+CONTENT_TEXT_MODELS = {'Textfield': 'TextField', 'MD': 'MDContent', 'Latex': 'Latex'}
+
+# Number of objects whose documents are created at once
+CHUNK_SIZE = 500
+
+
+def chunks(queryset):
+    last = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last).order_by('pk')[:CHUNK_SIZE])
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    def create_index(apps, schema_editor):
+        for statement in statements(schema_editor, False):
+            schema_editor.execute(statement)
+
+    def drop_index(apps, schema_editor):
+        for statement in statements(schema_editor, True):
+            schema_editor.execute(statement)
+
+    def create_documents(apps, schema_editor):
+        # Creates the documents of the existing courses, topics and contents like
+        # frontend.search, the index is filled by the database
+        SearchDocument = apps.get_model('base', 'SearchDocument')
+        Course = apps.get_model('base', 'Course')
+        Topic = apps.get_model('base', 'Topic')
+        Content = apps.get_model('base', 'Content')
+        for courses in chunks(Course.objects.all()):
+            SearchDocument.objects.bulk_create(
+                SearchDocument(kind='course', course=course, title=course.title,
+                               body=course.description, public=course.public)
+                for course in courses)
+        for topics in chunks(Topic.objects.select_related('category')):
+            SearchDocument.objects.bulk_create(
+                SearchDocument(kind='topic', topic=topic, title=topic.title,
+                               body=topic.category.title)
+                for topic in topics)
+        text_models = {content_type: apps.get_model('content', model_name)
+                       for content_type, model_name in CONTENT_TEXT_MODELS.items()}
+        for contents in chunks(Content.objects.all()):
+            texts = {}
+            for content_type, model in text_models.items():
+                ids = [content.pk for content in contents if content.type == content_type]
+                texts.update(model.objects.filter(content_id__in=ids)
+                             .values_list('content_id', 'textfield'))
+            SearchDocument.objects.bulk_create(
+                SearchDocument(kind='content', content=content, topic_id=content.topic_id,
+                               author_id=content.author_id, title=content.description,
+                               body=texts.get(content.pk) or '', public=content.public,
+                               hidden=content.hidden)
+                for content in contents)
+
+    dependencies = [
+        ('base', '0029_topic_search_indexes'),
+        ('content', '0019_mdcontent_html'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('course', 'Course'), ('topic', 'Topic'), ('content', 'Content')], max_length=10, verbose_name='Kind')),
+                ('title', models.TextField(verbose_name='Title')),
+                ('body', models.TextField(blank=True, verbose_name='Body')),
+                ('public', models.BooleanField(default=False, verbose_name='Public')),
+                ('hidden', models.BooleanField(default=False, verbose_name='Hidden')),
+                ('author', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='base.profile', verbose_name='Author')),
+                ('content', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='base.content', verbose_name='Content')),
+                ('course', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='base.course', verbose_name='Course')),
+                ('topic', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='base.topic', verbose_name='Topic')),
+            ],
+            options={
+                'verbose_name': 'Search Document',
+                'verbose_name_plural': 'Search Documents',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(condition=models.Q(('kind', 'topic')), fields=('topic',), name='base_searchdocument_unique_topic'),
+        ),
+        migrations.RunPython(create_index, drop_index),
+        migrations.RunPython(create_documents, migrations.RunPython.noop),
+    ]
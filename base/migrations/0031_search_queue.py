@@ -0,0 +1,25 @@
+# Generated by Django 3.2.20 on 2026-10-18 19:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0030_search_documents'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchQueueEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('course', 'Course'), ('topic', 'Topic'), ('content', 'Content')], max_length=10, verbose_name='Kind')),
+                ('object_id', models.PositiveIntegerField(verbose_name='Object ID')),
+            ],
+            options={
+                'verbose_name': 'Search Queue Entry',
+                'verbose_name_plural': 'Search Queue Entries',
+            },
+        ),
+    ]
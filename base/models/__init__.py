@@ -11,3 +11,5 @@ from .content import Course, Category, Period, Topic, Content, CourseStructureEn
 from .social import Comment, Rating
 
 from .coursebook import Favorite
+
+from .search import SearchDocument, SearchQueueEntry
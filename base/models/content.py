@@ -6,8 +6,11 @@ content of the course book and can be registered in admin.py.
 """
 
 from django.conf import settings
-from django.db import models
-from django.db.models import Avg, Count
+from django.db import models, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Upper
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
@@ -214,7 +217,7 @@ class Course(models.Model):
         :return: the sorted topic list
         :rtype: QuerySet
         """
-        return self.topics.order_by('child_topic__index')
+        return self.topics.order_by('child_topic__position', 'child_topic__sub_position')
 
     def __str__(self):
         """String representation
@@ -253,9 +256,14 @@ class Topic(models.Model):
         :type Meta.verbose_name: __proxy__
         :attr Meta.verbose_name_plural: A human-readable name for the object in plural
         :type Meta.verbose_name_plural: __proxy__
+        :attr Meta.indexes: The indexes of the model
+        :type Meta.indexes: list[Index]
         """
         verbose_name = _("Topic")
         verbose_name_plural = _("Topics")
+        # The topic search matches the upper case title, optionally within a category
+        indexes = [models.Index(Upper('title'), name='base_topic_upper_title_idx'),
+                   models.Index('category', Upper('title'), name='base_topic_cat_title_idx')]
 
     def __str__(self):
         """String representation
@@ -281,17 +289,38 @@ class Topic(models.Model):
         :return: the sorted and filtered contents belonging to this topic
         :rtype: QuerySet[Content]
         """
+        return Topic.filter_contents(self.contents.all(), sorted_by, filtered_by, user=user)
+
+    @staticmethod
+    def filter_contents(contents, sorted_by, filtered_by, user=None):
+        """Filter contents
+
+        Restricts the given contents to the ones visible to the user and sorts or filters
+        them like get_contents, e.g. for the contents of several topics at once.
+
+        :param contents: The contents to filter
+        :type contents: QuerySet[Content]
+        :param sorted_by: The sorting value which the content should be sorted
+        :type sorted_by: str
+        :param filtered_by: The filtered value which the content should be filtered
+        :type filtered_by: str
+        :param user: The user viewing the contents, "" for a moderator
+        :type user: Profile or str or None
+
+        :return: the sorted and filtered contents
+        :rtype: QuerySet[Content]
+        """
         # If the user is a moderator, user is set to "" to show all contents
         if user == "":
-            contents = self.contents.all()
+            contents = contents.all()
 
         # If the user is not a moderator and not logged in, only show unhidden contents
         elif user == None:
-            contents = self.contents.all().filter(hidden=False)
+            contents = contents.filter(hidden=False)
 
         else:
             # filter the contents that are not hidden as well as hidden and authored by the user
-            contents = self.contents.all().filter(
+            contents = contents.filter(
                 models.Q(hidden=False) | models.Q(author=user))
 
         # filtered by is a String and represents the decision of the user
@@ -307,8 +336,11 @@ class Topic(models.Model):
         # and the String represent their decision
         if sorted_by != 'None' and sorted_by is not None:
             if sorted_by == 'Rating':
-                contents = sorted(
-                    contents, key=lambda x: x.get_rate(), reverse=True)
+                # Sorted by the truncated average like get_rate, unrated contents last
+                contents = contents.annotate(rate=models.Case(
+                    models.When(rating_count=0, then=models.Value(-1)),
+                    default=F('rating_sum') / F('rating_count'),
+                    output_field=models.IntegerField())).order_by('-rate', 'pk')
             elif sorted_by == 'Date':
                 contents = contents.order_by('-' + 'creation_date')
             else:
@@ -397,7 +429,15 @@ class Content(models.Model):
     :type Content.preview: ImageField
     :attr Content.ratings: The ratings from the user to the content
     :type Content.ratings: ManyToManyField - Profile
+    :attr Content.rating_sum: The sum of the ratings, maintained by the ratings
+    :type Content.rating_sum: IntegerField
+    :attr Content.rating_count: The number of the ratings, maintained by the ratings
+    :type Content.rating_count: IntegerField
+    :attr Content.RATING_FIELDS: The fields maintained by the ratings
+    :type Content.RATING_FIELDS: list[str]
     """
+    RATING_FIELDS = ['rating_sum', 'rating_count']
+
     topic = models.ForeignKey(Topic, verbose_name=_("Topic"),
                               related_name='contents',
                               on_delete=models.CASCADE)
@@ -452,6 +492,12 @@ class Content(models.Model):
 
     ratings = models.ManyToManyField("Profile",
                                      through='Rating')
+    rating_sum = models.IntegerField(verbose_name=_("Rating sum"),
+                                     default=0,
+                                     editable=False)
+    rating_count = models.IntegerField(verbose_name=_("Rating count"),
+                                       default=0,
+                                       editable=False)
 
     class Meta:
         """Meta options
@@ -466,6 +512,25 @@ class Content(models.Model):
         verbose_name = _("Content")
         verbose_name_plural = _("Contents")
 
+    def save(self, *args, **kwargs):
+        """Save
+
+        Saves the content. The rating aggregates of an existing content are not written,
+        since they are maintained by the ratings and the instance may be older than the
+        latest rating.
+
+        :param args: The arguments
+        :type args: Any
+        :param kwargs: The keyword arguments
+        :type kwargs: dict[str, Any]
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None \
+                and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key
+                                       and field.name not in self.RATING_FIELDS]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         """String representation
 
@@ -499,7 +564,7 @@ class Content(models.Model):
         :rtype: int
 
         """
-        return Rating.objects.filter(content_id=self.id).aggregate(Count('rating'))['rating__count']
+        return self.rating_count
 
     def get_rate(self):
         """Average rating
@@ -509,10 +574,8 @@ class Content(models.Model):
         :return: the average number of ratings
         :rtype: float
         """
-        rating = Rating.objects.filter(content_id=self.id).aggregate(
-            Avg('rating'))['rating__avg']
-        if rating is not None:
-            return int(rating)
+        if self.rating_count:
+            return int(self.rating_sum / self.rating_count)
         return -1
 
     def get_rate_count(self):
@@ -523,7 +586,31 @@ class Content(models.Model):
         :return: the total count of ratings
         :rtype: int
         """
-        return self.ratings.count()
+        return self.rating_count
+
+    @classmethod
+    def reconcile_ratings(cls):
+        """Reconcile ratings
+
+        Recomputes the rating aggregates of all contents from their ratings and corrects the
+        contents whose aggregates drifted, e.g. because ratings were changed by raw queries.
+
+        :return: the number of corrected contents
+        :rtype: int
+        """
+        actual = {aggregate['content_id']: (aggregate['total'], aggregate['count'])
+                  for aggregate in Rating.objects.values('content_id')
+                  .annotate(total=Sum('rating'), count=Count('pk'))}
+        count = 0
+        with transaction.atomic():
+            for pk, rating_sum, rating_count in cls.objects.select_for_update() \
+                    .values_list('pk', 'rating_sum', 'rating_count'):
+                aggregate = actual.get(pk, (0, 0))
+                if (rating_sum, rating_count) != aggregate:
+                    cls.objects.filter(pk=pk).update(rating_sum=aggregate[0],
+                                                     rating_count=aggregate[1])
+                    count += 1
+        return count
 
     def user_already_rated(self, user):
         """Already rated
@@ -564,12 +651,13 @@ class Content(models.Model):
         :param user: The user of the rating
         :type user: User
         """
-        Rating.objects.filter(user_id=user.user.id,
-                              content_id=self.id).delete()
-        rating = Rating.objects.create(
-            user=user, content=self, rating=rating)  # user = profile
-        rating.save()
-        self.save()
+        # The rating aggregates are updated by the signals of the ratings
+        with transaction.atomic():
+            Rating.objects.filter(user_id=user.user.id,
+                                  content_id=self.id).delete()
+            Rating.objects.create(user=user, content=self, rating=rating)  # user = profile
+            self.save()
+        self.refresh_from_db(fields=self.RATING_FIELDS)
 
     def approve_content(self, course, user, approval):
         """Content approval
@@ -627,20 +715,23 @@ class CourseStructureEntry(models.Model):
 
     For example:
 
-    - 1 is a main topic
-    - 1/2 is a second sub topic in the main topic 1
+    - 1 is a main topic (position 1, sub position 0)
+    - 1/2 is a second sub topic in the main topic 1 (position 1, sub position 2)
 
     :attr CourseStructureEntry.course: The course whose structure is meant
     :type CourseStructureEntry.course: ForeignKey - Course
-    :attr CourseStructureEntry.index: The position of the (sub) topic
-    :type CourseStructureEntry.index: CharField
+    :attr CourseStructureEntry.position: The position of the main topic
+    :type CourseStructureEntry.position: PositiveIntegerField
+    :attr CourseStructureEntry.sub_position: The position of the sub topic in its main
+                                             topic, 0 for a main topic
+    :type CourseStructureEntry.sub_position: PositiveIntegerField
     :attr CourseStructureEntry.topic: The topic at the specified position/index
     :type CourseStructureEntry.topic: ForeignKey - Topic
     """
     course = models.ForeignKey(Course, verbose_name=_("Course"),
                                on_delete=models.CASCADE)
-    index = models.CharField(verbose_name=_("Index"),
-                             max_length=50)
+    position = models.PositiveIntegerField(verbose_name=_("Position"))
+    sub_position = models.PositiveIntegerField(verbose_name=_("Sub position"), default=0)
     topic = models.ForeignKey(Topic, related_name='child_topic',
                               verbose_name=_("Topic"),
                               on_delete=models.DO_NOTHING)
@@ -654,9 +745,50 @@ class CourseStructureEntry(models.Model):
         :type Meta.verbose_name: __proxy__
         :attr Meta.verbose_name_plural: A human-readable name for the object in plural
         :type Meta.verbose_name_plural: __proxy__
+        :attr Meta.indexes: The indexes of the model
+        :type Meta.indexes: list[Index]
         """
         verbose_name = _("Course Structure Entry")
         verbose_name_plural = _("Course Structure Entries")
+        indexes = [models.Index(fields=['course', 'position', 'sub_position'])]
+
+    @property
+    def index(self):
+        """Index
+
+        Returns the index of the (sub) topic in the course structure, e.g. 1 for a main topic
+        and 1/2 for a sub topic.
+
+        :return: the index of the entry
+        :rtype: str
+        """
+        if self.sub_position:
+            return f'{self.position}/{self.sub_position}'
+        return f'{self.position}'
+
+    @index.setter
+    def index(self, index):
+        """Index
+
+        Sets the position and the sub position from the given index, e.g. 1 or 1/2.
+
+        :param index: The index of the entry
+        :type index: str or int
+        """
+        position, _separator, sub_position = str(index).partition('/')
+        self.position = int(position)
+        self.sub_position = int(sub_position or 0)
+
+    @property
+    def is_subtopic(self):
+        """Is subtopic
+
+        Checks if the entry is a sub topic.
+
+        :return: true if the entry is a sub topic
+        :rtype: bool
+        """
+        return self.sub_position > 0
 
     def __str__(self):
         """String representation
@@ -669,6 +801,77 @@ class CourseStructureEntry(models.Model):
         return f"{self.course} -> {self.index}. {self.topic}"
 
 
+@receiver(pre_save, sender=Rating)
+def remember_previous_rating(sender, instance, raw, **kwargs):  # pylint: disable=unused-argument
+    """Remember previous rating
+
+    Remembers the stored value of a rating which is changed, so that the rating aggregates
+    of the content can be corrected by the difference.
+
+    :param sender: The model class
+    :type sender: type
+    :param instance: The rating to save
+    :type instance: Rating
+    :param raw: Indicator if the rating is loaded from a fixture
+    :type raw: bool
+    :param kwargs: The keyword arguments
+    :type kwargs: dict[str, Any]
+    """
+    instance.previous_rating = None
+    if instance.pk is not None and not raw:
+        instance.previous_rating = Rating.objects.filter(pk=instance.pk) \
+            .values_list('rating', flat=True).first()
+
+
+@receiver(post_save, sender=Rating)
+def add_rating(sender, instance, created, raw, **kwargs):  # pylint: disable=unused-argument
+    """Add rating
+
+    Adds a created or changed rating to the rating aggregates of its content. The
+    aggregates are updated in the database, so that concurrent ratings are not lost.
+
+    :param sender: The model class
+    :type sender: type
+    :param instance: The saved rating
+    :type instance: Rating
+    :param created: Indicator if the rating was created
+    :type created: bool
+    :param raw: Indicator if the rating is loaded from a fixture, whose contents contain
+                their aggregates
+    :type raw: bool
+    :param kwargs: The keyword arguments
+    :type kwargs: dict[str, Any]
+    """
+    if raw:
+        return
+    previous = getattr(instance, 'previous_rating', None)
+    if created or previous is None:
+        Content.objects.filter(pk=instance.content_id) \
+            .update(rating_sum=F('rating_sum') + instance.rating,
+                    rating_count=F('rating_count') + 1)
+    elif previous != instance.rating:
+        Content.objects.filter(pk=instance.content_id) \
+            .update(rating_sum=F('rating_sum') + instance.rating - previous)
+
+
+@receiver(post_delete, sender=Rating)
+def remove_rating(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Remove rating
+
+    Removes a deleted rating from the rating aggregates of its content.
+
+    :param sender: The model class
+    :type sender: type
+    :param instance: The deleted rating
+    :type instance: Rating
+    :param kwargs: The keyword arguments
+    :type kwargs: dict[str, Any]
+    """
+    Content.objects.filter(pk=instance.content_id) \
+        .update(rating_sum=F('rating_sum') - instance.rating,
+                rating_count=F('rating_count') - 1)
+
+
 # Register models for reversion if it is not already done in admin,
 # else we can specify configuration
 reversion.register(Course,
@@ -0,0 +1,154 @@
+"""Purpose of this file
+
+This file describes the documents of the full-text search. The text of the courses, topics
+and contents is copied into the documents, which are indexed by the full-text search of
+the database. Changed objects are queued until their documents are updated.
+"""
+
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class SearchDocument(models.Model):
+    """Search document
+
+    This model represents the searchable text of a course, topic or content. The title is
+    ranked higher than the body. Besides the text, the document stores the visibility of
+    its object, so that the search can be restricted to the documents visible to the user.
+    The documents are deleted together with their objects.
+
+    :attr SearchDocument.KIND_COURSE: The kind of the documents of courses
+    :type SearchDocument.KIND_COURSE: str
+    :attr SearchDocument.KIND_TOPIC: The kind of the documents of topics
+    :type SearchDocument.KIND_TOPIC: str
+    :attr SearchDocument.KIND_CONTENT: The kind of the documents of contents
+    :type SearchDocument.KIND_CONTENT: str
+    :attr SearchDocument.kind: The kind of the object of the document
+    :type SearchDocument.kind: CharField
+    :attr SearchDocument.course: The course of a course document
+    :type SearchDocument.course: OneToOneField - Course
+    :attr SearchDocument.topic: The topic of a topic document or of the content of a content
+                                document
+    :type SearchDocument.topic: ForeignKey - Topic
+    :attr SearchDocument.content: The content of a content document
+    :type SearchDocument.content: OneToOneField - Content
+    :attr SearchDocument.author: The author of the content of a content document
+    :type SearchDocument.author: ForeignKey - Profile
+    :attr SearchDocument.title: The title of the object
+    :type SearchDocument.title: TextField
+    :attr SearchDocument.body: The further text of the object
+    :type SearchDocument.body: TextField
+    :attr SearchDocument.public: The status of the course or content if it is public
+    :type SearchDocument.public: BooleanField
+    :attr SearchDocument.hidden: The status of the content if it is hidden
+    :type SearchDocument.hidden: BooleanField
+    """
+    KIND_COURSE = 'course'
+    KIND_TOPIC = 'topic'
+    KIND_CONTENT = 'content'
+
+    kind = models.CharField(verbose_name=_("Kind"),
+                            max_length=10,
+                            choices=[(KIND_COURSE, _("Course")),
+                                     (KIND_TOPIC, _("Topic")),
+                                     (KIND_CONTENT, _("Content"))])
+    course = models.OneToOneField("Course",
+                                  verbose_name=_("Course"),
+                                  on_delete=models.CASCADE,
+                                  related_name='search_document',
+                                  blank=True,
+                                  null=True)
+    topic = models.ForeignKey("Topic",
+                              verbose_name=_("Topic"),
+                              on_delete=models.CASCADE,
+                              related_name='search_documents',
+                              blank=True,
+                              null=True)
+    content = models.OneToOneField("Content",
+                                   verbose_name=_("Content"),
+                                   on_delete=models.CASCADE,
+                                   related_name='search_document',
+                                   blank=True,
+                                   null=True)
+    author = models.ForeignKey("Profile",
+                               verbose_name=_("Author"),
+                               on_delete=models.SET_NULL,
+                               related_name='+',
+                               blank=True,
+                               null=True)
+    title = models.TextField(verbose_name=_("Title"))
+    body = models.TextField(verbose_name=_("Body"),
+                            blank=True)
+    public = models.BooleanField(verbose_name=_("Public"),
+                                 default=False)
+    hidden = models.BooleanField(verbose_name=_("Hidden"),
+                                 default=False)
+
+    class Meta:
+        """Meta options
+
+        This class handles all possible meta options that you can give to this model.
+
+        :attr Meta.verbose_name: A human-readable name for the object in singular
+        :type Meta.verbose_name: __proxy__
+        :attr Meta.verbose_name_plural: A human-readable name for the object in plural
+        :type Meta.verbose_name_plural: __proxy__
+        :attr Meta.constraints: The constraints of the model
+        :type Meta.constraints: list[UniqueConstraint]
+        """
+        verbose_name = _("Search Document")
+        verbose_name_plural = _("Search Documents")
+        constraints = [models.UniqueConstraint(fields=['topic'],
+                                               condition=models.Q(kind='topic'),
+                                               name='base_searchdocument_unique_topic')]
+
+    def __str__(self):
+        """String representation
+
+        Returns the string representation of this object.
+
+        :return: the string representation of this object
+        :rtype: str
+        """
+        return f"{self.kind}: {self.title}"
+
+
+class SearchQueueEntry(models.Model):
+    """Search queue entry
+
+    This model represents an object whose search document has to be updated. The entries
+    are created in the transaction changing the object, so that they are rolled back with
+    it, and are processed in batches after the commit.
+
+    :attr SearchQueueEntry.kind: The kind of the object
+    :type SearchQueueEntry.kind: CharField
+    :attr SearchQueueEntry.object_id: The id of the object
+    :type SearchQueueEntry.object_id: PositiveIntegerField
+    """
+    kind = models.CharField(verbose_name=_("Kind"),
+                            max_length=10,
+                            choices=SearchDocument._meta.get_field('kind').choices)
+    object_id = models.PositiveIntegerField(verbose_name=_("Object ID"))
+
+    class Meta:
+        """Meta options
+
+        This class handles all possible meta options that you can give to this model.
+
+        :attr Meta.verbose_name: A human-readable name for the object in singular
+        :type Meta.verbose_name: __proxy__
+        :attr Meta.verbose_name_plural: A human-readable name for the object in plural
+        :type Meta.verbose_name_plural: __proxy__
+        """
+        verbose_name = _("Search Queue Entry")
+        verbose_name_plural = _("Search Queue Entries")
+
+    def __str__(self):
+        """String representation
+
+        Returns the string representation of this object.
+
+        :return: the string representation of this object
+        :rtype: str
+        """
+        return f"{self.kind}: {self.object_id}"
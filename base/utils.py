@@ -19,61 +19,14 @@ def create_topic_and_subtopic_list(topics, course):
     :type course: Course
 
     :return: a sorted list of topics
-    :rtype: list[tuple[str, int, Any, str]]
+    :rtype: list[tuple[int, Any, str]]
     """
-
-    sorted_topics = []
-
-    already_checked_topics = []
-    for topic in topics:
-        # If a topic is part of a course more than one time: the structure
-        # loop below gets the remaining structures
-        if topic in already_checked_topics:
-            continue
-        already_checked_topics.append(topic)
-        # Get all structures (even if the same topic is part of the course more than one time)
-        for structure in CourseStructureEntry.objects.filter(
-                topic=topic,
-                course=course
-        ).order_by('index'):
-            # 0 if main topic - 1 if subtopic
-            is_subtopic = 0
-            # for easy use in html template: (is_subtopic, topic)
-            struct_index = structure.index.split("/")
-
-            if len(struct_index) > 1:
-                index_str = str(struct_index[0]) + "." + str(struct_index[1])
-                is_subtopic = 1
-            else:
-                index_str = str(struct_index[0])
-
-            sorted_topics.append((structure.index, is_subtopic, topic, index_str))
-
-    sorted_topics.sort(key=lambda x: structure_to_tuple(x[0]))
-    # return list with tuple (is_subtopic, topic)
-    return [(topic[1], topic[2], topic[3]) for topic in sorted_topics]
-
-
-def structure_to_tuple(structure):
-    """Structure to tuple
-
-    Returns the index of structure as a tuple. The index determines if the topic is a
-    main or a sub topic.
-
-    For example:
-
-    - 1 is a main topic
-    - 1/1 is a sub topic
-
-    :param structure: The index of the structure
-    :type structure: str
-
-    return: the index of the structure as a tuple
-    rtype: tuple[int, int]
-    """
-    if len(structure.split('/')) <= 1:
-        return int(structure.split('/')[0]), 0
-    return int(structure.split('/')[0]), int(structure.split('/')[1])
+    # Get all structures (even if the same topic is part of the course more than one time)
+    entries = CourseStructureEntry.objects.filter(topic__in=topics, course=course) \
+        .select_related('topic').order_by('position', 'sub_position')
+    # for easy use in html template: (is_subtopic, topic, index)
+    return [(int(entry.is_subtopic), entry.topic, entry.index.replace('/', '.'))
+            for entry in entries]
 
 
 def create_course_from_form(self, form):
@@ -156,6 +156,9 @@ USE_TZ = True
 
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 
+# Runs the tests with temporary cache directories
+TEST_RUNNER = 'test.runner.TestRunner'
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/3.0/howto/static-files/
 
@@ -212,6 +215,89 @@ ALLOWED_IMAGE_EXTENSIONS = ['png', 'jpeg', 'jpg']
 
 YT_API_KEY = secrets.YT_API_KEY if secrets is not  None else ""
 
+# Backend fetching the metadata of YouTube videos, use content.static.yt_api.StubBackend
+# for tests and deployments without access to the YouTube Data API
+YT_METADATA_BACKEND = 'content.static.yt_api.YouTubeDataBackend'
+# Metadata of YouTube videos returned by the stub backend: id -> {'title', 'duration'}
+YT_METADATA_STUB = {}
+# Seconds after which the cached metadata of a YouTube video is fetched again
+YT_METADATA_TTL = 7 * 24 * 60 * 60
+
+# Cache for compiled LaTeX documents (content compilation, previews and exports)
+LATEX_COMPILE_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'latex')
+# Maximum size of the cache in bytes, 0 disables the cache
+LATEX_COMPILE_CACHE_MAX_SIZE = 512 * 1024 * 1024
+
+# Load the preamble of the LaTeX documents from a precompiled format file
+LATEX_USE_FORMAT = True
+# Directory of the precompiled format files
+LATEX_FORMAT_DIR = os.path.join(BASE_DIR, 'cache', 'latex-formats')
+# Seconds after which a failed build of a format file is tried again
+LATEX_FORMAT_RETRY = 60 * 60
+
+# Maximum number of pdflatex passes of an export, further passes are only run while the
+# table of contents and the cross references change
+LATEX_MAX_PASSES = 3
+# Stop pdflatex at the first error instead of compiling the whole erroneous document
+LATEX_HALT_ON_ERROR = True
+
+# Seconds after which a pdflatex run is killed, 0 disables the timeout
+LATEX_COMPILE_TIMEOUT = 60
+# CPU seconds and bytes of address space a pdflatex run may use, 0 disables the limit
+LATEX_COMPILE_CPU_LIMIT = 60
+LATEX_COMPILE_MEMORY_LIMIT = 1024 * 1024 * 1024
+# Maximum number of documents compiled at the same time by one process
+LATEX_MAX_CONCURRENT_COMPILES = 2
+# Seconds a request waits for a free compilation slot before it is rejected as busy
+LATEX_COMPILE_WAIT = 10
+# Limits of the pdflatex runs of the export worker, which compiles large courses in the
+# background: seconds after which a run is killed and CPU seconds a run may use (0 disables
+# the limit), seconds waited for a free compilation slot (None waits until one is free)
+EXPORT_COMPILE_TIMEOUT = 5 * 60
+EXPORT_COMPILE_CPU_LIMIT = 5 * 60
+EXPORT_COMPILE_WAIT = None
+
+# Maximum number of Markdown contents converted to PDF at the same time during an export
+EXPORT_MARKDOWN_WORKERS = 4
+# Convert all Markdown contents of an export with a single wkhtmltopdf run (needs pdftotext)
+EXPORT_MARKDOWN_BATCH = True
+
+# Widths in pixels of the preview thumbnails of the PDF contents, cards show the card variant
+PREVIEW_THUMBNAIL_WIDTHS = {'card': 200, 'detail': 800}
+# Image format of the preview thumbnails
+PREVIEW_THUMBNAIL_FORMAT = 'WEBP'
+# Maximum number of previews generated at the same time in the background by one process
+PREVIEW_WORKERS = 1
+
+# Cache of the rendered course pages. The cache must be shared by all processes of the server
+# (e.g. the uwsgi processes), since the entries are invalidated by the process handling the
+# change. The file based cache is shared by the processes of one host, use memcached or redis
+# if the processes run on several hosts.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'django'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+# Seconds the rendered course structure of a course page is cached, the cache is invalidated
+# if the course or its contents change
+COURSE_FRAGMENT_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Number of topics returned per page by the topic search of the structure editor
+TOPIC_SEARCH_PAGE_SIZE = 20
+# Number of objects whose search documents are updated in one batch
+SEARCH_INDEX_BATCH_SIZE = 500
+# Number of results shown per page by the full-text search
+SEARCH_PAGE_SIZE = 20
+
+# Directory of the PDFs compiled by the export worker (not publicly served)
+EXPORT_JOB_ROOT = os.path.join(BASE_DIR, 'exports')
+# Seconds after which a running export job is considered stale and requeued
+EXPORT_JOB_TIMEOUT = 30 * 60
+# Seconds after which finished export jobs and their PDFs are deleted
+EXPORT_JOB_RETENTION = 24 * 60 * 60
+
 include(optional("settings/*.py"))
 
 if DEBUG:
@@ -0,0 +1,35 @@
+"""Purpose of this file
+
+This file contains the management command which fetches the metadata of the YouTube videos.
+"""
+
+from django.core.management.base import BaseCommand
+
+from content.models import YTVideoContent, YTVideoMetadata
+
+
+class Command(BaseCommand):
+    """Fetch video metadata
+
+    Fetches the metadata of all YouTube video contents which is missing or stale. Exports
+    only read the cached metadata, this command fills the cache for contents which were
+    created before the cache existed and refreshes it in advance.
+
+    :attr Command.help: The help text of the command
+    :type Command.help: str
+    """
+    help = 'Fetches the missing or stale metadata of the YouTube videos.'
+
+    def handle(self, *args, **options):
+        """Handle
+
+        Fetches the missing or stale metadata of the YouTube videos.
+
+        :param args: The arguments
+        :type args: Any
+        :param options: The options of the command
+        :type options: dict[str, Any]
+        """
+        ids = {video.id for video in YTVideoContent.objects.all()}
+        metadata = YTVideoMetadata.lookup(ids)
+        self.stdout.write(f'Cached the metadata of {len(metadata)} of {len(ids)} videos.')
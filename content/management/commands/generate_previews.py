@@ -0,0 +1,56 @@
+"""Purpose of this file
+
+This file contains the management command which generates the preview thumbnails of the
+contents.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from base.models import Content
+from content.previews import PREVIEW_TYPES, generate_preview
+
+
+class Command(BaseCommand):
+    """Generate previews
+
+    Generates the preview thumbnails of the contents with a PDF. By default only the contents
+    without preview are processed, e.g. the ones whose background generation was interrupted.
+
+    :attr Command.help: The help text of the command
+    :type Command.help: str
+    """
+    help = 'Generates the preview thumbnails of the contents.'
+
+    def add_arguments(self, parser):
+        """Add arguments
+
+        Adds the arguments of the command.
+
+        :param parser: The argument parser
+        :type parser: CommandParser
+        """
+        parser.add_argument('--all', action='store_true',
+                            help='Generates the previews of all contents again.')
+
+    def handle(self, *args, **options):
+        """Handle
+
+        Generates the preview thumbnails of the contents.
+
+        :param args: The arguments
+        :type args: Any
+        :param options: The options of the command
+        :type options: dict[str, Any]
+        """
+        contents = Content.objects.filter(type__in=PREVIEW_TYPES)
+        if not options['all']:
+            contents = contents.filter(Q(preview__isnull=True) | Q(preview=''))
+        count = 0
+        for content_id in contents.values_list('pk', flat=True).iterator():
+            try:
+                if generate_preview(content_id) is not None:
+                    count += 1
+            except Exception as error:  # pylint: disable=broad-except
+                self.stderr.write(f'Preview of content {content_id} not generated: {error}')
+        self.stdout.write(f'Generated the previews of {count} contents.')
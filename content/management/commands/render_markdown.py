@@ -0,0 +1,53 @@
+"""Purpose of this file
+
+This file contains the management command which stores the HTML of the Markdown contents.
+"""
+
+from django.core.management.base import BaseCommand
+
+from content.models import MDContent
+from export.helper_functions import Markdown
+
+
+class Command(BaseCommand):
+    """Render Markdown
+
+    Renders the HTML of the Markdown contents which is stored with the contents and shown by
+    the views. By default only the contents without stored HTML are rendered, e.g. the ones
+    created before the HTML was stored.
+
+    :attr Command.help: The help text of the command
+    :type Command.help: str
+    """
+    help = 'Stores the rendered HTML of the Markdown contents.'
+
+    def add_arguments(self, parser):
+        """Add arguments
+
+        Adds the arguments of the command.
+
+        :param parser: The argument parser
+        :type parser: CommandParser
+        """
+        parser.add_argument('--all', action='store_true',
+                            help='Renders the HTML of all Markdown contents again.')
+
+    def handle(self, *args, **options):
+        """Handle
+
+        Renders and stores the HTML of the Markdown contents.
+
+        :param args: The arguments
+        :type args: Any
+        :param options: The options of the command
+        :type options: dict[str, Any]
+        """
+        md_contents = MDContent.objects.select_related('content')
+        if not options['all']:
+            md_contents = md_contents.filter(html='')
+        count = 0
+        for md_content in md_contents.iterator():
+            html = Markdown.render(md_content.content, False, md_content.textfield)
+            MDContent.objects.filter(pk=md_content.pk).update(html=html)
+            count += 1
+        self.stdout.write(f'Rendered the HTML of {count} Markdown contents.')
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.20 on 2026-10-18 18:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0017_generalurl'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='YTVideoMetadata',
+            fields=[
+                ('video_id', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='Video ID')),
+                ('title', models.TextField(blank=True, verbose_name='Title')),
+                ('duration', models.FloatField(verbose_name='Duration')),
+                ('fetched_at', models.DateTimeField(verbose_name='Fetched at')),
+            ],
+            options={
+                'verbose_name': 'YouTube Video Metadata',
+                'verbose_name_plural': 'YouTube Video Metadata',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.20 on 2026-10-18 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0018_ytvideometadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mdcontent',
+            name='html',
+            field=models.TextField(blank=True, editable=False, verbose_name='Rendered HTML'),
+        ),
+    ]
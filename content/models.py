@@ -5,23 +5,29 @@ that extends the models.Model class represents a content type and can be
 registered in admin.py.
 """
 
+import logging
 import os
 import re
+from datetime import timedelta
 
 import reversion
 from django.conf import settings
 from django.db import models
 from django.forms import ValidationError
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import FileExtensionValidator
 
 from pdf2image import convert_from_path
+from PIL import Image
 
 from base.models import Content
 
 from content.mixin import GeneratePreviewMixin
 from content.validator import Validator
-from content.static.yt_api import get_video_length, timestamp_to_seconds, seconds_to_timestamp
+from content.static.yt_api import metadata_backend, timestamp_to_seconds, seconds_to_timestamp
+
+logger = logging.getLogger(__name__)
 
 
 class BaseContentModel(models.Model, GeneratePreviewMixin):
@@ -90,22 +96,55 @@ class BasePDFModel(models.Model):
     def generate_preview(self):
         """Generate preview
 
-        Generates a preview of this model, more precisely the PDF is generated as a preview.
+        Generates the preview thumbnails of this model from the first page of the PDF. The
+        page is rasterized once at the width of the largest thumbnail and then scaled down
+        to the widths PREVIEW_THUMBNAIL_WIDTHS, the thumbnails are saved in the format
+        PREVIEW_THUMBNAIL_FORMAT.
 
-        :return: the string which represents the concatenated path components.
+        :return: the name of the largest thumbnail, the others are named by variant_name
         :rtype: str
         """
         # Path of the preview folder
         preview_folder = 'uploads/previews/'
-        # Checks if Folder exists
-        if not os.path.exists(os.path.join(settings.MEDIA_ROOT, preview_folder)):
-            os.makedirs(os.path.join(settings.MEDIA_ROOT, preview_folder))
-        base_filename = os.path.splitext(os.path.basename(self.pdf.name))[0] + '.jpg'
-        # Get images for every page
-        pages = convert_from_path(self.pdf.path, last_page=2)
-        # Save first page to disk
-        pages[0].save(os.path.join(settings.MEDIA_ROOT, preview_folder, base_filename))
-        return os.path.join(preview_folder, base_filename)
+        os.makedirs(os.path.join(settings.MEDIA_ROOT, preview_folder), exist_ok=True)
+        base_filename = os.path.splitext(os.path.basename(self.pdf.name))[0]
+        widths = settings.PREVIEW_THUMBNAIL_WIDTHS
+        largest = max(widths, key=widths.get)
+        extension = settings.PREVIEW_THUMBNAIL_FORMAT.lower()
+        # Rasterize only the first page, poppler derives the resolution from the width
+        page = convert_from_path(self.pdf.path, first_page=1, last_page=1,
+                                 size=(widths[largest], None))[0]
+        for size, width in widths.items():
+            thumbnail = page
+            if page.width > width:
+                height = max(1, round(page.height * width / page.width))
+                thumbnail = page.resize((width, height), Image.LANCZOS)
+            thumbnail.save(os.path.join(settings.MEDIA_ROOT, preview_folder,
+                                        f'{base_filename}-{size}.{extension}'),
+                           settings.PREVIEW_THUMBNAIL_FORMAT, quality=80)
+        return os.path.join(preview_folder, f'{base_filename}-{largest}.{extension}')
+
+
+def variant_name(name, size):
+    """Variant name
+
+    Returns the name of the thumbnail of the given size from the name of the preview which is
+    stored with the content. Previews generated before there were several sizes only have
+    one variant.
+
+    :param name: The name of the preview
+    :type name: str
+    :param size: The size of the thumbnail, one of PREVIEW_THUMBNAIL_WIDTHS
+    :type size: str
+
+    :return: the name of the thumbnail
+    :rtype: str
+    """
+    root, extension = os.path.splitext(name)
+    base, _, current = root.rpartition('-')
+    if not base or current not in settings.PREVIEW_THUMBNAIL_WIDTHS:
+        return name
+    return f'{base}-{size}{extension}'
 
 
 class BaseSourceModel(models.Model):
@@ -292,6 +331,8 @@ class MDContent(BaseContentModel):
     :type MDContent.md: FileField
     :attr MDContent.textfield: The md code of this content
     :type MDContent.source: TextField
+    :attr MDContent.html: The HTML rendered from the md code with relative attachment paths
+    :type MDContent.html: TextField
     :attr MDContent.source: The source of this content
     :type MDContent.source: TextField
     """
@@ -306,6 +347,9 @@ class MDContent(BaseContentModel):
     textfield = models.TextField(verbose_name=_("Markdown Script"),
                                  help_text=_("Insert your Markdown script here:"),
                                  blank=True)
+    html = models.TextField(verbose_name=_("Rendered HTML"),
+                            blank=True,
+                            editable=False)
     source = models.TextField(verbose_name=_("Source"))
 
     class Meta:
@@ -435,6 +479,131 @@ class AnkiDeck(BaseContentModel):
         return contents.filter(ankideck__isnull=False)
 
 
+class YTVideoMetadata(models.Model):
+    """YouTube video metadata
+
+    This model caches the metadata of YouTube videos fetched by the backend configured
+    by YT_METADATA_BACKEND. The metadata is fetched again once it is older than
+    YT_METADATA_TTL seconds. Exports and other render paths only read the cache, so
+    that they never wait for the YouTube Data API.
+
+    :attr YTVideoMetadata.video_id: The id of the YouTube video
+    :type YTVideoMetadata.video_id: CharField
+    :attr YTVideoMetadata.title: The title of the video
+    :type YTVideoMetadata.title: TextField
+    :attr YTVideoMetadata.duration: The length of the video in seconds
+    :type YTVideoMetadata.duration: FloatField
+    :attr YTVideoMetadata.fetched_at: The date when the metadata was fetched
+    :type YTVideoMetadata.fetched_at: DateTimeField
+    """
+    video_id = models.CharField(verbose_name=_("Video ID"),
+                                max_length=64,
+                                primary_key=True)
+    title = models.TextField(verbose_name=_("Title"),
+                             blank=True)
+    duration = models.FloatField(verbose_name=_("Duration"))
+    fetched_at = models.DateTimeField(verbose_name=_("Fetched at"))
+
+    class Meta:
+        """Meta options
+
+        This class handles all possible meta options that you can give to this model.
+
+        :attr Meta.verbose_name: A human-readable name for the object in singular
+        :type Meta.verbose_name: __proxy__
+        :attr Meta.verbose_name_plural: A human-readable name for the object in plural
+        :type Meta.verbose_name_plural: __proxy__
+        """
+        verbose_name = _("YouTube Video Metadata")
+        verbose_name_plural = _("YouTube Video Metadata")
+
+    def __str__(self):
+        """String representation
+
+        Returns the string representation of this object.
+
+        :return: the string representation of this object
+        :rtype: str
+        """
+        return f"{self.video_id}"
+
+    @property
+    def stale(self):
+        """Stale
+
+        Returns whether the metadata is older than YT_METADATA_TTL seconds.
+
+        :return: true if the metadata should be fetched again
+        :rtype: bool
+        """
+        return self.fetched_at < timezone.now() - timedelta(seconds=settings.YT_METADATA_TTL)
+
+    @classmethod
+    def cached(cls, ids):
+        """Cached
+
+        Returns the cached metadata of the YouTube videos with the given ids with a
+        single query, even if it is stale. The metadata is never fetched.
+
+        :param ids: The ids of the YouTube videos
+        :type ids: Iterable[str]
+
+        :return: the cached metadata by the ids of the videos
+        :rtype: dict[str, YTVideoMetadata]
+        """
+        return cls.objects.in_bulk(list(set(ids)))
+
+    @classmethod
+    def lookup(cls, ids):
+        """Lookup
+
+        Returns the metadata of the YouTube videos with the given ids. The metadata which
+        is missing or stale is fetched with as few requests as the backend allows and
+        stored. If fetching fails, the stale metadata is returned.
+
+        :param ids: The ids of the YouTube videos
+        :type ids: Iterable[str]
+
+        :return: the metadata by the ids of the videos, unknown videos are missing
+        :rtype: dict[str, YTVideoMetadata]
+        """
+        ids = set(ids)
+        metadata = cls.cached(ids)
+        outdated = [video_id for video_id in ids
+                    if video_id not in metadata or metadata[video_id].stale]
+        if not outdated:
+            return metadata
+        try:
+            fetched = metadata_backend().fetch(outdated)
+        except (OSError, ValueError, KeyError) as error:
+            logger.warning("Fetching the metadata of YouTube videos failed: %s", error)
+            return metadata
+        now = timezone.now()
+        for video_id, values in fetched.items():
+            metadata[video_id], _created = cls.objects.update_or_create(
+                video_id=video_id,
+                defaults={'title': values.get('title', ''),
+                          'duration': values['duration'],
+                          'fetched_at': now})
+        return metadata
+
+    @classmethod
+    def length(cls, video_id):
+        """Length
+
+        Returns the length of the YouTube video with the given id in seconds, fetching it
+        if it is not cached or stale.
+
+        :param video_id: The id of the YouTube video
+        :type video_id: str
+
+        :return: the length of the video in seconds or None if it is unknown
+        :rtype: float or None
+        """
+        metadata = cls.lookup([video_id]).get(video_id)
+        return metadata.duration if metadata is not None else None
+
+
 class YTVideoContent(BaseContentModel):
     """YouTube video model
 
@@ -519,7 +688,9 @@ class YTVideoContent(BaseContentModel):
         if not colon_pattern.match(self.end_time):
             raise ValidationError(_("Please input a correct format for your ending time."))
 
-        seconds = get_video_length(self.id)
+        seconds = YTVideoMetadata.length(self.id)
+        if seconds is None:
+            raise ValidationError(_("The length of the video could not be determined."))
         start_time = timestamp_to_seconds(self.start_time)
         end_time = timestamp_to_seconds(self.end_time)
         if end_time == 0:
@@ -0,0 +1,123 @@
+"""Purpose of this file
+
+This file contains the generation of the preview thumbnails outside of the request. The
+thumbnails of a content are generated by a background thread after the transaction saving
+the content was committed, until then the content shows a placeholder.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from base.models import Content
+from content.models import CONTENT_TYPES, BasePDFModel, variant_name
+
+logger = logging.getLogger(__name__)
+
+# list[str]: The types of the contents which have a preview
+PREVIEW_TYPES = [content_type for content_type, model in CONTENT_TYPES.items()
+                 if issubclass(model, BasePDFModel)]
+
+# The executor of the preview generations of this process, created on first use
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    """Executor
+
+    Returns the executor which generates the previews with at most PREVIEW_WORKERS threads.
+
+    :return: the executor of the preview generations
+    :rtype: ThreadPoolExecutor
+    """
+    global _executor  # pylint: disable=global-statement
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.PREVIEW_WORKERS,
+                                           thread_name_prefix='preview')
+    return _executor
+
+
+def generate_preview(content_id):
+    """Generate preview
+
+    Generates the preview thumbnails of the content with the given id and stores the name
+    of the preview with the content. Only the preview is saved outside of a revision, so
+    that no revision is created, but the signals of the content are sent.
+
+    :param content_id: The id of the content
+    :type content_id: int
+
+    :return: the name of the preview or None if the content has no PDF
+    :rtype: str or None
+    """
+    content = Content.objects.filter(pk=content_id).first()
+    if content is None or content.type not in PREVIEW_TYPES:
+        return None
+    model = CONTENT_TYPES[content.type].objects.get(pk=content_id)
+    if not model.pdf:
+        return None
+    content.preview = model.generate_preview()
+    content.save(update_fields=['preview'])
+    return content.preview
+
+
+def run(content_id):
+    """Run
+
+    Generates the preview of the content with the given id in a thread of the executor.
+    Errors are logged since nobody waits for the result.
+
+    :param content_id: The id of the content
+    :type content_id: int
+    """
+    try:
+        generate_preview(content_id)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception('Preview of content %s could not be generated', content_id)
+    finally:
+        # The thread is not managed by Django, so its connection is not closed otherwise
+        connection.close()
+
+
+def delete_preview(storage, name):
+    """Delete preview
+
+    Deletes the thumbnails of all sizes of the preview with the given name from the storage.
+    Errors are logged, since a left over thumbnail only wastes space.
+
+    :param storage: The storage of the preview
+    :type storage: Storage
+    :param name: The name of the preview
+    :type name: str
+    """
+    names = {name} | {variant_name(name, size) for size in settings.PREVIEW_THUMBNAIL_WIDTHS}
+    for thumbnail in names:
+        try:
+            storage.delete(thumbnail)
+        except OSError:
+            logger.exception('Thumbnail %s could not be deleted', thumbnail)
+
+
+def schedule_preview(content):
+    """Schedule preview
+
+    Removes the preview of the given content, which is shown as placeholder from now on,
+    and generates its thumbnails after the current transaction was committed. The thumbnails
+    of the previous preview are deleted after the commit before the new ones are generated.
+    The content must be saved by the caller.
+
+    :param content: The content whose preview is generated
+    :type content: Content
+    """
+    if content.preview:
+        storage, name = content.preview.storage, content.preview.name
+        transaction.on_commit(lambda: delete_preview(storage, name))
+    content.preview = None
+    if content.type in PREVIEW_TYPES:
+        content_id = content.pk
+        transaction.on_commit(lambda: executor().submit(run, content_id))
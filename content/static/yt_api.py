@@ -2,13 +2,13 @@ import json
 import math
 import isodate
 import urllib
+import urllib.parse
+import urllib.request
 
 from django.conf import settings
+from django.utils.module_loading import import_string
 from django.utils.translation import gettext_lazy as _
 
-yt_api_key = settings.YT_API_KEY
-
-
 def seconds_to_time(seconds_total):
     """Seconds to Time
 
@@ -88,10 +88,92 @@ def timestamp_to_seconds(timestamp):
     seconds = int(hour) * 3600 + int(minute) * 60 + int(second)
     return seconds
 
+class YouTubeDataBackend:
+    """YouTube Data API backend
+
+    Fetches the metadata of YouTube videos from the YouTube Data API. The API accepts up
+    to 50 ids per request, so the metadata of up to 50 videos is fetched by a single
+    request.
+
+    :attr YouTubeDataBackend.url: The URL of the videos endpoint of the API
+    :type YouTubeDataBackend.url: str
+    :attr YouTubeDataBackend.batch_size: The maximum number of ids per request
+    :type YouTubeDataBackend.batch_size: int
+    :attr YouTubeDataBackend.timeout: The timeout of a request in seconds
+    :type YouTubeDataBackend.timeout: int
+    """
+    url = "https://www.googleapis.com/youtube/v3/videos"
+    batch_size = 50
+    timeout = 10
+
+    def fetch(self, ids):
+        """Fetch
+
+        Fetches the metadata of the YouTube videos with the given ids. Videos which do not
+        exist are not contained in the result.
+
+        :param ids: The ids of the YouTube videos
+        :type ids: list[str]
+
+        :return: the title and the length in seconds of the videos by their id
+        :rtype: dict[str, dict]
+        """
+        ids = list(dict.fromkeys(ids))
+        metadata = {}
+        for start in range(0, len(ids), self.batch_size):
+            query = urllib.parse.urlencode({'id': ','.join(ids[start:start + self.batch_size]),
+                                            'key': settings.YT_API_KEY,
+                                            'part': 'contentDetails,snippet'})
+            with urllib.request.urlopen(f"{self.url}?{query}", timeout=self.timeout) as response:
+                data = json.loads(response.read())
+            for item in data['items']:
+                duration = isodate.parse_duration(item['contentDetails']['duration'])
+                metadata[item['id']] = {'title': item['snippet']['title'],
+                                        'duration': duration.total_seconds()}
+        return metadata
+
+
+class StubBackend:
+    """Stub backend
+
+    Returns the metadata of YouTube videos from the setting YT_METADATA_STUB, which maps
+    the ids of the videos to their title and length in seconds. This backend is used by
+    tests and by deployments without access to the YouTube Data API.
+    """
+
+    def fetch(self, ids):
+        """Fetch
+
+        Returns the metadata of the YouTube videos with the given ids which are contained
+        in the setting YT_METADATA_STUB.
+
+        :param ids: The ids of the YouTube videos
+        :type ids: list[str]
+
+        :return: the title and the length in seconds of the videos by their id
+        :rtype: dict[str, dict]
+        """
+        return {video_id: dict(settings.YT_METADATA_STUB[video_id])
+                for video_id in ids if video_id in settings.YT_METADATA_STUB}
+
+
+def metadata_backend():
+    """Metadata backend
+
+    Returns an instance of the backend fetching the metadata of YouTube videos which is
+    configured by the setting YT_METADATA_BACKEND.
+
+    :return: the backend
+    :rtype: YouTubeDataBackend or StubBackend
+    """
+    return import_string(settings.YT_METADATA_BACKEND)()
+
+
 def get_video_length(id):
     """Get Video Length
 
-    Gets the length of a YouTube video in seconds from a YouTube id
+    Gets the length of a YouTube video in seconds from a YouTube id. The length is
+    fetched by the configured backend, use YTVideoMetadata to read it from the cache.
 
     :attr id: the id of the YouTube video to get the length from
     :type id: str
@@ -99,13 +181,7 @@ def get_video_length(id):
     :return: the length of the video in seconds
     :rtype: float
     """
-    yt_url = "https://www.googleapis.com/youtube/v3/videos?id="+id+"&key="+yt_api_key+"&part=contentDetails"
-    response = urllib.request.urlopen(yt_url).read()
-    data = json.loads(response)
-    data_items=data['items']
-    duration=data_items[0]['contentDetails']['duration']
-    dur = isodate.parse_duration(duration)
-    return dur.total_seconds()
+    return metadata_backend().fetch([id])[id]['duration']
 
 def time_to_string(total_hours, total_minutes, total_seconds):
     vid_len = ""
@@ -0,0 +1,563 @@
+"""Purpose of this file
+
+This file contains the content-addressed cache for compiled LaTeX documents and the
+cache for pre rendered contents.
+"""
+
+import hashlib
+import io
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.template.loader import get_template
+from django.utils.translation import get_language
+
+from export.templatetags.cc_export_tags import export_template, ret_path
+
+
+class CompileCache:
+    """Compile cache
+
+    Stores compiled PDFs together with the pdflatex output on the disk. An entry is
+    addressed by a hash over the rendered LaTeX source and the data of every file
+    referenced by it (attachments, included PDFs), so an unchanged document can be
+    served without running pdflatex again. The size of the cache is bounded, if it
+    is exceeded the least recently used entries will be evicted.
+
+    The location and the maximum size of the cache are configured by the settings
+    LATEX_COMPILE_CACHE_DIR and LATEX_COMPILE_CACHE_MAX_SIZE, a maximum size of 0
+    disables the cache.
+
+    :attr CompileCache.reference_pattern: The pattern of file references in LaTeX code
+    :type CompileCache.reference_pattern: re.Pattern
+    :attr CompileCache.chunk_size: The size of the chunks in which files are read
+    :type CompileCache.chunk_size: int
+    :attr CompileCache.pdf_name: The file name of the cached PDF
+    :type CompileCache.pdf_name: str
+    :attr CompileCache.log_name: The file name of the cached pdflatex output
+    :type CompileCache.log_name: str
+    :attr CompileCache.tex_name: The file name of the cached LaTeX code
+    :type CompileCache.tex_name: str
+    :attr CompileCache.namespace: The name of the sub directory containing the entries
+    :type CompileCache.namespace: str
+    :attr CompileCache.hits: The number of cache hits in this process
+    :type CompileCache.hits: int
+    :attr CompileCache.misses: The number of cache misses in this process
+    :type CompileCache.misses: int
+    :attr CompileCache.size: The estimated size of the cache or None if it is not known yet
+    :type CompileCache.size: int or None
+    :attr CompileCache.scanned_at: The time the size was last determined by a scan
+    :type CompileCache.scanned_at: float
+    :attr CompileCache.scan_interval: The seconds after which the size is determined again,
+                                      since other processes store entries too
+    :type CompileCache.scan_interval: int
+    """
+    reference_pattern = re.compile(rb'\\include(?:graphics|pdf)\s*(?:\[[^\]]*\])?\s*{([^}]*)}')
+    chunk_size = 64 * 1024
+    pdf_name = 'texput.pdf'
+    log_name = 'texput.log'
+    tex_name = 'texput.tex'
+    scan_interval = 5 * 60
+
+    def __init__(self, namespace='documents'):
+        """Initializer
+
+        Initializes the cache with an empty hit and miss counter.
+
+        :param namespace: The name of the sub directory containing the entries
+        :type namespace: str
+        """
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self.size = None
+        self.scanned_at = 0.0
+
+    @property
+    def directory(self):
+        """Directory
+
+        Returns the directory where the entries of this cache are stored.
+
+        :return: the path of the cache directory
+        :rtype: str
+        """
+        return os.path.join(settings.LATEX_COMPILE_CACHE_DIR, self.namespace)
+
+    @property
+    def enabled(self):
+        """Enabled
+
+        Returns whether the cache is enabled.
+
+        :return: true if the cache is enabled
+        :rtype: bool
+        """
+        return settings.LATEX_COMPILE_CACHE_MAX_SIZE > 0
+
+    @staticmethod
+    def hash_file(path, digest, name=None):
+        """Hash file
+
+        Updates the given digest with the name and the data of the file. The file is read
+        in chunks so that memory is not overloaded. A missing file only contributes its name.
+
+        :param path: The path of the file
+        :type path: str
+        :param digest: The digest to update
+        :type digest: hashlib._Hash
+        :param name: The name of the file in the key or None for its path
+        :type name: str or None
+        """
+        digest.update((path if name is None else name).encode('utf-8'))
+        try:
+            with open(path, 'rb') as file:
+                for chunk in iter(lambda: file.read(CompileCache.chunk_size), b''):
+                    digest.update(chunk)
+        except OSError:
+            digest.update(b'\0missing')
+
+    @staticmethod
+    def key(rendered_tpl, directory=None):
+        """Cache key
+
+        Computes the key of the given LaTeX code. The key is a hash over the code itself and
+        over the data of every file which is referenced by an includegraphics or includepdf
+        command. Relative paths are resolved against the given directory, but only the
+        reference as written in the code is hashed, so that the same document compiled in
+        another directory has the same key.
+
+        :param rendered_tpl: The rendered LaTeX code
+        :type rendered_tpl: bytes
+        :param directory: The directory in which the code will be compiled
+        :type directory: str or None
+
+        :return: the hexadecimal cache key
+        :rtype: str
+        """
+        return CompileCache.key_stream(io.BytesIO(rendered_tpl), directory)
+
+    @staticmethod
+    def key_stream(stream, directory=None):
+        """Cache key of a stream
+
+        Computes the key of the LaTeX code read line by line from the given binary stream,
+        see key. The code is not kept in memory.
+
+        :param stream: The binary stream of the rendered LaTeX code
+        :type stream: BinaryIO
+        :param directory: The directory in which the code will be compiled
+        :type directory: str or None
+
+        :return: the hexadecimal cache key
+        :rtype: str
+        """
+        digest = hashlib.sha256()
+        paths = []
+        for line in stream:
+            digest.update(line)
+            for match in CompileCache.reference_pattern.finditer(line):
+                paths.append(match.group(1).decode('utf-8', errors='ignore').strip())
+        for reference in paths:
+            path = reference
+            if directory is not None and not os.path.isabs(path):
+                path = os.path.join(directory, path)
+            CompileCache.hash_file(path, digest, reference)
+        return digest.hexdigest()
+
+    def entry_path(self, key):
+        """Entry path
+
+        Returns the directory of the entry with the given key.
+
+        :param key: The key of the entry
+        :type key: str
+
+        :return: the path of the entry directory
+        :rtype: str
+        """
+        return os.path.join(self.directory, key[:2], key)
+
+    def load(self, key, names):
+        """Load entry
+
+        Returns the data of the given files of the entry with the given key and marks the
+        entry as recently used. If there is no such entry, None will be returned.
+
+        :param key: The key of the entry
+        :type key: str
+        :param names: The names of the files to load
+        :type names: list[str]
+
+        :return: the data of the files in the given order
+        :rtype: list[bytes] or None
+        """
+        if not self.enabled:
+            return None
+        path = self.entry_path(key)
+        data = []
+        try:
+            for name in names:
+                with open(os.path.join(path, name), 'rb') as file:
+                    data.append(file.read())
+            # Mark entry as recently used
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def store(self, key, files):
+        """Store entry
+
+        Stores the given files under the given key. A file is either given by its data or
+        by the path of a file which is copied in chunks so that memory is not overloaded.
+        The entry is written into a temporary directory first and moved afterwards, so that
+        concurrent processes never read an incomplete entry. The size of the entry is added
+        to the estimated size of the cache, which is only scanned and shrunk to its maximum
+        size if the estimate exceeds it or the last scan is older than the scan interval.
+
+        :param key: The key of the entry
+        :type key: str
+        :param files: The data or the path of the files by their names
+        :type files: dict[str, bytes or str]
+        """
+        if not self.enabled:
+            return
+        path = self.entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = tempfile.mkdtemp(dir=os.path.dirname(path), prefix='.tmp-')
+        entry_size = 0
+        try:
+            for name, data in files.items():
+                if isinstance(data, str):
+                    shutil.copyfile(data, os.path.join(temp_path, name))
+                    entry_size += os.path.getsize(data)
+                    continue
+                with open(os.path.join(temp_path, name), 'wb') as file:
+                    file.write(data)
+                entry_size += len(data)
+            os.rename(temp_path, path)
+        except OSError:
+            # Another process stored the same entry in the meantime
+            shutil.rmtree(temp_path, ignore_errors=True)
+            entry_size = 0
+        if self.size is not None:
+            self.size += entry_size
+        if self.size is None or self.size > settings.LATEX_COMPILE_CACHE_MAX_SIZE \
+                or time.monotonic() - self.scanned_at > self.scan_interval:
+            self.evict()
+
+    def get(self, key):
+        """Get entry
+
+        Returns the cached PDF, the pdflatex output and the LaTeX code of the given key
+        and marks the entry as recently used. If there is no entry for the key, None will
+        be returned.
+
+        :param key: The key of the entry
+        :type key: str
+
+        :return: the cached PDF, PDF LaTeX output and the rendered template
+        :rtype: tuple[bytes, tuple[bytes, None], bytes] or None
+        """
+        data = self.load(key, [self.pdf_name, self.log_name, self.tex_name])
+        if data is None:
+            return None
+        pdf, log, tex = data
+        return pdf, (log, None), tex
+
+    def restore(self, key, directory):
+        """Restore entry
+
+        Copies the cached PDF and LaTeX code of the given key into the given directory as if
+        they were compiled there and marks the entry as recently used. The files are copied
+        in chunks so that memory is not overloaded.
+
+        :param key: The key of the entry
+        :type key: str
+        :param directory: The directory to copy the files to
+        :type directory: str
+
+        :return: the PDF LaTeX output or None if there is no entry
+        :rtype: tuple[bytes, None] or None
+        """
+        data = self.load(key, [self.log_name])
+        if data is None:
+            return None
+        path = self.entry_path(key)
+        try:
+            for name in (self.pdf_name, self.tex_name):
+                shutil.copyfile(os.path.join(path, name), os.path.join(directory, name))
+        except OSError:
+            return None
+        return data[0], None
+
+    def set_files(self, key, directory, pdflatex_output):
+        """Set entry from files
+
+        Stores the PDF and the LaTeX code compiled in the given directory under the given
+        key. Failed compilations are not stored.
+
+        :param key: The key of the entry
+        :type key: str
+        :param directory: The directory in which the code was compiled
+        :type directory: str
+        :param pdflatex_output: The PDF LaTeX output
+        :type pdflatex_output: tuple[bytes, bytes]
+        """
+        if not os.path.exists(os.path.join(directory, self.pdf_name)):
+            return
+        self.store(key, {self.pdf_name: os.path.join(directory, self.pdf_name),
+                         self.log_name: pdflatex_output[0] or b'',
+                         self.tex_name: os.path.join(directory, self.tex_name)})
+
+    def set(self, key, pdf, pdflatex_output, rendered_tpl):
+        """Set entry
+
+        Stores the given compilation result under the given key. Failed compilations
+        are not stored.
+
+        :param key: The key of the entry
+        :type key: str
+        :param pdf: The compiled PDF
+        :type pdf: bytes
+        :param pdflatex_output: The PDF LaTeX output
+        :type pdflatex_output: tuple[bytes, bytes]
+        :param rendered_tpl: The compiled LaTeX code
+        :type rendered_tpl: bytes
+        """
+        if pdf is None:
+            return
+        self.store(key, {self.pdf_name: pdf,
+                         self.log_name: pdflatex_output[0] or b'',
+                         self.tex_name: rendered_tpl})
+
+    def entries(self):
+        """Entries
+
+        Returns all entries of the cache with their last usage and their size.
+
+        :return: the list of entries as tuples of last usage, size and path
+        :rtype: list[tuple[float, int, str]]
+        """
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for prefix in os.scandir(self.directory):
+            if not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                if entry.name.startswith('.') or not entry.is_dir():
+                    continue
+                size = sum(file.stat().st_size for file in os.scandir(entry.path))
+                entries.append((entry.stat().st_mtime, size, entry.path))
+        return entries
+
+    def evict(self):
+        """Evict
+
+        Scans the cache and removes the least recently used entries until the size of the
+        cache does not exceed its maximum size. The remaining size is the new estimate.
+        """
+        entries = self.entries()
+        size = sum(entry[1] for entry in entries)
+        max_size = settings.LATEX_COMPILE_CACHE_MAX_SIZE
+        for _, entry_size, path in sorted(entries):
+            if size <= max_size:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            size -= entry_size
+        self.size = size
+        self.scanned_at = time.monotonic()
+
+    def clear(self):
+        """Clear
+
+        Removes all entries of the cache and resets the counters.
+        """
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+        self.scanned_at = time.monotonic()
+
+    def stats(self):
+        """Statistics
+
+        Returns the hit and miss counters of this process together with the number of entries
+        and the total size of the cache.
+
+        :return: the statistics of the cache
+        :rtype: dict[str, int]
+        """
+        entries = self.entries()
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(entries),
+                'size': sum(entry[1] for entry in entries)}
+
+
+class FragmentCache(CompileCache):
+    """Fragment cache
+
+    Stores the pre rendered LaTeX fragment of a content together with its side artifact
+    (the PDF converted from a Markdown content). The attachment paths are already resolved
+    in the fragment. An entry is addressed by the latest revision of the content, so an
+    export only renders the contents which changed since the last export.
+
+    :attr FragmentCache.fragment_name: The file name of the cached fragment
+    :type FragmentCache.fragment_name: str
+    :attr FragmentCache.artifact_name: The file name of the cached artifact
+    :type FragmentCache.artifact_name: str
+    """
+    fragment_name = 'fragment.tex'
+    artifact_name = 'artifact.pdf'
+
+    def __init__(self, namespace='fragments'):
+        """Initializer
+
+        Initializes the cache with an empty hit and miss counter.
+
+        :param namespace: The name of the sub directory containing the entries
+        :type namespace: str
+        """
+        super().__init__(namespace)
+
+    @staticmethod
+    def fragment_key(content, revision_id, export_flag):
+        """Fragment key
+
+        Computes the key of the fragment of the given content. Besides the revision, the key
+        contains the data which is rendered into the fragment but not versioned with the
+        content: the title of the topic, the active language and the source of the template.
+
+        :param content: The content of the fragment
+        :type content: Content
+        :param revision_id: The id of the latest revision of the content
+        :type revision_id: int or None
+        :param export_flag: True if export, False if simple content compilation
+        :type export_flag: bool
+
+        :return: the hexadecimal cache key or None if the content has no revision
+        :rtype: str or None
+        """
+        if revision_id is None:
+            return None
+        digest = hashlib.sha256()
+        digest.update(get_template(export_template(content.type)).template.source.encode('utf-8'))
+        data = f'\0{content.pk}:{revision_id}:{export_flag}:{content.topic.title}:{get_language()}'
+        digest.update(data.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get_fragment(self, key):
+        """Get fragment
+
+        Returns the cached fragment and the path of the cached artifact of the given key.
+        If the entry has no artifact, None will be returned as path.
+
+        :param key: The key of the entry
+        :type key: str
+
+        :return: the fragment and the path of the artifact or None if there is no entry
+        :rtype: tuple[bytes, str or None] or None
+        """
+        data = self.load(key, [self.fragment_name])
+        if data is None:
+            return None
+        artifact_path = os.path.join(self.entry_path(key), self.artifact_name)
+        if not os.path.exists(artifact_path):
+            artifact_path = None
+        return data[0], artifact_path
+
+    def set_fragment(self, key, fragment, artifact=None):
+        """Set fragment
+
+        Stores the given fragment and artifact under the given key.
+
+        :param key: The key of the entry
+        :type key: str
+        :param fragment: The pre rendered fragment
+        :type fragment: bytes
+        :param artifact: The data or the path of the side artifact of the fragment
+        :type artifact: bytes or str or None
+        """
+        files = {self.fragment_name: fragment}
+        if artifact is not None:
+            files[self.artifact_name] = artifact
+        self.store(key, files)
+
+
+class PreviewCache(CompileCache):
+    """Preview cache
+
+    Stores the compiled previews of LaTeX contents. An entry is addressed by a hash over
+    the data of the preview request (the LaTeX code and the attachments), so an identical
+    preview request is answered without rendering the template, writing the attachments
+    and compiling the document.
+    """
+
+    def __init__(self, namespace='previews'):
+        """Initializer
+
+        Initializes the cache with an empty hit and miss counter.
+
+        :param namespace: The name of the sub directory containing the entries
+        :type namespace: str
+        """
+        super().__init__(namespace)
+
+    @staticmethod
+    def preview_key(text, formset, topic, user, template_name):
+        # pylint: disable=too-many-arguments
+        """Preview key
+
+        Computes the key of the preview of the given LaTeX code. Besides the code, the key
+        contains the data of every attachment, the data of the header (topic, user and the
+        active language) and the source of the templates.
+
+        :param text: The LaTeX code of the preview
+        :type text: str
+        :param formset: The valid image formset containing the attachments of the preview
+        :type formset: LatexPreviewImageAttachmentFormSet
+        :param topic: The topic of the preview
+        :type topic: Topic
+        :param user: The user requesting the preview
+        :type user: Profile
+        :param template_name: The name of the template of the document
+        :type template_name: str
+
+        :return: the hexadecimal cache key
+        :rtype: str
+        """
+        digest = hashlib.sha256()
+        for name in (template_name, export_template('Latex')):
+            digest.update(get_template(name).template.source.encode('utf-8'))
+        digest.update(f'\0{topic.title}\0{user}\0{get_language()}\0'.encode('utf-8'))
+        digest.update(text.encode('utf-8'))
+        for idx, form in enumerate(formset):
+            attachment = form.save(commit=False).image
+            digest.update(f'\0Image-{idx}\0'.encode('utf-8'))
+            if '/' in attachment.name:
+                # The attachment is already saved in the server
+                CompileCache.hash_file(ret_path(attachment.url), digest)
+            else:
+                digest.update(attachment.name.encode('utf-8'))
+                for chunk in attachment.chunks():
+                    digest.update(chunk)
+        return digest.hexdigest()
+
+
+# CompileCache: Cache for compiled documents (content compilation, export)
+compile_cache = CompileCache()
+
+# FragmentCache: Cache for pre rendered contents (export)
+fragment_cache = FragmentCache()
+
+# PreviewCache: Cache for compiled previews of LaTeX contents
+preview_cache = PreviewCache()
@@ -0,0 +1,76 @@
+"""Purpose of this file
+
+This file contains the functions loading the contents of an export with a constant number
+of queries.
+"""
+
+from collections import defaultdict
+
+from django.db.models import Prefetch
+
+from base.models import Content, CourseStructureEntry, Favorite
+from content.attachment.models import ImageAttachment
+from content.models import CONTENT_TYPES
+
+
+def export_queryset():
+    """Export queryset
+
+    Returns the queryset of contents which loads everything the export templates access:
+    the topic, the row of the content type and the image attachments. The attachments are
+    ordered by their creation, since their position is referenced by the contents.
+
+    :return: the queryset of contents
+    :rtype: QuerySet[Content]
+    """
+    content_types = [model._meta.get_field('content').related_query_name()
+                     for model in CONTENT_TYPES.values()]
+    return Content.objects \
+        .select_related('topic', *content_types) \
+        .prefetch_related(Prefetch('ImageAttachments',
+                                   queryset=ImageAttachment.objects.order_by('pk')))
+
+
+def course_contents(course):
+    """Course contents
+
+    Returns the contents of the course in the order of its structure. The contents of a
+    topic are ordered by their creation. Independent of the size of the course, three
+    queries are executed.
+
+    :param course: The course to export
+    :type course: Course
+
+    :return: the contents of the course
+    :rtype: list[Content]
+    """
+    topic_ids = list(CourseStructureEntry.objects.filter(course=course)
+                     .order_by('position', 'sub_position')
+                     .values_list('topic_id', flat=True))
+    contents = defaultdict(list)
+    for content in export_queryset() \
+            .filter(topic_id__in=set(topic_ids)) \
+            .order_by('pk'):
+        contents[content.topic_id].append(content)
+    return [content for topic_id in topic_ids for content in contents[topic_id]]
+
+
+def coursebook_contents(course, profile):
+    """Coursebook contents
+
+    Returns the contents of the coursebook of the user in the order they were added.
+    Independent of the size of the coursebook, three queries are executed.
+
+    :param course: The course to export
+    :type course: Course
+    :param profile: The user of the coursebook
+    :type profile: Profile
+
+    :return: the contents of the coursebook
+    :rtype: list[Content]
+    """
+    content_ids = list(Favorite.objects.filter(user=profile, course=course)
+                       .order_by('pk')
+                       .values_list('content_id', flat=True))
+    contents = export_queryset().in_bulk(content_ids)
+    return [contents[content_id] for content_id in content_ids]
@@ -3,59 +3,169 @@
 This file contains utility functions related to exporting and rendering files.
 """
 
+import hashlib
+import logging
 import os
 import re
+import shutil
 import tempfile
-from subprocess import Popen, PIPE
+from concurrent.futures import ThreadPoolExecutor
+from subprocess import run, PIPE, DEVNULL, SubprocessError
 import pdfkit
-from markdown_it import MarkdownIt
-from mdit_py_plugins.front_matter import front_matter_plugin
-from mdit_py_plugins.footnote import footnote_plugin
 
+from reversion.models import Version
+
+from django.conf import settings
+from django.db.models import Max
 from django.template.loader import get_template
 
+from base.models import Content
+from export.cache import compile_cache, fragment_cache
+from export.preamble import PreambleFormat
+from export.references import render_markdown, resolve_tex_references
+from export.runner import compile_runner
 from export.templatetags.cc_export_tags import export_template, tex_escape, ret_path
-from content.static.yt_api import seconds_to_time, get_video_length, time_to_string
+from content.models import MDContent, YTVideoMetadata
+from content.static.yt_api import seconds_to_time, time_to_string
+
+logger = logging.getLogger(__name__)
 
 
-class Markdown: # pylint: disable=too-few-public-methods
+class Markdown:
     """Markdown
 
-    This class provides the function for rendering Markdown into HTML.
+    This class provides the functions for rendering Markdown into HTML and PDF.
+
+    :attr Markdown.batch_name: The file name of the PDF of all Markdown contents of an export
+    :type Markdown.batch_name: str
+    :attr Markdown.section_marker: The pattern of the marker text starting a section of the
+                                   batch PDF
+    :type Markdown.section_marker: re.Pattern
     """
+    batch_name = 'MD_batch.pdf'
+    section_marker = re.compile(r'ccmdsection(\d+)ccmdsection')
+
     @staticmethod
-    def render(content, is_absolute):
+    def render(content, is_absolute, text=None):
         """Render
 
-        Replaces all attachment embedding code in the Markdown content with the path of
-        the corresponding attachment, either relative or absolute,
-        then compiles and returns the HTML from the Markdown content.
+        Compiles and returns the HTML from the Markdown content. The attachment embedding
+        code is resolved to the path of the corresponding attachment, either relative or
+        absolute, while the Markdown code is parsed.
 
         :param content: Markdown content to compile HTML from
         :type content: MDContent
         :param is_absolute: decides whether absolute or relative path will be used
         :type is_absolute: bool
+        :param text: The Markdown code to render, by default the code of the content
+        :type text: str or None
         """
-        text = content.mdcontent.textfield
-        if content.ImageAttachments.count() > 0:
-            attachments = content.ImageAttachments.all()
-            for idx, attachment in enumerate(attachments):
-                if is_absolute:
-                    path = ret_path(attachment.image.url)
-                else:
-                    path = attachment.image.url
-                text = re.sub(rf"!\[(.*?)]\(Image-{idx}(.*?)\)",
-                              rf"![\1]({path}\2)",
-                              text)
-        md_instance = (
-            MarkdownIt()
-            .use(front_matter_plugin)
-            .use(footnote_plugin)
-            .enable('table')
-            .enable('strikethrough')
-            .enable('linkify')
-        )
-        return md_instance.render(text)
+        if text is None:
+            text = content.mdcontent.textfield
+        if is_absolute:
+            paths = [ret_path(attachment.image.url)
+                     for attachment in content.ImageAttachments.all()]
+        else:
+            paths = [attachment.image.url for attachment in content.ImageAttachments.all()]
+        return render_markdown(text, paths)
+
+    @staticmethod
+    def stored_html(content):
+        """Stored HTML
+
+        Returns the HTML of the Markdown content with relative paths which is stored with
+        the content, so that views do not render the Markdown code. If the HTML was not
+        stored yet, it is rendered and stored.
+
+        :param content: Markdown content to return the HTML of
+        :type content: Content
+
+        :return: the HTML of the Markdown content
+        :rtype: str
+        """
+        md_content = content.mdcontent
+        if not md_content.html and md_content.textfield:
+            md_content.html = Markdown.render(content, False)
+            MDContent.objects.filter(pk=md_content.pk).update(html=md_content.html)
+        return md_content.html
+
+    @staticmethod
+    def export_html(content):
+        """Export HTML
+
+        Returns the HTML of the Markdown content for an export, i.e. with absolute paths and
+        a header of the topic and the description.
+
+        :param content: Markdown content to compile HTML from
+        :type content: Content
+
+        :return: the HTML of the Markdown content
+        :rtype: str
+        """
+        return f"<h2><span style=\"font-weight:bold\">{content.topic.title}" \
+               + "</span></h2><i>" \
+               + "Description" \
+               + f":</i> {tex_escape(content.description)}" \
+               + Markdown.render(content, True)
+
+    @staticmethod
+    def write_batch_pdf(sections, path, options):
+        """Write batch PDF
+
+        Converts the given HTML sections into one PDF with a single wkhtmltopdf run, every
+        section starts on a new page. The first page of a section is found by an invisible
+        marker text, which is extracted with pdftotext. This function does not access the
+        database.
+
+        :param sections: The HTML of the sections
+        :type sections: list[str]
+        :param path: The path of the PDF file
+        :type path: str
+        :param options: The options for wkhtmltopdf
+        :type options: dict[str, str]
+
+        :return: the page ranges of the sections or None if the sections could not be found
+        :rtype: list[str] or None
+        """
+        marker_style = 'font-size:1px;line-height:1px;margin:0;color:#fff'
+        html = "<meta charset='UTF-8'>"
+        for idx, section in enumerate(sections):
+            page_break = 'page-break-before:always;' if idx > 0 else ''
+            html += f'<div style="{page_break}{marker_style}">' \
+                    f'ccmdsection{idx}ccmdsection</div>{section}'
+        Markdown.write_pdf(html, path, options)
+        try:
+            text = run(['pdftotext', '-enc', 'UTF-8', path, '-'], stdin=DEVNULL, stdout=PIPE,
+                       stderr=DEVNULL, timeout=60, check=True).stdout.decode('utf-8', 'ignore')
+        except (OSError, SubprocessError):
+            return None
+        starts = {}
+        for page, page_text in enumerate(text.split('\f'), 1):
+            for match in Markdown.section_marker.finditer(page_text):
+                starts.setdefault(int(match.group(1)), page)
+        starts = [starts.get(idx) for idx in range(len(sections))]
+        if None in starts or any(start >= end for start, end in zip(starts, starts[1:])):
+            return None
+        ends = [str(start - 1) for start in starts[1:]] + ['']
+        return [f'{start}-{end}' for start, end in zip(starts, ends)]
+
+    @staticmethod
+    def write_pdf(html, path, options):
+        """Write PDF
+
+        Converts the given HTML into a PDF with wkhtmltopdf and writes it to the given path.
+        This function does not access the database, so it can be called from a worker thread.
+
+        :param html: The HTML rendered from the Markdown content
+        :type html: str
+        :param path: The path of the PDF file
+        :type path: str
+        :param options: The options for wkhtmltopdf
+        :type options: dict[str, str]
+        """
+        pdf = pdfkit.from_string(html, options=options)
+        with open(path, 'wb') as temp_pdf:
+            temp_pdf.write(pdf)
 
 
 class Latex:
@@ -71,22 +181,90 @@ class Latex:
     :type Latex.error_prefix: str
     :attr Latex.error_template: The name of the error template
     :type Latex.error_template: str
+    :attr Latex.aux_files: The auxiliary files written by pdflatex which are read by the next
+                           pass
+    :type Latex.aux_files: list[str]
+    :attr Latex.tex_file: The name of the file containing the LaTeX code
+    :type Latex.tex_file: str
+    :attr Latex.pdf_file: The name of the PDF compiled by pdflatex
+    :type Latex.pdf_file: str
     """
     encoding = 'utf-8'
     error_prefix = '!'
     error_template = 'error'
+    aux_files = ['texput.aux', 'texput.toc', 'texput.out']
+    tex_file = 'texput.tex'
+    pdf_file = 'texput.pdf'
+
+    @staticmethod
+    def aux_state(directory):
+        """Auxiliary state
+
+        Returns the hashes of the auxiliary files in the given directory. A missing file
+        has no hash.
+
+        :param directory: The directory in which the LaTeX code is compiled
+        :type directory: str
+
+        :return: the hashes of the auxiliary files
+        :rtype: list[str or None]
+        """
+        state = []
+        for name in Latex.aux_files:
+            try:
+                with open(os.path.join(directory, name), 'rb') as file:
+                    state.append(hashlib.sha256(file.read()).hexdigest())
+            except OSError:
+                state.append(None)
+        return state
+
+    @staticmethod
+    def compile(directory, max_passes=1, fmt=None):
+        """Compile
+
+        Compiles the LaTeX code texput.tex in the given directory, which is piped to pdflatex
+        from the file so that it is not kept in memory. pdflatex is run until the auxiliary
+        files (cross references, table of contents, bookmarks) did not change during a pass,
+        i.e. the PDF of the last pass was built from final auxiliary data, or until the
+        maximum number of passes is reached. If a pass produces errors, no further passes
+        are run. If LATEX_HALT_ON_ERROR is set, pdflatex additionally stops at the first error.
+        Every pass is run by the compile runner with its timeout and resource limits.
+
+        :param directory: The directory in which the LaTeX code is compiled
+        :type directory: str
+        :param max_passes: The maximum number of passes
+        :type max_passes: int
+        :param fmt: The name of the preamble format to load
+        :type fmt: str or None
+
+        :return: the PDF LaTeX output of the last pass and the number of passes
+        :rtype: tuple[tuple[bytes, bytes], int]
+        """
+        args = ['pdflatex']
+        if settings.LATEX_HALT_ON_ERROR:
+            args.append('-halt-on-error')
+        if fmt is not None:
+            args.append(f'-fmt={fmt}')
+        state = Latex.aux_state(directory)
+        passes = 0
+        while True:
+            with open(os.path.join(directory, Latex.tex_file), 'rb') as tex:
+                # Output is a byte tuple of stdout and stderr
+                pdflatex_output = compile_runner.run(args, tex, directory)
+            passes += 1
+            if passes >= max_passes or Latex.errors(pdflatex_output[0]):
+                break
+            previous, state = state, Latex.aux_state(directory)
+            if previous == state:
+                break
+        return pdflatex_output, passes
 
     @staticmethod
     def render(context, template_name):
-        # pylint: disable=too-many-locals
-        # pylint: disable=consider-using-with
         """Render
 
         Renders the LaTeX code with its content and then compiles the code to generate
-        a PDF with its log.
-
-        https://github.com/d120/pyophase/blob/master/ophasebase/helper.py
-        Retrieved 10.08.2020
+        a PDF with its log, see render_to_directory.
 
         :param context: The context of the content to be rendered
         :type context: dict
@@ -96,66 +274,283 @@ class Latex:
         :return: the rendered LaTeX code as PDF, PDF LaTeX output and its the rendered template
         :rtype: tuple[bytes, tuple[bytes, bytes], str]
         """
-        template = get_template(template_name)
-        rendered_tpl = template.render(context).encode(Latex.encoding)
-
         with tempfile.TemporaryDirectory() as tempdir:
-            if 'preview_data' in context:
-                formset = context['image_formset']
-                rendered_tpl += Latex.preview_prerender(context['preview_data'], formset, tempdir)
+            pdflatex_output = Latex.render_to_directory(context, template_name, tempdir)
+            try:
+                with open(os.path.join(tempdir, Latex.pdf_file), 'rb') as file:
+                    pdf = file.read()
+            except FileNotFoundError:
+                pdf = None
+            with open(os.path.join(tempdir, Latex.tex_file), 'rb') as file:
+                rendered_tpl = file.read()
+        return pdf, pdflatex_output, rendered_tpl
+
+    @staticmethod
+    def write_document(context, template, directory, error_count=None, use_format=True):
+        # pylint: disable=too-many-arguments
+        """Write document
+
+        Writes the LaTeX code of the document to texput.tex in the given directory. The
+        fragments of the contents are written one after another, so the whole code is never
+        kept in memory. If an error count is given, the error template is written instead of
+        the contents. If the preamble format is used, the preamble is omitted.
+
+        :param context: The context of the content to be rendered
+        :type context: dict
+        :param template: The template of the document
+        :type template: Template
+        :param directory: The directory in which the LaTeX code will be compiled
+        :type directory: str
+        :param error_count: The number of errors to render
+        :type error_count: int or None
+        :param use_format: Indicator if the preamble format should be used
+        :type use_format: bool
+
+        :return: the name of the preamble format or None if the full preamble is written
+        :rtype: str or None
+        """
+        fmt, document = None, template.render(context)
+        if use_format:
+            fmt, document = PreambleFormat.prepare(document, directory)
+        with open(os.path.join(directory, Latex.tex_file), 'wb') as tex:
+            tex.write(document.encode(Latex.encoding))
+            if error_count is not None:
+                # Prerender errors templates
+                tex.write(Latex.pre_render(error_count, context['export_pdf'],
+                                           Latex.error_template, False))
+                tex.write(r"\end{document}".encode(Latex.encoding))
+            elif 'preview_data' in context:
+                tex.write(Latex.preview_prerender(context['preview_data'],
+                                                  context['image_formset'], directory))
             else:
-                # Options for wkhtmltopdf
-                options = {
-                    '--enable-local-file-access': '',
-                    'margin-top': '2cm',
-                    'margin-right': '1cm',
-                    'margin-bottom': '2cm',
-                    'margin-left': '1cm'
-                }
-                # Prerender content templates
-                for content in context['contents']:
-                    rendered_tpl += Latex.pre_render(content, context['export_pdf'])
-                    if content.type == 'MD':
-                        # Convert Markdown to HTML to PDF to put into export file
-                        md_string = ''
-                        if context['export_pdf']:
-                            # File header
-                            md_string += f"<meta charset='UTF-8'>" \
-                                  f"<h2><span style=\"font-weight:bold\">{content.topic.title}" \
-                                  + "</span></h2><i>" \
-                                  + "Description" \
-                                  + f":</i> {tex_escape(content.description)}"
-                        md_string += Markdown.render(content, True)
-                        pdf = pdfkit.from_string(md_string, options=options)
-                        name = f'MD_{content.pk}.pdf'
-                        md_path = os.path.join(tempdir, name)
-                        with open(md_path, 'wb') as temp_pdf:
-                            temp_pdf.write(pdf)
-                            temp_pdf.close()
-                rendered_tpl += r"\end{document}".encode(Latex.encoding)
-            # Have to compile 2 times for table of contents to work
-            for i in range(0, 2 if context['export_pdf'] else 1):
-                process = Popen(['pdflatex'], stdin=PIPE, stdout=PIPE, cwd=tempdir, )
-                # Output is a byte tuple of stdout and stderr
-                pdflatex_output = process.communicate(rendered_tpl)
+                Latex.pre_render_contents(context['contents'], context['export_pdf'],
+                                          directory, tex)
+                tex.write(r"\end{document}".encode(Latex.encoding))
+        return fmt
+
+    @staticmethod
+    def render_to_directory(context, template_name, directory):
+        """Render to directory
+
+        Renders the LaTeX code with its content into texput.tex in the given directory and
+        then compiles the code to texput.pdf with its log. If the same code (including all
+        referenced files) was compiled before, the result is taken from the compile cache
+        instead. The preamble is loaded from its precompiled format if possible. The number
+        of pdflatex passes is stored as 'passes' in the context. The compilation holds a slot
+        of the compile runner, if no slot becomes free in time CompileBusy is raised.
+
+        https://github.com/d120/pyophase/blob/master/ophasebase/helper.py
+        Retrieved 10.08.2020
+
+        :param context: The context of the content to be rendered
+        :type context: dict
+        :param template_name: The name of the template to use
+        :type template_name: str
+        :param directory: The directory in which the LaTeX code is compiled
+        :type directory: str
+
+        :return: the PDF LaTeX output
+        :rtype: tuple[bytes, bytes]
+        """
+        template = get_template(template_name)
+        fmt = Latex.write_document(context, template, directory)
+        # Skip the compilation if the same document was already compiled
+        with open(os.path.join(directory, Latex.tex_file), 'rb') as tex:
+            cache_key = compile_cache.key_stream(tex, directory)
+        cached = compile_cache.restore(cache_key, directory)
+        if cached is not None:
+            context['passes'] = 0
+            return cached
+        # At most LATEX_MAX_CONCURRENT_COMPILES documents are compiled at the same time
+        with compile_runner.slot():
+            # Exports need further passes for the table of contents
+            max_passes = settings.LATEX_MAX_PASSES if context['export_pdf'] else 1
+            pdflatex_output, passes = Latex.compile(directory, max_passes, fmt)
+            pdf_path = os.path.join(directory, Latex.pdf_file)
+            if fmt is not None and not os.path.exists(pdf_path) \
+                    and b'format file' in pdflatex_output[0]:
+                # The format could not be loaded, compile with the full preamble instead
+                PreambleFormat.discard(fmt)
+                fmt = Latex.write_document(context, template, directory, use_format=False)
+                pdflatex_output, fallback_passes = Latex.compile(directory, max_passes)
+                passes += fallback_passes
+            # A compilation aborted by the runner may succeed later, e.g. with less load
+            aborted = compile_runner.aborted(pdflatex_output)
             # Filter error messages in log (stdout)
             error_log = Latex.errors(pdflatex_output[0])
             # Error log
             if len(error_log) != 0:
-                rendered_tpl = template.render(context).encode(Latex.encoding)
-                # Prerender errors templates
-                rendered_tpl += Latex.pre_render(len(error_log), context['export_pdf'],
-                                                 Latex.error_template, False)
-                rendered_tpl += r"\end{document}".encode(Latex.encoding)
+                fmt = Latex.write_document(context, template, directory, len(error_log),
+                                           use_format=fmt is not None)
+                pdflatex_output, error_passes = Latex.compile(directory, fmt=fmt)
+                passes += error_passes
+        context['passes'] = passes
+        logger.info('Compiled %s in %d pdflatex pass(es)', template_name, passes)
+        if not aborted:
+            compile_cache.set_files(cache_key, directory, pdflatex_output)
+        return pdflatex_output
+
+    @staticmethod
+    def revisions(contents):
+        """Revisions
+
+        Returns the id of the latest revision of each of the given contents. Contents
+        without revision are omitted.
+
+        :param contents: The contents
+        :type contents: list[Content]
+
+        :return: the ids of the latest revisions by the primary keys of the contents
+        :rtype: dict[int, int]
+        """
+        versions = Version.objects.get_for_model(Content) \
+            .filter(object_id__in=[str(content.pk) for content in contents]) \
+            .values('object_id') \
+            .annotate(latest=Max('revision_id'))
+        return {int(version['object_id']): version['latest'] for version in versions}
 
-                process = Popen(['pdflatex'], stdin=PIPE, stdout=PIPE, cwd=tempdir, )
-                pdflatex_output = process.communicate(rendered_tpl)
+    @staticmethod
+    def pre_render_batch(contents, revisions, directory, options):
+        """Pre render batch
+
+        Converts all Markdown contents of an export into the PDF MD_batch.pdf in the given
+        directory with a single wkhtmltopdf run, since starting wkhtmltopdf costs more than
+        converting a content. The contents include their pages of the PDF. The PDF and its
+        page ranges are cached as a whole and addressed by the fragment keys of the contents.
+
+        If pdftotext is not installed or the sections can not be found in the PDF, the
+        contents are not batched.
+
+        :param contents: The contents of the export
+        :type contents: list[Content]
+        :param revisions: The ids of the latest revisions by the primary keys of the contents
+        :type revisions: dict[int, int]
+        :param directory: The directory in which the LaTeX code will be compiled
+        :type directory: str
+        :param options: The options for wkhtmltopdf
+        :type options: dict[str, str]
+
+        :return: the page ranges of the batched contents by their primary keys
+        :rtype: dict[int, str]
+        """
+        md_contents = [content for content in contents if content.type == 'MD']
+        if not md_contents or shutil.which('pdftotext') is None:
+            return {}
+        keys = [fragment_cache.fragment_key(content, revisions.get(content.pk), True)
+                for content in md_contents]
+        key = None
+        if None not in keys:
+            key = hashlib.sha256(f'batch:{":".join(keys)}'.encode('utf-8')).hexdigest()
+        path = os.path.join(directory, Markdown.batch_name)
+        cached = fragment_cache.get_fragment(key) if key is not None else None
+        if cached is not None and cached[1] is not None:
             try:
-                with open(os.path.join(tempdir, 'texput.pdf'), 'rb') as file:
-                    pdf = file.read()
-            except FileNotFoundError:
-                pdf = None
-        return pdf, pdflatex_output, rendered_tpl
+                shutil.copyfile(cached[1], path)
+            except OSError:
+                # The entry was evicted in the meantime, convert it again
+                pass
+            else:
+                pages = cached[0].decode('utf-8').split()
+                return {content.pk: pages[idx] for idx, content in enumerate(md_contents)}
+        pages = Markdown.write_batch_pdf([Markdown.export_html(content)
+                                          for content in md_contents], path, options)
+        if pages is None:
+            logger.warning('Markdown contents could not be batched, converting them one by one')
+            return {}
+        if key is not None:
+            fragment_cache.set_fragment(key, '\n'.join(pages).encode('utf-8'), path)
+        return {content.pk: pages[idx] for idx, content in enumerate(md_contents)}
+
+    @staticmethod
+    def pre_render_contents(contents, export_flag, directory, output):
+        # pylint: disable=too-many-locals
+        """Pre render contents
+
+        Pre renders the given contents and writes them to the given output. The Markdown
+        contents are converted to HTML and then to PDF by a pool of at most
+        EXPORT_MARKDOWN_WORKERS threads while the remaining templates are rendered. The PDFs
+        are written into the given directory as MD_<pk>.pdf and all of them exist when this
+        function returns. If EXPORT_MARKDOWN_BATCH is set, the Markdown contents of an export
+        are converted into one PDF instead, see pre_render_batch.
+
+        When exporting, the fragments and Markdown PDFs are taken from the fragment cache
+        if the content did not change since it was rendered, i.e. its latest revision is
+        the same. Simple content compilations are not cached since they happen within the
+        revision of the change.
+
+        :param contents: The contents to be rendered
+        :type contents: list[Content]
+        :param export_flag: True if export, False if simple content compilation
+        :type export_flag: bool
+        :param directory: The directory in which the LaTeX code will be compiled
+        :type directory: str
+        :param output: The binary stream to write the rendered templates to
+        :type output: BinaryIO
+        """
+        # Options for wkhtmltopdf
+        options = {
+            '--enable-local-file-access': '',
+            'margin-top': '2cm',
+            'margin-right': '1cm',
+            'margin-bottom': '2cm',
+            'margin-left': '1cm'
+        }
+        revisions = Latex.revisions(contents) if export_flag else {}
+        # Only the cached lengths of the videos are used, they are loaded by one query
+        video_ids = [content.ytvideocontent.id for content in contents
+                     if content.type == 'YouTubeVideo']
+        video_metadata = YTVideoMetadata.cached(video_ids) if video_ids else {}
+        batch = Latex.pre_render_batch(contents, revisions, directory, options) \
+            if export_flag and settings.EXPORT_MARKDOWN_BATCH else {}
+        with ThreadPoolExecutor(max_workers=settings.EXPORT_MARKDOWN_WORKERS) as pool:
+            conversions = []
+            for content in contents:
+                if content.pk in batch:
+                    output.write(Latex.pre_render(content, export_flag,
+                                                  md_pages=batch[content.pk]))
+                    continue
+                md_path = os.path.join(directory, f'MD_{content.pk}.pdf')
+                key = fragment_cache.fragment_key(content, revisions.get(content.pk),
+                                                  export_flag)
+                cached = fragment_cache.get_fragment(key) if key is not None else None
+                if cached is not None:
+                    fragment, artifact_path = cached
+                    try:
+                        if artifact_path is not None:
+                            shutil.copyfile(artifact_path, md_path)
+                    except OSError:
+                        # The entry was evicted in the meantime, render it again
+                        pass
+                    else:
+                        output.write(fragment)
+                        continue
+                video_length = None
+                if content.type == 'YouTubeVideo':
+                    metadata = video_metadata.get(content.ytvideocontent.id)
+                    if metadata is not None:
+                        video_length = metadata.duration
+                    else:
+                        # Do not cache the fragment without the length of the video
+                        key = None
+                fragment = Latex.pre_render(content, export_flag, video_length=video_length)
+                output.write(fragment)
+                if content.type == 'MD':
+                    # Convert Markdown to HTML to PDF to put into export file
+                    # The HTML is rendered in this thread since it accesses the database
+                    if export_flag:
+                        md_string = "<meta charset='UTF-8'>" + Markdown.export_html(content)
+                    else:
+                        md_string = Markdown.render(content, True)
+                    conversions.append((key, fragment, md_path,
+                                        pool.submit(Markdown.write_pdf,
+                                                    md_string, md_path, options)))
+                elif key is not None:
+                    fragment_cache.set_fragment(key, fragment)
+            # Wait for all PDFs and raise the errors of the conversions
+            for key, fragment, md_path, conversion in conversions:
+                conversion.result()
+                if key is not None:
+                    fragment_cache.set_fragment(key, fragment, md_path)
 
     @staticmethod
     def errors(lob):
@@ -186,7 +581,8 @@ class Latex:
         return found
 
     @staticmethod
-    def pre_render(content, export_flag, template_type=None, no_error=True):
+    def pre_render(content, export_flag, template_type=None, no_error=True,
+                   video_length=None, md_pages=None):
         """Pre render
 
         Pre renders the given content and its corresponding template. If there
@@ -207,6 +603,12 @@ class Latex:
         :type template_type: str
         :param no_error: Indicator if we are rendering a non error content
         :type no_error: bool
+        :param video_length: The length of the YouTube video in seconds, if it is not given
+                             it is read from the cache
+        :type video_length: float or None
+        :param md_pages: The page range of the Markdown content in the batch PDF, if it is
+                         not given the content is included from its own PDF
+        :type md_pages: str or None
 
         :return: the rendered template
         :rtype: bytes
@@ -229,28 +631,33 @@ class Latex:
             context['startTime'] = content.ytvideocontent.start_time
             context['endTime'] = content.ytvideocontent.end_time
 
-            total_hours, total_minutes, total_seconds = \
-                seconds_to_time(get_video_length(content.ytvideocontent.id))
-
-            context['length'] = time_to_string(total_hours, total_minutes, total_seconds)
+            if video_length is None:
+                metadata = YTVideoMetadata.cached([content.ytvideocontent.id])
+                if metadata:
+                    video_length = next(iter(metadata.values())).duration
+            # The length is unknown if the metadata of the video was never fetched
+            context['length'] = ''
+            if video_length is not None:
+                total_hours, total_minutes, total_seconds = seconds_to_time(video_length)
+                context['length'] = time_to_string(total_hours, total_minutes, total_seconds)
 
         # render the template and use escape for triple braces with escape character ~~
         # this is relevant when using triple braces for file paths in tex data
         if no_error and content.type == 'MD':
-            context['md_path'] = f'MD_{content.pk}.pdf'
+            if md_pages is None:
+                context['md_path'] = f'MD_{content.pk}.pdf'
+                context['md_pages'] = '-'
+            else:
+                context['md_path'] = Markdown.batch_name
+                context['md_pages'] = md_pages
         rendered_tpl = template.render(context)
         rendered_tpl = re.sub('{~~', '{', rendered_tpl)
         # Check that we are not compiling an error template (otherwise the content would be an int)
         if no_error:
-            # If there exists an attachment, replace all placeholders in the tex file with
-            # image path
-            if content.ImageAttachments.count() > 0:
-                attachments = content.ImageAttachments.all()
-                for idx, attachment in enumerate(attachments):
-                    path = ret_path(attachment.image.url)
-                    rendered_tpl = re.sub(rf"\\includegraphics(\[.*])?{{Image-{idx}}}",
-                                          rf"\\includegraphics\1{{{path}}}",
-                                          rendered_tpl)
+            # Replace all placeholders in the tex file with the image paths
+            rendered_tpl = resolve_tex_references(
+                rendered_tpl,
+                [ret_path(attachment.image.url) for attachment in content.ImageAttachments.all()])
         # Encode the template with Latex Encoding
         return rendered_tpl.encode(Latex.encoding)
 
@@ -290,6 +697,7 @@ class Latex:
             # Replace all placeholders with image path
             # The images are all located inside the temporary directory where the PDF is compiled
             # so the image path only needs to contain image name
+            names = []
             for idx, form in enumerate(formset):
                 used_form = form.save(commit=False)
                 attachment = used_form.image
@@ -307,8 +715,7 @@ class Latex:
                             for chunk in attachment.chunks():
                                 temp_attachment.write(chunk)
                             temp_attachment.close()
-                rendered_tpl = re.sub(rf"\\includegraphics(\[.*])?{{Image-{idx}}}",
-                                      rf"\\includegraphics\1{{{name}}}",
-                                      rendered_tpl)
+                names.append(name)
+            rendered_tpl = resolve_tex_references(rendered_tpl, names)
         rendered_tpl += r"\end{document}"
         return rendered_tpl.encode(Latex.encoding)
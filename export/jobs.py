@@ -0,0 +1,85 @@
+"""Purpose of this file
+
+This file contains the functions of the export worker which compiles the pending export jobs.
+"""
+
+import logging
+import os
+import tempfile
+import time
+
+from django.core.files import File
+from django.utils import timezone
+
+from export.helper_functions import Latex
+from export.models import ExportJob
+from export.runner import compile_runner
+from export.views import pdf_compile
+
+logger = logging.getLogger(__name__)
+
+
+def run_job(job):
+    """Run job
+
+    Compiles the given export job and stores the result. The PDF is copied from the
+    compile directory into the export storage in chunks, so it is never kept in memory.
+    If the compilation fails, the PDF LaTeX output and the rendered template are stored
+    so that the errors can be shown to the user. The job is compiled with the limits of
+    the background compilations.
+
+    :param job: The claimed export job
+    :type job: ExportJob
+    """
+    with tempfile.TemporaryDirectory() as tempdir:
+        try:
+            with compile_runner.background():
+                pdflatex_output = pdf_compile(job.user.user, job.course_id, job.exp_all,
+                                              tempdir)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception('Export job %s failed', job.pk)
+            pdflatex_output = (b'', None)
+
+        pdf_path = os.path.join(tempdir, Latex.pdf_file)
+        if os.path.exists(pdf_path):
+            with open(pdf_path, 'rb') as pdf:
+                job.pdf.save(job.file_name, File(pdf), save=False)
+            job.status = ExportJob.DONE
+        else:
+            job.pdflatex_output = (pdflatex_output[0] or b'').decode('utf-8', errors='replace')
+            try:
+                with open(os.path.join(tempdir, Latex.tex_file), 'rb') as tex:
+                    job.tex_template = tex.read().decode('utf-8', errors='replace')
+            except OSError:
+                job.tex_template = ''
+            job.status = ExportJob.FAILED
+    job.finish_date = timezone.now()
+    job.save()
+
+
+def work(once=False, interval=2.0):
+    """Work
+
+    Claims and runs pending export jobs. Stale jobs of killed workers are requeued and
+    expired jobs are deleted before waiting for new jobs.
+
+    :param once: Indicator if the worker stops when there are no pending jobs
+    :type once: bool
+    :param interval: The number of seconds to wait for new jobs
+    :type interval: float
+
+    :return: the number of jobs run
+    :rtype: int
+    """
+    count = 0
+    while True:
+        job = ExportJob.claim_next()
+        if job is not None:
+            run_job(job)
+            count += 1
+            continue
+        ExportJob.requeue_stale()
+        ExportJob.delete_expired()
+        if once:
+            return count
+        time.sleep(interval)
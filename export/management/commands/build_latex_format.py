@@ -0,0 +1,52 @@
+"""Purpose of this file
+
+This file contains the management command which builds the format file of the LaTeX preamble.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import get_template
+
+from export.preamble import PreambleFormat
+
+
+class Command(BaseCommand):
+    """Build LaTeX format
+
+    Dumps the preamble of the LaTeX template into a format file with pdflatex -ini. The
+    format is also built automatically by the first compilation after the preamble
+    changed, this command allows to build it in advance, e.g. after a deployment.
+
+    :attr Command.help: The help text of the command
+    :type Command.help: str
+    """
+    help = 'Builds the format file of the LaTeX preamble.'
+
+    def add_arguments(self, parser):
+        """Add arguments
+
+        Adds the arguments of the command.
+
+        :param parser: The argument parser
+        :type parser: CommandParser
+        """
+        parser.add_argument('--template', default='content/export/base.tex',
+                            help='The LaTeX template whose preamble is built.')
+
+    def handle(self, *args, **options):
+        """Handle
+
+        Builds the format of the preamble, even if it exists or failed before.
+
+        :param args: The arguments
+        :type args: Any
+        :param options: The options of the command
+        :type options: dict[str, Any]
+        """
+        rendered_tpl = get_template(options['template']).render({'export_pdf': False})
+        preamble, _ = PreambleFormat.split(rendered_tpl)
+        if preamble is None:
+            raise CommandError(f'The template has no marker "{PreambleFormat.marker}".')
+        name = PreambleFormat.build(preamble, force=True)
+        if name is None:
+            raise CommandError('The format could not be built.')
+        self.stdout.write(f'Built {PreambleFormat.path(name)}.')
@@ -0,0 +1,46 @@
+"""Purpose of this file
+
+This file contains the management command which starts the export worker.
+"""
+
+from django.core.management.base import BaseCommand
+
+from export.jobs import work
+
+
+class Command(BaseCommand):
+    """Export worker
+
+    Compiles the course and coursebook exports which are enqueued by the export views.
+    Several workers may run at the same time, each job is claimed by exactly one worker.
+
+    :attr Command.help: The help text of the command
+    :type Command.help: str
+    """
+    help = 'Compiles the pending course and coursebook exports.'
+
+    def add_arguments(self, parser):
+        """Add arguments
+
+        Adds the arguments of the command.
+
+        :param parser: The argument parser
+        :type parser: CommandParser
+        """
+        parser.add_argument('--once', action='store_true',
+                            help='Stop when there are no pending exports.')
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help='Seconds to wait for new exports.')
+
+    def handle(self, *args, **options):
+        """Handle
+
+        Runs the export worker.
+
+        :param args: The arguments
+        :type args: Any
+        :param options: The options of the command
+        :type options: dict[str, Any]
+        """
+        count = work(once=options['once'], interval=options['interval'])
+        self.stdout.write(f'{count} export(s) compiled.')
@@ -0,0 +1,49 @@
+# Generated by Django 3.2.20 on 2026-10-18 18:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import export.models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('base', '0026_auto_20240305_0948'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('exp_all', models.BooleanField(default=True, verbose_name='Export whole course')),
+                ('key', models.CharField(max_length=100, verbose_name='Key')),
+                ('file_name', models.CharField(max_length=255, verbose_name='File name')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10, verbose_name='Status')),
+                ('pdf', models.FileField(blank=True, storage=export.models.export_storage, upload_to='%Y/%m/%d/', verbose_name='PDF')),
+                ('pdflatex_output', models.TextField(blank=True, verbose_name='PDF LaTeX output')),
+                ('tex_template', models.TextField(blank=True, verbose_name='Rendered template')),
+                ('creation_date', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Creation Date')),
+                ('start_date', models.DateTimeField(blank=True, null=True, verbose_name='Start Date')),
+                ('finish_date', models.DateTimeField(blank=True, null=True, verbose_name='Finish Date')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='export_jobs', to='base.course', verbose_name='Course')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='export_jobs', to='base.profile', verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Export Job',
+                'verbose_name_plural': 'Export Jobs',
+                'ordering': ['creation_date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='exportjob',
+            index=models.Index(fields=['status', 'creation_date'], name='export_expo_status_7f3dd3_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='exportjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'running'])), fields=('key',), name='unique_in_flight_export_job'),
+        ),
+    ]
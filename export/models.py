@@ -0,0 +1,291 @@
+"""Purpose of this file
+
+This file describes or defines the models of the export. An export job represents a
+course or coursebook export which is compiled outside of the request by the export worker
+(management command export_worker).
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from base.models import Course, Profile
+
+
+def export_storage():
+    """Export storage
+
+    Returns the storage of the exported PDFs. The PDFs are not stored in the media directory
+    since they must only be delivered to the users who are allowed to download them.
+
+    :return: the storage of the exported PDFs
+    :rtype: FileSystemStorage
+    """
+    return FileSystemStorage(location=settings.EXPORT_JOB_ROOT)
+
+
+class ExportJob(models.Model):
+    """Export job
+
+    This model represents the export of a course or a coursebook as PDF. A job is created
+    as pending and afterwards claimed and compiled by the export worker. Identical jobs
+    which are pending or running at the same time are collapsed into one job, which is
+    identified by its key: the course, the whole course or the coursebook and the user,
+    whose name is printed as the author of the PDF.
+
+    :attr ExportJob.PENDING: The status of a job waiting for the worker
+    :type ExportJob.PENDING: str
+    :attr ExportJob.RUNNING: The status of a job which is compiled
+    :type ExportJob.RUNNING: str
+    :attr ExportJob.DONE: The status of a successfully compiled job
+    :type ExportJob.DONE: str
+    :attr ExportJob.FAILED: The status of a job whose compilation failed
+    :type ExportJob.FAILED: str
+    :attr ExportJob.STATUS_CHOICES: The choices of the status
+    :type ExportJob.STATUS_CHOICES: list[tuple[str, __proxy__]]
+    :attr ExportJob.IN_FLIGHT: The status of jobs which are not finished yet
+    :type ExportJob.IN_FLIGHT: list[str]
+    :attr ExportJob.course: The course to export
+    :type ExportJob.course: ForeignKey - Course
+    :attr ExportJob.user: The user who requested the export
+    :type ExportJob.user: ForeignKey - Profile
+    :attr ExportJob.exp_all: Indicator if the whole course (T) or the coursebook (F) is exported
+    :type ExportJob.exp_all: BooleanField
+    :attr ExportJob.key: The key identifying identical jobs
+    :type ExportJob.key: CharField
+    :attr ExportJob.file_name: The name of the exported file
+    :type ExportJob.file_name: CharField
+    :attr ExportJob.status: The status of the job
+    :type ExportJob.status: CharField
+    :attr ExportJob.pdf: The exported PDF
+    :type ExportJob.pdf: FileField
+    :attr ExportJob.pdflatex_output: The PDF LaTeX output if the compilation failed
+    :type ExportJob.pdflatex_output: TextField
+    :attr ExportJob.tex_template: The rendered template if the compilation failed
+    :type ExportJob.tex_template: TextField
+    :attr ExportJob.creation_date: The date when the job was requested
+    :type ExportJob.creation_date: DateTimeField
+    :attr ExportJob.start_date: The date when the worker started the job
+    :type ExportJob.start_date: DateTimeField
+    :attr ExportJob.finish_date: The date when the worker finished the job
+    :type ExportJob.finish_date: DateTimeField
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (PENDING, _('Pending')),
+        (RUNNING, _('Running')),
+        (DONE, _('Done')),
+        (FAILED, _('Failed')),
+    ]
+
+    IN_FLIGHT = [PENDING, RUNNING]
+
+    course = models.ForeignKey(Course,
+                               verbose_name=_("Course"),
+                               related_name='export_jobs',
+                               on_delete=models.CASCADE)
+    user = models.ForeignKey(Profile,
+                             verbose_name=_("User"),
+                             related_name='export_jobs',
+                             on_delete=models.CASCADE)
+    exp_all = models.BooleanField(verbose_name=_("Export whole course"),
+                                  default=True)
+    key = models.CharField(verbose_name=_("Key"),
+                           max_length=100)
+    file_name = models.CharField(verbose_name=_("File name"),
+                                 max_length=255)
+    status = models.CharField(verbose_name=_("Status"),
+                              max_length=10,
+                              choices=STATUS_CHOICES,
+                              default=PENDING)
+    pdf = models.FileField(verbose_name=_("PDF"),
+                           storage=export_storage,
+                           upload_to='%Y/%m/%d/',
+                           blank=True)
+    pdflatex_output = models.TextField(verbose_name=_("PDF LaTeX output"),
+                                       blank=True)
+    tex_template = models.TextField(verbose_name=_("Rendered template"),
+                                    blank=True)
+    creation_date = models.DateTimeField(verbose_name=_('Creation Date'),
+                                         default=timezone.now)
+    start_date = models.DateTimeField(verbose_name=_('Start Date'),
+                                      blank=True,
+                                      null=True)
+    finish_date = models.DateTimeField(verbose_name=_('Finish Date'),
+                                       blank=True,
+                                       null=True)
+
+    class Meta:
+        """Meta options
+
+        This class handles all possible meta options that you can give to this model.
+
+        :attr Meta.verbose_name: A human-readable name for the object in singular
+        :type Meta.verbose_name: __proxy__
+        :attr Meta.verbose_name_plural: A human-readable name for the object in plural
+        :type Meta.verbose_name_plural: __proxy__
+        :attr Meta.ordering: The default ordering for the object
+        :type Meta.ordering: list[str]
+        :attr Meta.indexes: The indexes of the model
+        :type Meta.indexes: list[Index]
+        :attr Meta.constraints: The constraints of the model
+        :type Meta.constraints: list[UniqueConstraint]
+        """
+        verbose_name = _("Export Job")
+        verbose_name_plural = _("Export Jobs")
+        ordering = ['creation_date']
+        indexes = [models.Index(fields=['status', 'creation_date'])]
+        constraints = [
+            # At most one unfinished job for identical exports
+            models.UniqueConstraint(fields=['key'],
+                                    condition=models.Q(status__in=['pending', 'running']),
+                                    name='unique_in_flight_export_job'),
+        ]
+
+    def __str__(self):
+        """String representation
+
+        Returns the string representation of this object.
+
+        :return: the string representation of this object
+        :rtype: str
+        """
+        return f"{self.file_name} ({self.status})"
+
+    @staticmethod
+    def job_key(course, user, exp_all):
+        """Job key
+
+        Returns the key identifying identical exports. Every export depends on the user,
+        since the name of the user is printed as the author of the PDF and a coursebook
+        additionally depends on the favorites of the user.
+
+        :param course: The course to export
+        :type course: Course
+        :param user: The user who requested the export
+        :type user: Profile
+        :param exp_all: Indicator if the whole course (T) or the coursebook (F) is exported
+        :type exp_all: bool
+
+        :return: the key of the export
+        :rtype: str
+        """
+        kind = 'course' if exp_all else 'coursebook'
+        return f'{course.pk}/{kind}/{user.pk}'
+
+    @classmethod
+    def enqueue(cls, course, user, exp_all, file_name):
+        """Enqueue
+
+        Creates a pending job for the export, if there is no identical job in flight.
+        Otherwise the job in flight is returned.
+
+        :param course: The course to export
+        :type course: Course
+        :param user: The user who requested the export
+        :type user: Profile
+        :param exp_all: Indicator if the whole course (T) or the coursebook (F) is exported
+        :type exp_all: bool
+        :param file_name: The name of the exported file
+        :type file_name: str
+
+        :return: the job of the export
+        :rtype: ExportJob
+        """
+        key = cls.job_key(course, user, exp_all)
+        job = cls.objects.filter(key=key, status__in=cls.IN_FLIGHT).first()
+        if job is not None:
+            return job
+        try:
+            with transaction.atomic():
+                return cls.objects.create(course=course, user=user, exp_all=exp_all,
+                                          key=key, file_name=file_name)
+        except IntegrityError:
+            # An identical job was created concurrently
+            return cls.objects.get(key=key, status__in=cls.IN_FLIGHT)
+
+    @classmethod
+    def claim_next(cls):
+        """Claim next job
+
+        Marks the oldest pending job as running and returns it. The status is changed by a
+        conditional update, so that a job is claimed by exactly one worker.
+
+        :return: the claimed job or None if there are no pending jobs
+        :rtype: ExportJob or None
+        """
+        for job in cls.objects.filter(status=cls.PENDING).order_by('creation_date')[:10]:
+            claimed = cls.objects.filter(pk=job.pk, status=cls.PENDING) \
+                .update(status=cls.RUNNING, start_date=timezone.now())
+            if claimed:
+                job.refresh_from_db()
+                return job
+        return None
+
+    @classmethod
+    def requeue_stale(cls):
+        """Requeue stale jobs
+
+        Marks running jobs as pending again whose worker did not finish them within
+        the timeout EXPORT_JOB_TIMEOUT, e.g. because the worker was killed.
+
+        :return: the number of requeued jobs
+        :rtype: int
+        """
+        deadline = timezone.now() - timedelta(seconds=settings.EXPORT_JOB_TIMEOUT)
+        return cls.objects.filter(status=cls.RUNNING, start_date__lt=deadline) \
+            .update(status=cls.PENDING, start_date=None)
+
+    @classmethod
+    def delete_expired(cls):
+        """Delete expired jobs
+
+        Deletes finished jobs and their PDFs which are older than the retention time
+        EXPORT_JOB_RETENTION.
+
+        :return: the number of deleted jobs
+        :rtype: int
+        """
+        deadline = timezone.now() - timedelta(seconds=settings.EXPORT_JOB_RETENTION)
+        expired = cls.objects.filter(status__in=[cls.DONE, cls.FAILED],
+                                     finish_date__lt=deadline)
+        count = 0
+        for job in expired:
+            if job.pdf:
+                job.pdf.delete(save=False)
+            job.delete()
+            count += 1
+        return count
+
+    @property
+    def finished(self):
+        """Finished
+
+        Returns whether the worker finished the job.
+
+        :return: true if the job is done or failed
+        :rtype: bool
+        """
+        return self.status in (self.DONE, self.FAILED)
+
+    def may_download(self, user):
+        """May download
+
+        Checks if the given user is allowed to download the result of the job. Since the
+        PDF carries the name of the user who requested it, only this user may download it.
+
+        :param user: The user to check
+        :type user: Profile
+
+        :return: true if the user may download the result
+        :rtype: bool
+        """
+        return self.user_id == user.pk
@@ -0,0 +1,229 @@
+"""Purpose of this file
+
+This file contains the precompiled format files of the LaTeX preamble.
+"""
+
+import functools
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from subprocess import Popen, PIPE, DEVNULL
+
+from django.conf import settings
+
+from export.runner import compile_runner
+
+
+class PreambleFormat:
+    """Preamble format
+
+    Loading the packages of the preamble is most of the time of a pdflatex run. Therefore
+    the preamble is dumped once into a format file with pdflatex -ini, which is loaded
+    instead of the preamble afterwards. A format is addressed by a hash over the preamble
+    and the pdflatex version, so it is rebuilt automatically when the template or the TeX
+    installation changes. If the format can not be built, the full preamble is compiled.
+
+    The preamble of a template ends at the marker line. The formats are stored in the
+    directory LATEX_FORMAT_DIR and are only used if LATEX_USE_FORMAT is set. A failed build
+    is retried after LATEX_FORMAT_RETRY seconds, e.g. once pdflatex was installed.
+
+    :attr PreambleFormat.marker: The line marking the end of the preamble
+    :type PreambleFormat.marker: str
+    :attr PreambleFormat.source_name: The file name of the preamble when building the format
+    :type PreambleFormat.source_name: str
+    :attr PreambleFormat.failed_suffix: The suffix of the files marking failed builds
+    :type PreambleFormat.failed_suffix: str
+    """
+    marker = '%%% End of preamble'
+    source_name = 'preamble.tex'
+    failed_suffix = '.failed'
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def pdflatex_version():
+        """pdflatex version
+
+        Returns the version of pdflatex, formats can only be loaded by the version which
+        built them. The version is determined once per process.
+
+        :return: the first line of the version output or an empty string if it is unknown
+        :rtype: str
+        """
+        try:
+            with Popen(['pdflatex', '--version'], stdin=DEVNULL, stdout=PIPE,
+                       stderr=DEVNULL) as process:
+                output = process.communicate()[0]
+        except OSError:
+            return ''
+        return output.decode('utf-8', errors='ignore').partition('\n')[0]
+
+    @staticmethod
+    def split(rendered_tpl):
+        """Split
+
+        Splits the rendered template into its preamble and its body at the marker line.
+
+        :param rendered_tpl: The rendered template
+        :type rendered_tpl: str
+
+        :return: the preamble and the body or None as preamble if there is no marker
+        :rtype: tuple[str or None, str]
+        """
+        preamble, found, body = rendered_tpl.partition(PreambleFormat.marker)
+        if not found:
+            return None, rendered_tpl
+        return preamble, body
+
+    @staticmethod
+    def name(preamble):
+        """Name
+
+        Returns the name of the format of the given preamble.
+
+        :param preamble: The rendered preamble
+        :type preamble: str
+
+        :return: the name of the format
+        :rtype: str
+        """
+        digest = hashlib.sha256(preamble.encode('utf-8'))
+        digest.update(PreambleFormat.pdflatex_version().encode('utf-8'))
+        return f'preamble-{digest.hexdigest()[:16]}'
+
+    @staticmethod
+    def path(name):
+        """Path
+
+        Returns the path of the format file with the given name.
+
+        :param name: The name of the format
+        :type name: str
+
+        :return: the path of the format file
+        :rtype: str
+        """
+        return os.path.join(settings.LATEX_FORMAT_DIR, f'{name}.fmt')
+
+    @staticmethod
+    def build(preamble, force=False):
+        """Build
+
+        Dumps the given preamble into a format file. The format is built in a temporary
+        directory and moved afterwards, so that concurrent processes never load an
+        incomplete format. If the build fails, this is remembered so that it is not tried
+        again for the same preamble and pdflatex version within LATEX_FORMAT_RETRY seconds
+        unless forced.
+
+        :param preamble: The rendered preamble
+        :type preamble: str
+        :param force: Indicator if the format is built even if it exists or failed before
+        :type force: bool
+
+        :return: the name of the format or None if it could not be built
+        :rtype: str or None
+        """
+        name = PreambleFormat.name(preamble)
+        path = PreambleFormat.path(name)
+        failed_path = path + PreambleFormat.failed_suffix
+        if not force and os.path.exists(path):
+            return name
+        if not force and PreambleFormat.failed_recently(failed_path):
+            return None
+        os.makedirs(settings.LATEX_FORMAT_DIR, exist_ok=True)
+        with tempfile.TemporaryDirectory() as tempdir:
+            with open(os.path.join(tempdir, PreambleFormat.source_name), 'wb') as file:
+                file.write(preamble.encode('utf-8'))
+            args = ['pdflatex', '-ini', '-interaction=nonstopmode', f'-jobname={name}',
+                    f'&pdflatex {PreambleFormat.source_name}\\dump']
+            try:
+                compile_runner.run(args, DEVNULL, tempdir)
+            except OSError:
+                pass
+            try:
+                os.replace(os.path.join(tempdir, f'{name}.fmt'), path)
+            except OSError:
+                with open(failed_path, 'wb'):
+                    pass
+                return None
+        if os.path.exists(failed_path):
+            os.remove(failed_path)
+        return name
+
+    @staticmethod
+    def failed_recently(failed_path):
+        """Failed recently
+
+        Checks if the given failure marker was created within LATEX_FORMAT_RETRY seconds.
+
+        :param failed_path: The path of the failure marker
+        :type failed_path: str
+
+        :return: true if the build failed recently
+        :rtype: bool
+        """
+        try:
+            return time.time() - os.path.getmtime(failed_path) < settings.LATEX_FORMAT_RETRY
+        except OSError:
+            return False
+
+    @staticmethod
+    def prepare(rendered_tpl, directory):
+        """Prepare
+
+        Prepares the compilation of the rendered template in the given directory with the
+        format of its preamble. The format is built if it does not exist yet and is linked
+        into the directory where pdflatex finds it.
+
+        :param rendered_tpl: The rendered template
+        :type rendered_tpl: str
+        :param directory: The directory in which the LaTeX code is compiled
+        :type directory: str
+
+        :return: the name of the format and the body of the template or None as name and
+                 the whole template if no format is used
+        :rtype: tuple[str or None, str]
+        """
+        if not settings.LATEX_USE_FORMAT:
+            return None, rendered_tpl
+        preamble, body = PreambleFormat.split(rendered_tpl)
+        if preamble is None:
+            return None, rendered_tpl
+        name = PreambleFormat.build(preamble)
+        if name is None:
+            return None, rendered_tpl
+        link = os.path.join(directory, f'{name}.fmt')
+        if not os.path.exists(link):
+            try:
+                os.symlink(PreambleFormat.path(name), link)
+            except OSError:
+                shutil.copyfile(PreambleFormat.path(name), link)
+        # The name of the format distinguishes the compile cache entries of the preambles
+        return name, f'% Format: {name}\n{body}'
+
+    @staticmethod
+    def discard(name):
+        """Discard
+
+        Removes the format with the given name and marks its build as failed, e.g. because
+        pdflatex could not load it.
+
+        :param name: The name of the format
+        :type name: str
+        """
+        path = PreambleFormat.path(name)
+        with open(path + PreambleFormat.failed_suffix, 'wb'):
+            pass
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def clear():
+        """Clear
+
+        Removes all formats and failure markers.
+        """
+        shutil.rmtree(settings.LATEX_FORMAT_DIR, ignore_errors=True)
@@ -0,0 +1,99 @@
+"""Purpose of this file
+
+This file contains the resolution of the attachment references (Image-N) in Markdown and
+LaTeX code. The N-th attachment of a content is referenced by Image-N.
+"""
+
+import re
+
+from markdown_it import MarkdownIt
+from mdit_py_plugins.footnote import footnote_plugin
+from mdit_py_plugins.front_matter import front_matter_plugin
+
+# re.Pattern: Pattern of an attachment reference as target of a Markdown image
+IMAGE_REFERENCE = re.compile(r'Image-(\d+)')
+
+# re.Pattern: Pattern of an attachment reference in an includegraphics command
+TEX_IMAGE_REFERENCE = re.compile(r'\\includegraphics(\[[^\]\n]*])?{Image-(\d+)}')
+
+
+def image_reference_plugin(md):
+    """Image reference plugin
+
+    markdown-it plugin which resolves the attachment references of the images while the
+    Markdown code is parsed. The paths of the attachments are passed in the environment of
+    the rendering as 'image_paths', references to missing attachments are kept.
+
+    :param md: The markdown-it instance
+    :type md: MarkdownIt
+    """
+    def resolve_image_references(state):
+        paths = state.env.get('image_paths')
+        if not paths:
+            return
+        for token in state.tokens:
+            if token.type != 'inline' or not token.children:
+                continue
+            for child in token.children:
+                if child.type != 'image':
+                    continue
+                match = IMAGE_REFERENCE.fullmatch(child.attrGet('src') or '')
+                if match and int(match.group(1)) < len(paths):
+                    child.attrSet('src', md.normalizeLink(paths[int(match.group(1))]))
+
+    md.core.ruler.push('image_reference', resolve_image_references)
+
+
+# MarkdownIt: The Markdown renderer of the contents, which is built once per process
+markdown_renderer = (
+    MarkdownIt()
+    .use(front_matter_plugin)
+    .use(footnote_plugin)
+    .use(image_reference_plugin)
+    .enable('table')
+    .enable('strikethrough')
+    .enable('linkify')
+)
+
+
+def render_markdown(text, image_paths):
+    """Render Markdown
+
+    Renders the given Markdown code to HTML and resolves the attachment references with
+    the given paths.
+
+    :param text: The Markdown code
+    :type text: str
+    :param image_paths: The paths of the attachments in their order
+    :type image_paths: list[str]
+
+    :return: the rendered HTML
+    :rtype: str
+    """
+    return markdown_renderer.render(text, {'image_paths': image_paths})
+
+
+def resolve_tex_references(text, image_paths):
+    """Resolve TeX references
+
+    Replaces the attachment references of all includegraphics commands in the given LaTeX
+    code with the given paths in a single scan. References to missing attachments are kept.
+
+    :param text: The LaTeX code
+    :type text: str
+    :param image_paths: The paths of the attachments in their order
+    :type image_paths: list[str]
+
+    :return: the LaTeX code with resolved references
+    :rtype: str
+    """
+    if not image_paths:
+        return text
+
+    def resolve(match):
+        idx = int(match.group(2))
+        if idx >= len(image_paths):
+            return match.group(0)
+        return f'\\includegraphics{match.group(1) or ""}{{{image_paths[idx]}}}'
+
+    return TEX_IMAGE_REFERENCE.sub(resolve, text)
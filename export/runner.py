@@ -0,0 +1,344 @@
+"""Purpose of this file
+
+This file contains the runner which executes pdflatex with a timeout, resource limits and a
+limited number of concurrent compilations.
+"""
+
+import shutil
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from subprocess import Popen, PIPE, TimeoutExpired
+
+from django.conf import settings
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    # Resource limits are not available on this platform
+    resource = None
+
+
+class CompileBusy(Exception):
+    """Compile busy
+
+    This exception is raised if no compilation slot became free within LATEX_COMPILE_WAIT
+    (or EXPORT_COMPILE_WAIT in the background) seconds.
+    """
+
+
+class PreviewSuperseded(Exception):
+    """Preview superseded
+
+    This exception is raised if a newer preview of the same user was requested before the
+    compilation of a preview started.
+    """
+
+
+class CompileRunner:
+    """Compile runner
+
+    Runs pdflatex with the wall-clock timeout LATEX_COMPILE_TIMEOUT and the resource limits
+    LATEX_COMPILE_CPU_LIMIT (CPU seconds) and LATEX_COMPILE_MEMORY_LIMIT (bytes of address
+    space), so that pathological LaTeX code can not occupy a worker indefinitely. At most
+    LATEX_MAX_CONCURRENT_COMPILES compilations of this process hold a slot at the same
+    time. A limit of 0 disables the limit.
+
+    Compilations in the background (the export worker) use the limits EXPORT_COMPILE_TIMEOUT,
+    EXPORT_COMPILE_CPU_LIMIT and EXPORT_COMPILE_WAIT instead, since large exports take
+    longer than a request may wait.
+
+    The resource limits are applied by running pdflatex through prlimit (or a Python
+    wrapper, if prlimit is not installed) instead of a preexec_fn, which is not safe in
+    a threaded process.
+
+    :attr CompileRunner.timeout_message: The error appended to the output of a timed out run
+    :type CompileRunner.timeout_message: bytes
+    :attr CompileRunner.killed_message: The error appended to the output of a killed run
+    :type CompileRunner.killed_message: bytes
+    :attr CompileRunner.slots: The number of compilation slots or None for the setting
+    :type CompileRunner.slots: int or None
+    """
+    timeout_message = b'! Compilation aborted: time limit exceeded.'
+    killed_message = b'! Compilation aborted: resource limit exceeded.'
+
+    def __init__(self, slots=None):
+        """Initializer
+
+        Initializes the runner. The semaphore of the slots is created on first use, since
+        the settings are not available yet when the module is imported.
+
+        :param slots: The number of compilation slots or None for the setting
+        :type slots: int or None
+        """
+        self.slots = slots
+        self._semaphore = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def background(self):
+        """Background
+
+        Applies the limits of the background compilations to the compilations of the
+        current thread while the context is active.
+        """
+        previous = getattr(self._local, 'background', False)
+        self._local.background = True
+        try:
+            yield
+        finally:
+            self._local.background = previous
+
+    def setting(self, name):
+        """Setting
+
+        Returns the value of the given limit for the current thread: the setting LATEX_<name>
+        or EXPORT_<name> in the background.
+
+        :param name: The name of the limit, e.g. COMPILE_TIMEOUT
+        :type name: str
+
+        :return: the value of the limit
+        :rtype: float or None
+        """
+        prefix = 'EXPORT' if getattr(self._local, 'background', False) else 'LATEX'
+        return getattr(settings, f'{prefix}_{name}')
+
+    @property
+    def semaphore(self):
+        """Semaphore
+
+        Returns the semaphore of the compilation slots of this process.
+
+        :return: the semaphore of the compilation slots
+        :rtype: BoundedSemaphore
+        """
+        with self._lock:
+            if self._semaphore is None:
+                slots = self.slots
+                if slots is None:
+                    slots = settings.LATEX_MAX_CONCURRENT_COMPILES
+                self._semaphore = threading.BoundedSemaphore(slots)
+        return self._semaphore
+
+    @contextmanager
+    def slot(self, wait=None):
+        """Slot
+
+        Holds a compilation slot while the context is active. If all slots are taken, it
+        is waited at most the given number of seconds for a free one.
+
+        :param wait: The seconds to wait for a slot or None for the setting COMPILE_WAIT
+                     of the current thread, which waits until a slot is free if it is None
+        :type wait: float or None
+
+        :raises CompileBusy: if no slot became free in time
+        """
+        if wait is None:
+            wait = self.setting('COMPILE_WAIT')
+        semaphore = self.semaphore
+        if not semaphore.acquire(timeout=wait):
+            raise CompileBusy()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    def limits(self, args):
+        """Limits
+
+        Returns the command line which runs the given command with the resource limits.
+        The limits are set by prlimit or, if it is not installed, by a Python process which
+        replaces itself with the command afterwards.
+
+        :param args: The command line
+        :type args: list[str]
+
+        :return: the command line applying the limits
+        :rtype: list[str]
+        """
+        if resource is None:
+            return args
+        cpu = self.setting('COMPILE_CPU_LIMIT')
+        memory = settings.LATEX_COMPILE_MEMORY_LIMIT
+        if shutil.which('prlimit') is not None:
+            limits = []
+            if cpu:
+                limits.append(f'--cpu={cpu}:{cpu + 1}')
+            if memory:
+                limits.append(f'--as={memory}:{memory}')
+            return ['prlimit', *limits, '--', *args] if limits else args
+        limits = []
+        if cpu:
+            limits.append(f'resource.setrlimit(resource.RLIMIT_CPU, ({cpu}, {cpu + 1}))')
+        if memory:
+            limits.append(f'resource.setrlimit(resource.RLIMIT_AS, ({memory}, {memory}))')
+        if not limits:
+            return args
+        code = '; '.join(['import os, resource, sys', *limits,
+                          'os.execvp(sys.argv[1], sys.argv[1:])'])
+        return [sys.executable, '-c', code, *args]
+
+    @classmethod
+    def aborted(cls, output):
+        """Aborted
+
+        Checks if the run with the given output was aborted by the runner.
+
+        :param output: The output of the run as byte tuple of stdout and stderr
+        :type output: tuple[bytes, bytes]
+
+        :return: true if the run exceeded a limit
+        :rtype: bool
+        """
+        return cls.timeout_message in output[0] or cls.killed_message in output[0]
+
+    def run(self, args, stdin, cwd):
+        """Run
+
+        Runs the given pdflatex command and kills it if it exceeds LATEX_COMPILE_TIMEOUT
+        (or EXPORT_COMPILE_TIMEOUT in the background).
+        If the process was killed, an error message is appended to its output, so that it
+        is reported like a LaTeX error.
+
+        :param args: The command line
+        :type args: list[str]
+        :param stdin: The standard input of the process
+        :type stdin: BinaryIO or int
+        :param cwd: The working directory of the process
+        :type cwd: str
+
+        :return: the output of the process as byte tuple of stdout and stderr
+        :rtype: tuple[bytes, bytes]
+        """
+        timeout = self.setting('COMPILE_TIMEOUT') or None
+        with Popen(self.limits(args), stdin=stdin, stdout=PIPE, cwd=cwd) as process:
+            try:
+                stdout, stderr = process.communicate(timeout=timeout)
+            except TimeoutExpired:
+                process.kill()
+                stdout, stderr = process.communicate()
+                return stdout + b'\n' + self.timeout_message + b'\n', stderr
+        if process.returncode < 0:
+            # Killed by a signal, e.g. SIGXCPU if the CPU limit was exceeded
+            return stdout + b'\n' + self.killed_message + b'\n', stderr
+        return stdout, stderr
+
+
+class PreviewGate:
+    """Preview gate
+
+    Allows at most one preview compilation per user in this process. Every preview request
+    draws a ticket, a request waiting for the compilation of an older preview of the same
+    user gives up as soon as a newer ticket was drawn. Thereby only the latest of a burst of
+    preview requests is compiled. The entries of a user are dropped as soon as the turns of
+    all tickets of the user are over.
+
+    :attr PreviewGate.poll_interval: The seconds between checks whether a request is superseded
+    :type PreviewGate.poll_interval: float
+    """
+    poll_interval = 0.05
+
+    def __init__(self):
+        """Initializer
+
+        Initializes the gate without tickets.
+        """
+        self._lock = threading.Lock()
+        self._tickets = {}
+        self._user_locks = {}
+        self._pending = {}
+
+    def ticket(self, user_id):
+        """Ticket
+
+        Draws a new ticket for a preview of the given user, which supersedes all older
+        tickets of the user. Every ticket must be passed to turn afterwards.
+
+        :param user_id: The id of the user
+        :type user_id: int
+
+        :return: the ticket
+        :rtype: int
+        """
+        with self._lock:
+            self._tickets[user_id] = self._tickets.get(user_id, 0) + 1
+            self._user_locks.setdefault(user_id, threading.Lock())
+            self._pending[user_id] = self._pending.get(user_id, 0) + 1
+            return self._tickets[user_id]
+
+    def _finish(self, user_id):
+        """Finish
+
+        Marks the turn of a ticket of the given user as over and drops the entries of the
+        user if it was the last pending ticket.
+
+        :param user_id: The id of the user
+        :type user_id: int
+        """
+        with self._lock:
+            self._pending[user_id] -= 1
+            if self._pending[user_id] == 0:
+                del self._pending[user_id]
+                del self._tickets[user_id]
+                del self._user_locks[user_id]
+
+    def superseded(self, user_id, ticket):
+        """Superseded
+
+        Checks if a newer ticket was drawn for the given user.
+
+        :param user_id: The id of the user
+        :type user_id: int
+        :param ticket: The ticket to check
+        :type ticket: int
+
+        :return: true if the ticket is superseded
+        :rtype: bool
+        """
+        return self._tickets.get(user_id) != ticket
+
+    @contextmanager
+    def turn(self, user_id, ticket, wait=None):
+        """Turn
+
+        Holds the preview compilation of the given user while the context is active. It is
+        waited at most the given number of seconds for the previous preview of the user.
+
+        :param user_id: The id of the user
+        :type user_id: int
+        :param ticket: The ticket of the preview
+        :type ticket: int
+        :param wait: The seconds to wait or None for LATEX_COMPILE_WAIT
+        :type wait: float or None
+
+        :raises PreviewSuperseded: if a newer preview was requested in the meantime
+        :raises CompileBusy: if the previous preview did not finish in time
+        """
+        if wait is None:
+            wait = settings.LATEX_COMPILE_WAIT
+        deadline = time.monotonic() + wait
+        try:
+            user_lock = self._user_locks[user_id]
+            while not user_lock.acquire(timeout=self.poll_interval):
+                if self.superseded(user_id, ticket):
+                    raise PreviewSuperseded()
+                if time.monotonic() >= deadline:
+                    raise CompileBusy()
+            try:
+                if self.superseded(user_id, ticket):
+                    raise PreviewSuperseded()
+                yield
+            finally:
+                user_lock.release()
+        finally:
+            self._finish(user_id)
+
+
+# Runner of all pdflatex compilations of this process
+compile_runner = CompileRunner()
+
+# Gate of the preview compilations of this process
+preview_gate = PreviewGate()
@@ -3,72 +3,75 @@
 This file contains functions related to generating views.
 """
 
-from django.http import HttpResponse
-from django.shortcuts import render
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
+from django.views.decorators.http import require_GET, require_POST
 
-from base.models import Course, Favorite, Content
+from base.models import Course
 
+from export.context import course_contents, coursebook_contents
 from export.helper_functions import Latex
+from export.models import ExportJob
+from export.cache import preview_cache
+from export.runner import CompileBusy, PreviewSuperseded, compile_runner, preview_gate
 
 
-def pdf_compile(request, pk, exp_all,  # pylint: disable=invalid-name
+def pdf_compile(user, pk, exp_all, directory,  # pylint: disable=invalid-name
                 template="content/export/base.tex",
                 context=None):
     """Generate course book
 
-    There is also a flag which indicates if the whole
-    course or only the coursebook should be exported.
+    Compiles the course book into texput.pdf in the given directory. There is also a flag
+    which indicates if the whole course or only the coursebook should be exported. The
+    contents are loaded with a constant number of queries.
 
-    :param request: The given request
-    :type request: WSGIRequest
+    :param user: The user who exports the course
+    :type user: User
     :param pk: The primary key of the course
     :type pk: int
     :param exp_all: Indicator if the whole course (T) or the coursebook (F)should be
                     exported
     :type exp_all: bool
+    :param directory: The directory in which the course book is compiled
+    :type directory: str
     :param template: The path of the LaTeX template to use
     :type template: str
     :param context: The context of the content
     :type context: dict[str, Any]
-    :return: the generated coursebook as PDF, PDF LaTeX output and as an rendered
-            template
-    :rtype: tuple[bytes, tuple[bytes, bytes], str]
+    :return: the PDF LaTeX output
+    :rtype: tuple[bytes, bytes]
     """
 
     if context is None:
         context = {}
-    user = request.user
     course = Course.objects.get(pk=pk)
 
     # Set Context
     context['user'] = user
     context['course'] = course
     context['export_pdf'] = True
-    context['contents'] = []
 
     # Check if we want to export the whole course or only the coursebook
     if exp_all:
-        for topic in course.topics.all():
-            contents = list(Content.objects.filter(topic=topic))
-            for content in contents:
-                context['contents'].append(content)
+        context['contents'] = course_contents(course)
     else:
-        context['contents'] = [
-            favorite.content
-            for favorite in
-            Favorite.objects.filter(user=user.profile, course=course)
-        ]
+        context['contents'] = coursebook_contents(course, user.profile)
 
     # Perform compilation given context and template
-    (pdf, pdflatex_output, tex_template) = Latex.render(context, template)
-    return pdf, pdflatex_output, tex_template
+    return Latex.render_to_directory(context, template, directory)
 
 
+@login_required
+@require_POST
 def generate_coursebook_response(request, pk, exp_all, file_name=None):  # pylint: disable=invalid-name
     """Generate coursebook response
 
-    There is also a flag which indicates if
-    the whole course or only the coursebook should be exported.
+    Enqueues the export of the course as job which is compiled by the export worker.
+    There is also a flag which indicates if the whole course or only the coursebook
+    should be exported. If an identical export is already pending or running, its job
+    is returned instead of a new one.
 
     :param request: The given request
     :type request: WSGIRequest
@@ -80,51 +83,100 @@ def generate_coursebook_response(request, pk, exp_all, file_name=None):  # pylin
     :param file_name: The name of the file
     :type file_name: str
 
-    :return: the http response of the generated PDF file
-    :rtype: HttpResponse
+    :return: the json response containing the job id and the status url of the job
+    :rtype: JsonResponse
     """
+    course = get_object_or_404(Course, pk=pk)
 
     # If we have no file name, name the file after the course title
     if not file_name:
-        course = Course.objects.get(pk=pk)
         file_name = f"{course.title}"
 
-    # Call the method for pdf compilation and write the output afterwards
-    (pdf, pdflatex_output, tex_template) = pdf_compile(request, pk, exp_all)
-    return write_response(request, pdf, pdflatex_output, tex_template, file_name + ".pdf")
+    job = ExportJob.enqueue(course, request.user.profile, exp_all, f"{file_name}.pdf")
+    return JsonResponse(job_data(job), status=202)
+
+
+def job_data(job):
+    """Job data
+
+    Returns the data of the job which is sent to the client.
+
+    :param job: The export job
+    :type job: ExportJob
+
+    :return: the data of the job
+    :rtype: dict[str, Any]
+    """
+    return {'job_id': job.pk,
+            'status': job.status,
+            'status_url': reverse('frontend:export-status', args=(job.pk,)),
+            'download_url': reverse('frontend:export-download', args=(job.pk,))}
 
-# pylint: disable=too-many-arguments
-def write_response(request, pdf, pdflatex_output, tex_template, filename,
-                   content_type='application/pdf'):
-    """Write response
 
-    Renders a pdf and sends it to the browser.
+def get_export_job(request, pk):  # pylint: disable=invalid-name
+    """Get export job
+
+    Returns the export job with the given primary key if the user of the request may
+    access it.
 
     :param request: The given request
     :type request: WSGIRequest
-    :param pdf: The PDF
-    :type pdf: bytes
-    :param pdflatex_output: The PDF LaTeX output
-    :type pdflatex_output: tuple[bytes, bytes]
-    :param tex_template: The rendered template
-    :type tex_template: str
-    :param filename: The name of the file
-    :type filename: str
-    :param content_type: The type of the content (file)
-    :type content_type: str
+    :param pk: The primary key of the export job
+    :type pk: int
+
+    :return: the export job
+    :rtype: ExportJob
+    """
+    job = get_object_or_404(ExportJob, pk=pk)
+    if not job.may_download(request.user.profile):
+        raise Http404
+    return job
+
 
-    :return: the http response of the written file
+@login_required
+@require_GET
+def export_status(request, pk):  # pylint: disable=invalid-name
+    """Export status
+
+    Returns the status of the export job which is polled by the client.
+
+    :param request: The given request
+    :type request: WSGIRequest
+    :param pk: The primary key of the export job
+    :type pk: int
+
+    :return: the json response containing the status of the job
+    :rtype: JsonResponse
+    """
+    return JsonResponse(job_data(get_export_job(request, pk)))
+
+
+@login_required
+@require_GET
+def export_download(request, pk):  # pylint: disable=invalid-name
+    """Export download
+
+    Sends the PDF of a finished export job to the browser. If the compilation failed,
+    the rendering error page will be shown instead.
+
+    :param request: The given request
+    :type request: WSGIRequest
+    :param pk: The primary key of the export job
+    :type pk: int
+
+    :return: the http response of the exported file
     :rtype: HttpResponse
     """
-    if not pdf:
+    job = get_export_job(request, pk)
+    if job.status == ExportJob.FAILED:
         return render(request,
                       "frontend/coursebook/rendering-error.html",
-                      {"content": pdflatex_output[0].decode("utf-8"),
-                       "tex_template": tex_template.decode("utf-8")})
-    response = HttpResponse(content_type=content_type)
-    response['Content-Disposition'] = 'attachment; filename=' + filename
-    response.write(pdf)
-    return response
+                      {"content": job.pdflatex_output,
+                       "tex_template": job.tex_template})
+    if job.status != ExportJob.DONE or not job.pdf:
+        raise Http404
+    return FileResponse(job.pdf.open('rb'), as_attachment=True,
+                        filename=job.file_name, content_type='application/pdf')
 
 
 def generate_pdf_from_latex(user, content, template="content/export/base.tex", context=None):
@@ -143,6 +195,8 @@ def generate_pdf_from_latex(user, content, template="content/export/base.tex", c
 
     return: the generated PDF
     rtype: bytes
+
+    :raises CompileBusy: if all compilation slots are taken
     """
     if context is None:
         context = {}
@@ -166,6 +220,9 @@ def latex_preview(request, user, topic, formset,
     a message indicating why compiling failed.
     This method assumes the request is already a previewing request, skipping the
     check for the preview flag, but it does not assume the validity of request content.
+    Identical previews are answered from the preview cache. A preview which is still
+    waiting when the same user requests a newer one is answered with the reason
+    'Superseded'.
 
     :param request: previewing request
     :type request: HttpRequest
@@ -183,17 +240,34 @@ def latex_preview(request, user, topic, formset,
     reasons = ['OK',
                'Invalid attachment data',
                'Textfield is empty',
-               'Invalid data']
+               'Invalid data',
+               'Server busy, please try again in a moment',
+               'Superseded']
     if 'textfield' in request.POST:
         latex = request.POST['textfield']
         if not latex:
             return HttpResponse(reason=reasons[2])
         if not formset.is_valid():
             return HttpResponse(reason=reasons[1])
-        # Generates the preview pdf
+        template = "content/export/base.tex"
+        # Identical previews are answered from the cache
+        key = preview_cache.preview_key(latex, formset, topic, user, template)
+        cached = preview_cache.get(key)
+        if cached is not None:
+            return HttpResponse(cached[0], content_type=content_type, reason=reasons[0])
+        # Generates the preview pdf, only the latest preview of the user is compiled
         context = {'preview_data': latex, 'image_formset': formset,
                    'export_pdf': False, 'user': user, 'topic': topic,
                    'contents': []}
-        pdf, _, _ = Latex.render(context, "content/export/base.tex")
+        ticket = preview_gate.ticket(user.pk)
+        try:
+            with preview_gate.turn(user.pk, ticket):
+                pdf, pdflatex_output, rendered_tpl = Latex.render(context, template)
+        except CompileBusy:
+            return HttpResponse(reason=reasons[4])
+        except PreviewSuperseded:
+            return HttpResponse(reason=reasons[5])
+        if not compile_runner.aborted(pdflatex_output):
+            preview_cache.set(key, pdf, pdflatex_output, rendered_tpl)
         return HttpResponse(pdf, content_type=content_type, reason=reasons[0])
     return HttpResponse(reason=reasons[3])
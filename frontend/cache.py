@@ -0,0 +1,156 @@
+"""Purpose of this file
+
+This file contains the cache of the course pages. The table of contents and the contents of
+a course are rendered once per course, viewer role, sorting, filtering and language and
+shared by all users with the same role. Every course has a version in the cache which is
+increased by the signals of the models shown on the course page, thereby all fragments of
+the course are invalidated at once. The cache is shared by all processes of the server
+(see CACHES), so that a change invalidates the fragments of every process.
+"""
+
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from base.models import CourseStructureEntry
+
+# re.Pattern: Pattern of the coursebook links of a content in a cached fragment, the first
+# link is shown if the content is in the coursebook of the user, the second one otherwise
+COURSEBOOK_MARKER = re.compile(
+    r'<!--coursebook:(\d+)-->(.*?)<!--else-->(.*?)<!--/coursebook-->', re.DOTALL)
+
+# dict[str, str]: The templates of the cached fragments of a course page
+FRAGMENT_TEMPLATES = {'toc': 'frontend/course/structure_toc.html',
+                      'contents': 'frontend/course/structure_contents.html'}
+
+# Version of all courses, which is increased if data shown on every course changes
+GLOBAL_VERSION_KEY = 'course-fragment-version'
+
+
+def version_key(course_id):
+    """Version key
+
+    Returns the cache key of the version of the course with the given id.
+
+    :param course_id: The id of the course
+    :type course_id: int
+
+    :return: the cache key of the version
+    :rtype: str
+    """
+    return f'{GLOBAL_VERSION_KEY}:{course_id}'
+
+
+def increase_version(key):
+    """Increase version
+
+    Increases the version stored with the given key. A missing version is created, since
+    the fragments of the old version can still exist if only the version was evicted.
+
+    :param key: The cache key of the version
+    :type key: str
+    """
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 2, None)
+
+
+def invalidate_courses(course_ids):
+    """Invalidate courses
+
+    Invalidates the cached fragments of the courses with the given ids.
+
+    :param course_ids: The ids of the courses
+    :type course_ids: Iterable[int]
+    """
+    for course_id in set(course_ids):
+        increase_version(version_key(course_id))
+
+
+def invalidate_topics(topic_ids):
+    """Invalidate topics
+
+    Invalidates the cached fragments of all courses containing one of the topics with the
+    given ids.
+
+    :param topic_ids: The ids of the topics
+    :type topic_ids: Iterable[int]
+    """
+    invalidate_courses(CourseStructureEntry.objects.filter(topic_id__in=set(topic_ids))
+                       .values_list('course_id', flat=True))
+
+
+def invalidate_all():
+    """Invalidate all
+
+    Invalidates the cached fragments of all courses.
+    """
+    increase_version(GLOBAL_VERSION_KEY)
+
+
+def fragment_key(course_id, *parts):
+    """Fragment key
+
+    Returns the cache key of data of a course page identified by the given parts, e.g.
+    the role of the viewer, the sorting and the filtering. The key contains the current
+    versions, so that the data of an older version is never read again.
+
+    :param course_id: The id of the course
+    :type course_id: int
+    :param parts: The parts identifying the data
+    :type parts: Any
+
+    :return: the cache key of the data
+    :rtype: str
+    """
+    versions = cache.get_many([GLOBAL_VERSION_KEY, version_key(course_id)])
+    return ':'.join([f'course-fragment:{course_id}',
+                     f'{versions.get(GLOBAL_VERSION_KEY, 1)}.'
+                     f'{versions.get(version_key(course_id), 1)}',
+                     *map(str, parts)])
+
+
+def render_fragments(key, context):
+    """Render fragments
+
+    Returns the rendered table of contents ('toc') and contents ('contents') of a course
+    page from the cache. If they are not cached, the templates are rendered and cached for
+    COURSE_FRAGMENT_CACHE_TIMEOUT seconds. The structure of the course in the context should
+    be loaded lazily, so that it is only loaded if the templates are rendered.
+
+    :param key: The cache key of the fragments
+    :type key: str
+    :param context: The context of the templates
+    :type context: dict[str, Any]
+
+    :return: the rendered fragments
+    :rtype: dict[str, str]
+    """
+    fragments = cache.get(key)
+    if fragments is None:
+        fragments = {name: render_to_string(template, context)
+                     for name, template in FRAGMENT_TEMPLATES.items()}
+        cache.set(key, fragments, settings.COURSE_FRAGMENT_CACHE_TIMEOUT)
+    return fragments
+
+
+def inject_coursebook(fragment, content_ids):
+    """Inject coursebook
+
+    Replaces the coursebook markers of a cached fragment with the links matching the
+    coursebook of the user.
+
+    :param fragment: The rendered fragment
+    :type fragment: str
+    :param content_ids: The ids of the contents in the coursebook of the user
+    :type content_ids: set[int]
+
+    :return: the fragment of the user
+    :rtype: str
+    """
+    return COURSEBOOK_MARKER.sub(
+        lambda match: match.group(2) if int(match.group(1)) in content_ids
+        else match.group(3), fragment)
@@ -6,7 +6,7 @@ This file contains forms associated with the course.
 from django import forms
 from django.utils.translation import gettext_lazy as _
 
-from base.models import Course, Topic
+from base.models import Category, Course, Topic
 from content.models import CONTENT_TYPES
 
 from content.widgets import ModifiedClearableFileInput
@@ -121,14 +121,25 @@ class FilterAndSortForm(forms.Form):
 class TopicChooseForm(forms.Form):
     """Topic choose form
 
-    Represents a combo box containing all topics group by category title and ordered by their title.
-    The topics are sorted by their category and internally by their title.
+    Represents a search for topics and a combo box containing the found topics. The topics
+    are not rendered with the form, they are loaded page by page from the topic search while
+    the title is entered, optionally within the chosen category.
 
+    :attr TopicChooseForm.topic_search: The field to enter a part of the topic title
+    :type TopicChooseForm.topic_search: CharField
+    :attr TopicChooseForm.search_category: The category to search in
+    :type TopicChooseForm.search_category: ModelChoiceField
     :attr TopicChooseForm.topic_name: The combo box
     :type TopicChooseForm.topic_name: ModelChoiceField
     """
+    topic_search = forms.CharField(required=False,
+                                   label=_('Search Topic'),
+                                   widget=forms.TextInput(attrs={'autocomplete': 'off'}))
+    search_category = forms.ModelChoiceField(required=False,
+                                             queryset=Category.objects.order_by('title'),
+                                             label=_('Category'))
     topic_name = forms.ModelChoiceField(required=False,
-                                        queryset=Topic.objects.order_by('category__title', 'title'),
+                                        queryset=Topic.objects.none(),
                                         label=_('Topics'))
 
 
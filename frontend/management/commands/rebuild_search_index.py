@@ -0,0 +1,112 @@
+"""Purpose of this file
+
+This file contains the management command which rebuilds the search documents of the
+courses, topics and contents.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from base.models import Content, Course, SearchDocument, Topic
+from content.models import CONTENT_TYPES
+
+from frontend.search import ensure_index, index_all, process_queue
+
+
+def run(kind, objects, chunk_size):
+    """Run
+
+    Indexes the given objects in a thread of the executor.
+
+    :param kind: The kind of the objects
+    :type kind: str
+    :param objects: The objects to index
+    :type objects: QuerySet
+    :param chunk_size: The number of objects per chunk
+    :type chunk_size: int or None
+
+    :return: the number of indexed objects
+    :rtype: int
+    """
+    try:
+        return index_all(kind, objects, chunk_size)
+    finally:
+        # The thread is not managed by Django, so its connection is not closed otherwise
+        connection.close()
+
+
+class Command(BaseCommand):
+    """Rebuild search index
+
+    Updates the search documents of all courses, topics and contents, e.g. after the search
+    was introduced or the index was restored. The objects are read in chunks, so that the
+    memory is bounded. The courses, the topics and the contents of every content type are
+    indexed by separate tasks, which can run in parallel. Afterwards the changes enqueued in
+    the meantime are processed. Missing triggers of the search index are recreated first.
+    With --queue only the enqueued changes are processed, which can be run periodically to
+    process the entries left over by failed updates.
+
+    :attr Command.help: The help text of the command
+    :type Command.help: str
+    """
+    help = 'Rebuilds the search documents of the courses, topics and contents.'
+
+    def add_arguments(self, parser):
+        """Add arguments
+
+        Adds the arguments of the command.
+
+        :param parser: The argument parser
+        :type parser: CommandParser
+        """
+        parser.add_argument('--queue', action='store_true',
+                            help='Only process the enqueued changes.')
+        parser.add_argument('--kind', action='append',
+                            choices=[kind for kind, _ in
+                                     SearchDocument._meta.get_field('kind').choices],
+                            help='The kind of objects to index, by default all kinds.')
+        parser.add_argument('--chunk-size', type=int,
+                            help='The number of objects per chunk, by default '
+                                 'SEARCH_INDEX_BATCH_SIZE.')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='The number of tasks running in parallel. SQLite allows '
+                                 'only one writer at a time.')
+
+    def handle(self, *args, **options):
+        """Handle
+
+        Rebuilds the search documents of the chosen kinds or only processes the queue.
+
+        :param args: The arguments
+        :type args: Any
+        :param options: The options of the command
+        :type options: dict[str, Any]
+        """
+        if options['queue']:
+            self.stdout.write(f'Processed {process_queue()} queued changes.')
+            return
+        recreated = ensure_index()
+        if recreated:
+            self.stdout.write(f'Recreated the triggers {", ".join(recreated)}.')
+        kinds = options['kind'] or [SearchDocument.KIND_COURSE, SearchDocument.KIND_TOPIC,
+                                    SearchDocument.KIND_CONTENT]
+        tasks = []
+        if SearchDocument.KIND_COURSE in kinds:
+            tasks.append((SearchDocument.KIND_COURSE, Course.objects.all()))
+        if SearchDocument.KIND_TOPIC in kinds:
+            tasks.append((SearchDocument.KIND_TOPIC, Topic.objects.all()))
+        if SearchDocument.KIND_CONTENT in kinds:
+            tasks.extend((SearchDocument.KIND_CONTENT, Content.objects.filter(type=content_type))
+                         for content_type in CONTENT_TYPES)
+
+        if options['workers'] > 1:
+            with ThreadPoolExecutor(max_workers=options['workers'],
+                                    thread_name_prefix='search-index') as executor:
+                counts = list(executor.map(
+                    lambda task: run(*task, options['chunk_size']), tasks))
+        else:
+            counts = [index_all(*task, options['chunk_size']) for task in tasks]
+        self.stdout.write(f'Indexed {sum(counts)} objects.')
+        self.stdout.write(f'Processed {process_queue()} queued changes.')
@@ -0,0 +1,356 @@
+"""Purpose of this file
+
+This file contains the receivers which invalidate the cached fragments of the course pages
+if the data shown on them changes and which enqueue the changed courses, topics and contents
+whose search documents are updated. After every migration the triggers of the search index
+are recreated if a migration dropped them.
+"""
+
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from reversion.signals import post_revision_commit
+
+from base.models import Category, Content, Course, CourseStructureEntry, Favorite, Rating, Tag, \
+    Topic, SearchDocument
+from content.models import CONTENT_TYPES
+
+from frontend.cache import fragment_key, invalidate_all, invalidate_courses, invalidate_topics
+from frontend.search import CONTENT_TEXT_FIELDS, enqueue, ensure_index
+
+
+@receiver(post_save, sender=Content)
+@receiver(post_delete, sender=Content)
+def invalidate_content(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate content
+
+    Invalidates the courses containing the topic of a saved or deleted content.
+
+    :param sender: The model class
+    :type sender: type
+    :param instance: The saved or deleted content
+    :type instance: Content
+    :param kwargs: The keyword arguments
+    :type kwargs: dict[str, Any]
+    """
+    invalidate_topics([instance.topic_id])
+
+
+@receiver(m2m_changed, sender=Content.tags.through)
+def invalidate_content_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    # pylint: disable=unused-argument,too-many-arguments
+    """Invalidate content tags
+
+    Invalidates the courses containing the topics of contents whose tags changed.
+
+    :param sender: The intermediate model class
+    :type sender: type
+    :param instance: The content or the tag whose relation changed
+    :type instance: Content or Tag
+    :param action: The kind of the change
+    :type action: str
+    :param reverse: Indicator if the relation was changed from the side of the tag
+    :type reverse: bool
+    :param pk_set: The primary keys of the added or removed objects
+    :type pk_set: set[int] or None
+    :param kwargs: The keyword arguments
+    :type kwargs: dict[str, Any]
+    """
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_topics([instance.topic_id])
+    elif pk_set:
+        invalidate_topics(Content.objects.filter(pk__in=pk_set)
+                          .values_list('topic_id', flat=True))
+    else:
+        invalidate_all()
+
+
+def invalidate_content_type(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate content type
+
+    Invalidates the courses containing the topic of a content whose content type model
+    was saved or deleted, e.g. because its image changed.
+
+    :param sender: The model class
+    :type sender: type
+    :param instance: The saved or deleted content type model
+    :type instance: BaseContentModel
+    :param kwargs: The keyword arguments
+    :type kwargs: dict[str, Any]
+    """
+    invalidate_topics(Content.objects.filter(pk=instance.content_id)
+                      .values_list('topic_id', flat=True))
+
+
+for content_model in CONTENT_TYPES.values():
+    post_save.connect(invalidate_content_type, sender=content_model)
+    post_delete.connect(invalidate_content_type, sender=content_model)
+
+
+@receiver(post_save, sender=CourseStructureEntry)
+@receiver(post_delete, sender=CourseStructureEntry)
+def invalidate_structure(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate structure
+
+    Invalidates the course of a saved or deleted course structure entry.
+
+    :param sender: The model class
+    :type sender: type
+    :param instance: The saved or deleted entry
+    :type instance: CourseStructureEntry
+    :param kwargs: The keyword arguments
+    :type kwargs: dict[str, Any]
+    """
+    invalidate_courses([instance.course_id])
+
+
+@receiver(post_save, sender=Topic)
+def invalidate_topic(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate topic
+
+    Invalidates the courses containing a saved topic, e.g. because its title changed.
+
+    :param sender: The model class
+    :type sender: type
+    :param instance: The saved topic
+    :type instance: Topic
+    :param kwargs: The keyword arguments
+    :type kwargs: dict[str, Any]
+    """
+    invalidate_topics([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def invalidate_category(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate category
+
+    Invalidates all courses if a category was saved, since the names of the topics in the
+    structure editor contain their category.
+
+    :param sender: The model class
+    :type sender: type
+    :param instance: The saved category
+    :type instance: Category
+    :param kwargs: The keyword arguments
+    :type kwargs: dict[str, Any]
+    """
+    invalidate_all()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate tag
+
+    Invalidates all courses if a tag was renamed or deleted, since the tags of the contents
+    of every course can be affected.
+
+    :param sender: The model class
+    :type sender: type
+    :param instance: The saved or deleted tag
+    :type instance: Tag
+    :param kwargs: The keyword arguments
+    :type kwargs: dict[str, Any]
+    """
+    invalidate_all()
+
+
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+def invalidate_rating(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate rating
+
+    Invalidates the courses containing the rated content, since the cards show the rating
+    aggregates of the contents.
+
+    :param sender: The model class
+    :type sender: type
+    :param instance: The saved or deleted rating
+    :type instance: Rating
+    :param kwargs: The keyword arguments
+    :type kwargs: dict[str, Any]
+    """
+    invalidate_topics(Content.objects.filter(pk=instance.content_id)
+                      .values_list('topic_id', flat=True))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def invalidate_favorite(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate favorite
+
+    Removes the cached coursebook of the user of a saved or deleted favorite. The shared
+    fragments are kept, since the coursebook links are injected per user.
+
+    :param sender: The model class
+    :type sender: type
+    :param instance: The saved or deleted favorite
+    :type instance: Favorite
+    :param kwargs: The keyword arguments
+    :type kwargs: dict[str, Any]
+    """
+    cache.delete(fragment_key(instance.course_id, 'coursebook', instance.user_id))
+
+
+@receiver(post_revision_commit)
+def invalidate_revision(sender, revision, versions, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate revision
+
+    Invalidates the courses and the courses containing the contents of which a revision
+    was created, e.g. by a revert in the history.
+
+    :param sender: The sender of the signal
+    :type sender: Any
+    :param revision: The committed revision
+    :type revision: Revision
+    :param versions: The versions of the revision
+    :type versions: list[Version]
+    :param kwargs: The keyword arguments
+    :type kwargs: dict[str, Any]
+    """
+    course_ids = []
+    content_ids = []
+    for version in versions:
+        model = version.content_type.model_class()
+        if model is Course:
+            course_ids.append(version.object_id)
+        elif model is Content or model in CONTENT_TYPES.values():
+            content_ids.append(version.object_id)
+    invalidate_courses(course_ids)
+    if content_ids:
+        invalidate_topics(Content.objects.filter(pk__in=content_ids)
+                          .values_list('topic_id', flat=True))
+
+
+@receiver(post_save, sender=Course)
+def index_course(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Index course
+
+    Enqueues a saved course, whose search document is updated after the commit. The
+    documents of deleted objects are deleted with them.
+
+    :param sender: The model class
+    :type sender: type
+    :param instance: The saved course
+    :type instance: Course
+    :param kwargs: The keyword arguments
+    :type kwargs: dict[str, Any]
+    """
+    enqueue(SearchDocument.KIND_COURSE, [instance.pk])
+
+
+@receiver(post_save, sender=Topic)
+def index_topic(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Index topic
+
+    Enqueues a saved topic, whose search document is updated after the commit.
+
+    :param sender: The model class
+    :type sender: type
+    :param instance: The saved topic
+    :type instance: Topic
+    :param kwargs: The keyword arguments
+    :type kwargs: dict[str, Any]
+    """
+    enqueue(SearchDocument.KIND_TOPIC, [instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def index_category(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Index category
+
+    Enqueues the topics of a saved category, since the category of a topic is searched
+    too.
+
+    :param sender: The model class
+    :type sender: type
+    :param instance: The saved category
+    :type instance: Category
+    :param kwargs: The keyword arguments
+    :type kwargs: dict[str, Any]
+    """
+    enqueue(SearchDocument.KIND_TOPIC, instance.topics.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Content)
+def index_content(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Index content
+
+    Enqueues a saved content, whose search document is updated after the commit.
+
+    :param sender: The model class
+    :type sender: type
+    :param instance: The saved content
+    :type instance: Content
+    :param kwargs: The keyword arguments
+    :type kwargs: dict[str, Any]
+    """
+    enqueue(SearchDocument.KIND_CONTENT, [instance.pk])
+
+
+def index_content_type(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Index content type
+
+    Enqueues the content of a saved content type model whose text is searched.
+
+    :param sender: The model class
+    :type sender: type
+    :param instance: The saved content type model
+    :type instance: BaseContentModel
+    :param kwargs: The keyword arguments
+    :type kwargs: dict[str, Any]
+    """
+    enqueue(SearchDocument.KIND_CONTENT, [instance.content_id])
+
+
+for content_type in CONTENT_TEXT_FIELDS:
+    post_save.connect(index_content_type, sender=CONTENT_TYPES[content_type])
+
+
+@receiver(post_revision_commit)
+def index_revision(sender, revision, versions, **kwargs):  # pylint: disable=unused-argument
+    """Index revision
+
+    Enqueues the courses and contents of which a revision was created. Thereby the reverts
+    in the history, which restore the content type models from their serialized versions,
+    are indexed too.
+
+    :param sender: The sender of the signal
+    :type sender: Any
+    :param revision: The committed revision
+    :type revision: Revision
+    :param versions: The versions of the revision
+    :type versions: list[Version]
+    :param kwargs: The keyword arguments
+    :type kwargs: dict[str, Any]
+    """
+    ids = {SearchDocument.KIND_COURSE: set(), SearchDocument.KIND_CONTENT: set()}
+    for version in versions:
+        model = version.content_type.model_class()
+        if model is Course:
+            ids[SearchDocument.KIND_COURSE].add(int(version.object_id))
+        elif model is Content or model in CONTENT_TYPES.values():
+            ids[SearchDocument.KIND_CONTENT].add(int(version.object_id))
+    for kind, object_ids in ids.items():
+        enqueue(kind, object_ids)
+
+
+@receiver(post_migrate)
+def ensure_search_index(sender, using, **kwargs):
+    """Ensure search index
+
+    Recreates the triggers of the search index after the migrations of the base, since
+    SQLite drops them if a migration remakes the table of the search documents.
+
+    :param sender: The configuration of the migrated application
+    :type sender: AppConfig
+    :param using: The alias of the migrated database
+    :type using: str
+    :param kwargs: The keyword arguments
+    :type kwargs: dict[str, Any]
+    """
+    if sender.label == 'base':
+        ensure_index(using)
@@ -0,0 +1,540 @@
+"""Purpose of this file
+
+This file contains the full-text search over the courses, topics and contents. Their text is
+copied into search documents, which are indexed by the database: SQLite uses an FTS5 table
+and PostgreSQL a generated tsvector column with a GIN index. Both are queried through the
+same backend interface, which filters and ranks the documents by relevance. Other databases
+fall back to an unranked substring match.
+
+Changed objects are enqueued in the transaction changing them. After the commit only the
+entries of this transaction are processed, so that a request is never delayed by the
+changes of other requests. Entries left over, e.g. after an error, are processed by the
+command rebuild_search_index.
+"""
+
+import logging
+import re
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import FloatField, Q, Value
+
+from base.models import Content, Course, CourseStructureEntry, SearchDocument, \
+    SearchQueueEntry, Topic
+from content.models import CONTENT_TYPES
+
+logger = logging.getLogger(__name__)
+
+# re.Pattern: Pattern of the terms of a query, the remaining characters are ignored so that
+# the query never contains syntax of the full-text search
+TERM = re.compile(r'\w+')
+
+# Maximum number of terms of a query which are searched
+MAX_TERMS = 10
+
+# dict[str, str]: The fields of the content types whose text is searched
+CONTENT_TEXT_FIELDS = {'Textfield': 'textfield', 'MD': 'textfield', 'Latex': 'textfield'}
+
+
+def search_terms(query):
+    """Search terms
+
+    Returns the terms of the given query in lower case.
+
+    :param query: The query of the user
+    :type query: str
+
+    :return: the terms of the query
+    :rtype: list[str]
+    """
+    return TERM.findall(query.lower())[:MAX_TERMS]
+
+
+class SearchBackend:
+    """Search backend
+
+    The fallback backend of databases without full-text search, which matches every term as
+    substring of the title or the body. All documents are ranked equally.
+    """
+
+    def match(self, documents, terms):
+        """Match
+
+        Restricts the given documents to the ones containing all terms and orders them by
+        their relevance, the best match first.
+
+        :param documents: The documents to search
+        :type documents: QuerySet[SearchDocument]
+        :param terms: The terms of the query
+        :type terms: list[str]
+
+        :return: the matching documents
+        :rtype: QuerySet[SearchDocument]
+        """
+        for term in terms:
+            documents = documents.filter(Q(title__icontains=term) | Q(body__icontains=term))
+        return documents.annotate(rank=Value(0.0, output_field=FloatField())).order_by('pk')
+
+
+class SQLiteBackend(SearchBackend):
+    """SQLite backend
+
+    Searches the FTS5 table of the documents, every term matches as prefix of a word. The
+    documents are ranked with BM25, where the title weighs ten times as much as the body.
+
+    :attr SQLiteBackend.table: The name of the FTS5 table
+    :type SQLiteBackend.table: str
+    """
+    table = f'{SearchDocument._meta.db_table}_fts'
+
+    def match(self, documents, terms):
+        """Match
+
+        Restricts the given documents to the ones containing all terms and orders them by
+        their relevance, the best match first.
+
+        :param documents: The documents to search
+        :type documents: QuerySet[SearchDocument]
+        :param terms: The terms of the query
+        :type terms: list[str]
+
+        :return: the matching documents
+        :rtype: QuerySet[SearchDocument]
+        """
+        expression = ' '.join(f'"{term}"*' for term in terms)
+        # bm25 returns lower values for better matches
+        return documents.extra(
+            tables=[self.table],
+            where=[f'{self.table}.rowid = {SearchDocument._meta.db_table}.id',
+                   f'{self.table} MATCH %s'],
+            params=[expression],
+            select={'rank': f'-bm25({self.table}, 10.0, 1.0)'}) \
+            .order_by('-rank', 'pk')
+
+
+class PostgreSQLBackend(SearchBackend):
+    """PostgreSQL backend
+
+    Searches the generated tsvector column of the documents, every term matches as prefix of
+    a word. The documents are ranked with the cover density, where the title is weighted
+    higher than the body.
+
+    :attr PostgreSQLBackend.config: The text search configuration of the vector
+    :type PostgreSQLBackend.config: str
+    """
+    config = 'simple'
+
+    def match(self, documents, terms):
+        """Match
+
+        Restricts the given documents to the ones containing all terms and orders them by
+        their relevance, the best match first.
+
+        :param documents: The documents to search
+        :type documents: QuerySet[SearchDocument]
+        :param terms: The terms of the query
+        :type terms: list[str]
+
+        :return: the matching documents
+        :rtype: QuerySet[SearchDocument]
+        """
+        expression = ' & '.join(f'{term}:*' for term in terms)
+        query = 'to_tsquery(%s::regconfig, %s)'
+        return documents.extra(
+            where=[f'search_vector @@ {query}'],
+            params=[self.config, expression],
+            select={'rank': f'ts_rank_cd(search_vector, {query})'},
+            select_params=[self.config, expression]) \
+            .order_by('-rank', 'pk')
+
+
+@lru_cache(maxsize=None)
+def backend_for(vendor, fts5):
+    """Backend for
+
+    Returns the backend of the given database.
+
+    :param vendor: The vendor of the database
+    :type vendor: str
+    :param fts5: Indicator if SQLite supports FTS5
+    :type fts5: bool
+
+    :return: the backend of the database
+    :rtype: SearchBackend
+    """
+    if vendor == 'postgresql':
+        return PostgreSQLBackend()
+    if vendor == 'sqlite' and fts5:
+        return SQLiteBackend()
+    return SearchBackend()
+
+
+@lru_cache(maxsize=None)
+def sqlite_has_fts5():
+    """SQLite has FTS5
+
+    Returns whether the SQLite library supports FTS5, which is required for the index
+    created by the migration.
+
+    :return: true if FTS5 is supported
+    :rtype: bool
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        return ('ENABLE_FTS5',) in cursor.fetchall()
+
+
+def backend():
+    """Backend
+
+    Returns the backend of the default database.
+
+    :return: the backend of the database
+    :rtype: SearchBackend
+    """
+    return backend_for(connection.vendor, connection.vendor == 'sqlite' and sqlite_has_fts5())
+
+
+# dict[str, str]: The triggers keeping the FTS5 table in sync with the documents on SQLite,
+# which are created by the migration of the documents
+SQLITE_TRIGGERS = {
+    f'{SQLiteBackend.table}_insert':
+        f"CREATE TRIGGER {SQLiteBackend.table}_insert AFTER INSERT ON "
+        f"{SearchDocument._meta.db_table} BEGIN "
+        f"INSERT INTO {SQLiteBackend.table}(rowid, title, body) "
+        f"VALUES (new.id, new.title, new.body); END",
+    f'{SQLiteBackend.table}_delete':
+        f"CREATE TRIGGER {SQLiteBackend.table}_delete AFTER DELETE ON "
+        f"{SearchDocument._meta.db_table} BEGIN "
+        f"INSERT INTO {SQLiteBackend.table}({SQLiteBackend.table}, rowid, title, body) "
+        f"VALUES ('delete', old.id, old.title, old.body); END",
+    f'{SQLiteBackend.table}_update':
+        f"CREATE TRIGGER {SQLiteBackend.table}_update AFTER UPDATE ON "
+        f"{SearchDocument._meta.db_table} BEGIN "
+        f"INSERT INTO {SQLiteBackend.table}({SQLiteBackend.table}, rowid, title, body) "
+        f"VALUES ('delete', old.id, old.title, old.body); "
+        f"INSERT INTO {SQLiteBackend.table}(rowid, title, body) "
+        f"VALUES (new.id, new.title, new.body); END",
+}
+
+
+def ensure_index(using=DEFAULT_DB_ALIAS):
+    """Ensure index
+
+    Recreates the missing triggers of the FTS5 table on SQLite. SQLite drops the triggers
+    with the table of the documents, e.g. if a migration remakes the table to alter it. The
+    FTS5 table is rebuilt afterwards, since the documents changed without the triggers are
+    missing in it. Other databases and SQLite without the FTS5 table are left unchanged.
+
+    :param using: The alias of the database
+    :type using: str
+
+    :return: the names of the recreated triggers
+    :rtype: list[str]
+    """
+    database = connections[using]
+    if database.vendor != 'sqlite':
+        return []
+    with transaction.atomic(using=using), database.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE name IN (%s, %s, %s, %s)",
+                       [SQLiteBackend.table, *SQLITE_TRIGGERS])
+        existing = {name for name, in cursor.fetchall()}
+        if SQLiteBackend.table not in existing:
+            return []
+        missing = [name for name in SQLITE_TRIGGERS if name not in existing]
+        for name in missing:
+            cursor.execute(SQLITE_TRIGGERS[name])
+        if missing:
+            cursor.execute(f"INSERT INTO {SQLiteBackend.table}({SQLiteBackend.table}) "
+                           f"VALUES ('rebuild')")
+    if missing:
+        logger.warning('Recreated the triggers of the search index: %s', ', '.join(missing))
+    return missing
+
+
+def visible_documents(profile):
+    """Visible documents
+
+    Returns the documents visible to the given user. Users see all courses and topics and
+    the contents which are not hidden, which they authored or which are in a course they
+    moderate. Anonymous users only see the public courses, the topics of public courses and
+    their public contents which are not hidden.
+
+    :param profile: The user searching or None for an anonymous user
+    :type profile: Profile or None
+
+    :return: the visible documents
+    :rtype: QuerySet[SearchDocument]
+    """
+    documents = SearchDocument.objects.all()
+    if profile is None:
+        public_topics = CourseStructureEntry.objects.filter(course__public=True) \
+            .values('topic_id')
+        return documents.filter(
+            Q(kind=SearchDocument.KIND_COURSE, public=True)
+            | Q(kind=SearchDocument.KIND_TOPIC, topic__in=public_topics)
+            | Q(kind=SearchDocument.KIND_CONTENT, public=True, hidden=False,
+                topic__in=public_topics))
+    moderated_topics = CourseStructureEntry.objects.filter(course__moderators=profile) \
+        .values('topic_id')
+    return documents.filter(Q(hidden=False) | Q(author=profile) | Q(topic__in=moderated_topics))
+
+
+def search(query, profile):
+    """Search
+
+    Returns the documents visible to the given user matching all terms of the query, ordered
+    by their relevance. The queryset can be paginated.
+
+    :param query: The query of the user
+    :type query: str
+    :param profile: The user searching or None for an anonymous user
+    :type profile: Profile or None
+
+    :return: the matching documents
+    :rtype: QuerySet[SearchDocument]
+    """
+    terms = search_terms(query)
+    if not terms:
+        return SearchDocument.objects.none()
+    return backend().match(visible_documents(profile), terms).select_related('content')
+
+
+def course_document(course):
+    """Course document
+
+    Returns the search document of the given course.
+
+    :param course: The course
+    :type course: Course
+
+    :return: the document of the course
+    :rtype: SearchDocument
+    """
+    return SearchDocument(kind=SearchDocument.KIND_COURSE, course=course,
+                          title=course.title, body=course.description,
+                          public=course.public)
+
+
+def topic_document(topic):
+    """Topic document
+
+    Returns the search document of the given topic, whose category is searched too.
+
+    :param topic: The topic
+    :type topic: Topic
+
+    :return: the document of the topic
+    :rtype: SearchDocument
+    """
+    return SearchDocument(kind=SearchDocument.KIND_TOPIC, topic=topic,
+                          title=topic.title, body=topic.category.title)
+
+
+def content_document(content):
+    """Content document
+
+    Returns the search document of the given content. The description is its title and the
+    text of text, Markdown and LaTeX contents is its body.
+
+    :param content: The content with its content type model selected
+    :type content: Content
+
+    :return: the document of the content
+    :rtype: SearchDocument
+    """
+    body = ''
+    if content.type in CONTENT_TEXT_FIELDS:
+        related_name = CONTENT_TYPES[content.type]._meta.get_field('content') \
+            .related_query_name()
+        model = getattr(content, related_name, None)
+        if model is not None:
+            body = getattr(model, CONTENT_TEXT_FIELDS[content.type]) or ''
+    return SearchDocument(kind=SearchDocument.KIND_CONTENT, content=content,
+                          topic_id=content.topic_id, author_id=content.author_id,
+                          title=content.description, body=body,
+                          public=content.public, hidden=content.hidden)
+
+
+def content_queryset():
+    """Content queryset
+
+    Returns the queryset of contents which loads the models of the searched content types.
+
+    :return: the queryset of contents
+    :rtype: QuerySet[Content]
+    """
+    return Content.objects.select_related(
+        *{CONTENT_TYPES[content_type]._meta.get_field('content').related_query_name()
+          for content_type in CONTENT_TEXT_FIELDS})
+
+
+# dict[str, tuple[Callable, Callable]]: The queryset of the objects and the function creating
+# their documents per kind of document
+DOCUMENT_SOURCES = {
+    SearchDocument.KIND_COURSE: (Course.objects.all, course_document),
+    SearchDocument.KIND_TOPIC: (lambda: Topic.objects.select_related('category'),
+                                topic_document),
+    SearchDocument.KIND_CONTENT: (content_queryset, content_document),
+}
+
+
+def update_documents(kind, ids):
+    """Update documents
+
+    Replaces the documents of the objects of the given kind with the given ids with new
+    documents of their current state. The documents of deleted objects are deleted with
+    the objects.
+
+    :param kind: The kind of the objects
+    :type kind: str
+    :param ids: The ids of the objects
+    :type ids: Iterable[int]
+    """
+    ids = set(ids)
+    if not ids:
+        return
+    queryset, document = DOCUMENT_SOURCES[kind]
+    with transaction.atomic():
+        # The objects are locked first, so that concurrent updates of the same documents
+        # are serialized
+        instances = list(queryset().filter(pk__in=ids).select_for_update(of=('self',)))
+        SearchDocument.objects.filter(kind=kind, **{f'{kind}_id__in': ids}).delete()
+        SearchDocument.objects.bulk_create(document(instance) for instance in instances)
+
+
+def enqueue(kind, ids):
+    """Enqueue
+
+    Enqueues the objects of the given kind with the given ids, whose documents are updated
+    after the current transaction was committed.
+
+    :param kind: The kind of the objects
+    :type kind: str
+    :param ids: The ids of the objects
+    :type ids: Iterable[int]
+    """
+    ids = set(ids)
+    entries = [SearchQueueEntry(kind=kind, object_id=object_id) for object_id in ids]
+    if entries:
+        SearchQueueEntry.objects.bulk_create(entries)
+        transaction.on_commit(lambda: flush(kind, ids))
+
+
+def process_queue(batch_size=None, kind=None, ids=None):
+    """Process queue
+
+    Updates the documents of the enqueued objects in batches of SEARCH_INDEX_BATCH_SIZE
+    entries until the queue is empty. Every batch is claimed in its own transaction, the
+    entries locked by other processes are skipped. If a kind and ids are given, only the
+    entries of these objects are processed.
+
+    :param batch_size: The number of entries per batch
+    :type batch_size: int or None
+    :param kind: The kind of the objects whose entries are processed or None for all
+    :type kind: str or None
+    :param ids: The ids of the objects whose entries are processed
+    :type ids: Iterable[int] or None
+
+    :return: the number of processed entries
+    :rtype: int
+    """
+    batch_size = batch_size or settings.SEARCH_INDEX_BATCH_SIZE
+    queue = SearchQueueEntry.objects.all()
+    if kind is not None:
+        queue = queue.filter(kind=kind, object_id__in=ids)
+    count = 0
+    while True:
+        with transaction.atomic():
+            entries = list(queue.select_for_update(skip_locked=True)
+                           .order_by('pk').values_list('pk', 'kind', 'object_id')[:batch_size])
+            if not entries:
+                return count
+            ids = defaultdict(set)
+            for _pk, kind, object_id in entries:
+                ids[kind].add(object_id)
+            for kind, object_ids in ids.items():
+                update_documents(kind, object_ids)
+            SearchQueueEntry.objects.filter(pk__in=[entry[0] for entry in entries]).delete()
+        count += len(entries)
+
+
+def flush(kind, ids):
+    """Flush
+
+    Processes the entries of the given objects after the commit of the transaction which
+    enqueued them, the ids are processed in chunks of SEARCH_INDEX_BATCH_SIZE ids. The
+    entries of other transactions are left to their own flush or the command. Errors are
+    logged, since the response should not fail because of the index, the entries are kept
+    and processed by the command rebuild_search_index.
+
+    :param kind: The kind of the objects
+    :type kind: str
+    :param ids: The ids of the objects
+    :type ids: set[int]
+    """
+    ids = sorted(ids)
+    chunk_size = settings.SEARCH_INDEX_BATCH_SIZE
+    try:
+        for start in range(0, len(ids), chunk_size):
+            process_queue(kind=kind, ids=ids[start:start + chunk_size])
+    except Exception:  # pylint: disable=broad-except
+        logger.exception('The search queue could not be processed')
+
+
+def index_all(kind, objects, chunk_size=None):
+    """Index all
+
+    Updates the documents of all given objects of the given kind. The ids are read in chunks
+    of SEARCH_INDEX_BATCH_SIZE ids, so that the memory is bounded independent of the number
+    of objects.
+
+    :param kind: The kind of the objects
+    :type kind: str
+    :param objects: The objects to index
+    :type objects: QuerySet
+    :param chunk_size: The number of objects per chunk
+    :type chunk_size: int or None
+
+    :return: the number of indexed objects
+    :rtype: int
+    """
+    chunk_size = chunk_size or settings.SEARCH_INDEX_BATCH_SIZE
+    count = 0
+    last = 0
+    while True:
+        ids = list(objects.filter(pk__gt=last).order_by('pk')
+                   .values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return count
+        update_documents(kind, ids)
+        count += len(ids)
+        last = ids[-1]
+
+
+def document_courses(documents, public=False):
+    """Document courses
+
+    Returns the courses containing the topics of the given topic and content documents with
+    one query, so that the results can link to them.
+
+    :param documents: The documents
+    :type documents: list[SearchDocument]
+    :param public: Indicator if only public courses are returned
+    :type public: bool
+
+    :return: the courses per topic id
+    :rtype: dict[int, list[Course]]
+    """
+    entries = CourseStructureEntry.objects \
+        .filter(topic_id__in={document.topic_id for document in documents
+                              if document.topic_id is not None}) \
+        .select_related('course').order_by('course__title')
+    if public:
+        entries = entries.filter(course__public=True)
+    courses = {}
+    for entry in entries:
+        courses.setdefault(entry.topic_id, []).append(entry.course)
+    return courses
@@ -0,0 +1,50 @@
+/**
+ * The interval in milliseconds in which the status of an export is polled.
+ * @type {number}
+ */
+const EXPORT_POLL_INTERVAL = 2000;
+
+/**
+ * Polls the status of the given export job until it is finished and navigates to the download
+ * of the exported file afterwards.
+ *
+ * @param job the export job as returned by the server
+ */
+function pollExport(job) {
+    if (job["status"] === "done" || job["status"] === "failed") {
+        window.location.href = job["download_url"];
+        return;
+    }
+    setTimeout(function () {
+        $.ajax({
+            url: job["status_url"],
+            type: 'GET',
+            success: pollExport,
+            error: function (data) {
+                const message = gettext("Error during data transfer to the server - status: %s");
+                showNotification(interpolate(message, [data.status]), "alert-danger");
+            }
+        });
+    }, EXPORT_POLL_INTERVAL);
+}
+
+/**
+ * Requests the export of a course or a coursebook. The export is compiled in the background,
+ * the file is downloaded as soon as it is finished.
+ *
+ * @param url the url of the export
+ */
+function requestExport(url) {
+    sendRequest({
+        url: url,
+        data: {},
+        success: function (job) {
+            showNotification(gettext("The export is being compiled, the download will start automatically."), "alert-info");
+            pollExport(job);
+        },
+        error: function (data) {
+            const message = gettext("Error during data transfer to the server - status: %s");
+            showNotification(interpolate(message, [data.status]), "alert-danger");
+        }
+    });
+}
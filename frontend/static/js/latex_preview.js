@@ -56,6 +56,9 @@ function sendPreviewRequest(args) {
                 // Return visibility for preview frame
                 previewFrame.removeAttribute("style");
             }
+            else if (reason == "Superseded") {
+                // A newer preview was requested, its response updates the preview frame
+            }
             else {
                 const message = gettext("Failed to generate preview - reason: " + reason + ".");
                 showNotification(message, "alert-danger");
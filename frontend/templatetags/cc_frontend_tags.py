@@ -12,7 +12,7 @@ from base.models import Favorite
 
 from collab_coursebook.settings import ALLOW_PUBLIC_COURSE_EDITING_BY_EVERYONE
 
-from content.models import CONTENT_TYPES
+from content.models import CONTENT_TYPES, variant_name
 
 from datetime import timedelta
 
@@ -138,6 +138,23 @@ def content_card(content_type):
     return "content/cards/blank.html"
 
 
+@register.filter
+def preview_url(preview, size):
+    """Preview URL
+
+    Gets the URL of the preview thumbnail of the given size.
+
+    :param preview: The preview of the content
+    :type preview: ImageFieldFile
+    :param size: The size of the thumbnail, one of PREVIEW_THUMBNAIL_WIDTHS
+    :type size: str
+
+    :return: the URL of the thumbnail
+    :rtype: str
+    """
+    return preview.storage.url(variant_name(preview.name, size))
+
+
 @register.filter
 def check_edit_course_permission(user, course):
     """Edit course permission
@@ -9,7 +9,7 @@ from django.utils.translation import gettext_lazy as _
 
 from content.models import CONTENT_TYPES
 
-from export.views import generate_coursebook_response
+from export.views import generate_coursebook_response, export_status, export_download
 
 from frontend import views
 
@@ -72,6 +72,9 @@ urlpatterns = [
     path('search/',
          views.search.SearchView.as_view(),
          name='search'),
+    path('search/topics/',
+         views.search.search_topics,
+         name='topic-search'),
     path('tutorial/',
          views.TutorialView.as_view(),
          name='tutorial'),
@@ -235,5 +238,14 @@ urlpatterns = [
              name='period-courses'),
     ])),
 
+    path('export/<int:pk>/', include([
+        path('',
+             export_status,
+             name='export-status'),
+        path('download/',
+             export_download,
+             name='export-download'),
+    ])),
+
     path('jsi18n/', JavaScriptCatalog.as_view(), name='javascript-catalog'),
 ]
@@ -21,4 +21,4 @@ from .page import StartView, DashboardView, TutorialView, PrivacyNoteView, Accep
 
 from .profile import ProfileView, ProfileEditView
 
-from .search import SearchView
+from .search import SearchView, search_topics
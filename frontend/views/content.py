@@ -7,6 +7,7 @@ This file describes the frontend views related to content types.
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.messages.views import SuccessMessageMixin
+from django.db import transaction
 from django.http import HttpResponseRedirect, HttpResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse_lazy, reverse
@@ -22,6 +23,7 @@ from content.attachment.forms import ImageAttachmentFormSet, LatexPreviewImageAt
 from content.attachment.models import ImageAttachment, IMAGE_ATTACHMENT_TYPES
 from content.forms import CONTENT_TYPE_FORMS, EditMD
 from content.models import CONTENT_TYPES
+from content.previews import schedule_preview
 from content.static.yt_api import timestamp_to_seconds
 
 from frontend.forms.comment import CommentForm
@@ -31,6 +33,7 @@ from frontend.views.history import Reversion
 from frontend.views.validator import Validator
 
 from export.helper_functions import Markdown
+from export.runner import CompileBusy
 from export.views import latex_preview
 
 
@@ -53,6 +56,24 @@ def clean_attachment(content, image_formset):
             remove_object.delete()
 
 
+def discard_busy_compilation(request, savepoint):
+    """Discard busy compilation
+
+    Discards the changes of the request because its LaTeX code could not be compiled, since
+    all compilation slots are taken. The changes are rolled back to the given savepoint,
+    which exists since the revision middleware runs each request atomically.
+
+    :param request: The given request
+    :type request: HttpRequest
+    :param savepoint: The savepoint before the changes or None outside of a transaction
+    :type savepoint: str or None
+    """
+    if savepoint is not None:
+        transaction.savepoint_rollback(savepoint)
+    messages.error(request, _(
+        'The server is busy compiling other LaTeX documents, please try again in a moment'))
+
+
 # Tooltip for LaTeX
 # str: Path of the LaTeX example code
 LATEX_EXAMPLE_PATH = 'content/templates/form/examples/Latex_textfield.txt'
@@ -319,6 +340,7 @@ class AddContentView(SuccessMessageMixin, LoginRequiredMixin, CreateView):
             topic_id = self.kwargs['topic_id']
             content.topic = Topic.objects.get(pk=topic_id)
             content.type = content_type
+            savepoint = transaction.savepoint()
 
             # Checks if attachments are allowed for the given content type
             if content_type in IMAGE_ATTACHMENT_TYPES:
@@ -341,9 +363,16 @@ class AddContentView(SuccessMessageMixin, LoginRequiredMixin, CreateView):
 
             # If the content type is LaTeX, compile the LaTeX Code and store in DB
             if content_type == 'Latex':
-                Validator.validate_latex(get_user(request),
-                                         content,
-                                         content_type_data)
+                try:
+                    Validator.validate_latex(get_user(request),
+                                             content,
+                                             content_type_data)
+                except CompileBusy:
+                    discard_busy_compilation(request, savepoint)
+                    return self.render_to_response(
+                        self.get_context_data(form=add_content_form,
+                                              content_type_form=content_type_form,
+                                              item_forms=image_formset))
 
             # If the content type is MD store in DB, is_file checks if there is a md file
             # so validator knows if it needs to create a md file or text
@@ -354,10 +383,8 @@ class AddContentView(SuccessMessageMixin, LoginRequiredMixin, CreateView):
                                       content_type_data,
                                       is_file)
 
-            # Generates preview image in 'uploads/contents/'
-            preview = CONTENT_TYPES.get(content_type).objects.get(
-                pk=content.pk).generate_preview()
-            content.preview.name = preview
+            # The preview images are generated in 'uploads/previews/' after the commit
+            schedule_preview(content)
             content.save()
 
             # Redirects to content
@@ -577,6 +604,7 @@ class EditContentView(LoginRequiredMixin, UpdateView):
             if form.is_valid() and content_type_form.is_valid():
                 content = form.save(commit=False)
                 content_type = content.type
+                savepoint = transaction.savepoint()
                 # Checks if attachments are allowed for the given content type
                 if content_type in IMAGE_ATTACHMENT_TYPES:
                     # Removes images from database
@@ -596,9 +624,16 @@ class EditContentView(LoginRequiredMixin, UpdateView):
                 content_type_data = content_type_form.save()
                 # If the content type is LaTeX, compile the LaTeX Code and store in DB
                 if content_type == 'Latex':
-                    Validator.validate_latex(get_user(request),
-                                             content,
-                                             content_type_data)
+                    try:
+                        Validator.validate_latex(get_user(request),
+                                                 content,
+                                                 content_type_data)
+                    except CompileBusy:
+                        discard_busy_compilation(request, savepoint)
+                        return self.render_to_response(
+                            self.get_context_data(form=form,
+                                                  content_type_form=content_type_form,
+                                                  item_forms=image_formset))
 
                 # If the content type is MD, compile an HTML version of it and store in DB
                 if content_type == 'MD':
@@ -607,10 +642,8 @@ class EditContentView(LoginRequiredMixin, UpdateView):
                                           content_type_data,
                                           False)
 
-                # Generates preview image in 'uploads/contents/'
-                preview = CONTENT_TYPES.get(content_type) \
-                    .objects.get(pk=content.pk).generate_preview()
-                content.preview.name = preview
+                # The preview images are generated in 'uploads/previews/' after the commit
+                schedule_preview(content)
                 content.approved = False #TODO A content is not approved after editing, but it is never stored as approved in the revserion
                 content.save()
 
@@ -750,7 +783,7 @@ class ContentView(DetailView):
                 context['markdown'] = html"""
 
         if content.type == "MD":
-            context['html'] = Markdown.render(content, False)
+            context['html'] = Markdown.stored_html(content)
 
         if content.type == 'YouTubeVideo':
             context['startTime'] = content.ytvideocontent.start_time
@@ -976,7 +1009,7 @@ class ContentReadingModeView(LoginRequiredMixin, DetailView):
                                 self.request.GET.get('f')
 
         if content.type == "MD":
-            context['html'] = Markdown.render(content, False)
+            context['html'] = Markdown.stored_html(content)
 
         return context
 
@@ -1044,6 +1077,6 @@ class PublicContentReadingModeView(DetailView):
                                 self.request.GET.get('f')
 
         if content.type == "MD":
-            context['html'] = Markdown.render(content, False)
+            context['html'] = Markdown.stored_html(content)
 
         return context
@@ -7,22 +7,28 @@ import json
 
 from django.contrib.auth import get_user
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.conf import settings
 from django.contrib.messages.views import SuccessMessageMixin
 from django.contrib import messages
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.http import HttpResponseRedirect, JsonResponse, HttpResponse, HttpResponseBadRequest
 from django.shortcuts import get_object_or_404
 from django.urls import reverse_lazy, reverse
+from django.utils.functional import SimpleLazyObject
+from django.utils.safestring import mark_safe
 from django.views.generic import DetailView
 from django.views.generic.edit import FormMixin, CreateView, DeleteView, UpdateView
-from django.utils.translation import gettext_lazy as _
+from django.utils.translation import get_language, gettext_lazy as _
 
-from base.models import Course, CourseStructureEntry, Topic, Favorite
+from base.models import Content, Course, CourseStructureEntry, Topic
 from base.utils import check_owner_permission
 
+from frontend.cache import fragment_key, inject_coursebook, render_fragments
 from frontend.forms import AddCourseForm, EditCourseForm, FilterAndSortForm
 from frontend.forms.course import TopicChooseForm, CreateTopicForm
 
+from frontend.views.course_tree import load_course_tree, load_coursebook
 from frontend.views.history import Reversion
 from frontend.views.json import JsonHandler
 
@@ -251,7 +257,7 @@ class EditCourseStructureView(LoginRequiredMixin, DetailView, FormMixin):
         # Json object representing the topics of this course structure
         json_obj = JsonHandler.topics_structure_to_json(self.object)
         context['structure'] = json.dumps(json_obj)
-        context['topics'] = TopicChooseForm
+        context['topics'] = TopicChooseForm()
         return context
 
     def post(self, request, *args, **kwargs):  # pylint: disable=unused-argument
@@ -276,13 +282,10 @@ class EditCourseStructureView(LoginRequiredMixin, DetailView, FormMixin):
             title = request.POST['title']
             category_id = request.POST['category']
             new_topic = Topic.objects.create(title=title, category_id=category_id)
-            sorted_topics = []
-            # Ordered by category and title of the topic
-            for topic in list(Topic.objects.order_by('category__title', 'title')):
-                # Use string representation instead of pure title to distinguish to which
-                # category a topic is related to
-                sorted_topics.append({'id': topic.id, 'title': topic.__str__()})
-            data = {'topic_id': new_topic.id, 'topics': sorted_topics}
+            # Only the new topic is returned, the editor searches the other topics on demand
+            # Use string representation instead of pure title to distinguish to which
+            # category a topic is related to
+            data = {'topic_id': new_topic.id, 'topic': str(new_topic)}
             return JsonResponse(data=data)
         return self.form_invalid(form_create_topic) #TODO Causes error with unittests
 
@@ -415,42 +418,37 @@ class CourseView(LoginRequiredMixin, DetailView, FormMixin):
         :return: the context data
         :rtype: dict[str, Any]
         """
-        
-        course_id = self.get_object().id
-        favorite_list = [] # Favorite.objects.filter(course=course_id, user=get_user(self.request).profile)
         context = super().get_context_data(**kwargs)
-        structure_entries = CourseStructureEntry. \
-            objects.filter(course=context["course"]).order_by('index') #TODO: Fix the sorting!!!
-        
-
-        topics_recursive = []
-        current_topic = None
-        user=get_user(self.request).profile
-        for favorite in Favorite.objects.filter(course=course_id, user=user):
-            favorite_list.append(favorite.content)
+        course = context['course']
+        user = get_user(self.request).profile
+        favorite_list = cache.get_or_set(fragment_key(course.pk, 'coursebook', user.pk),
+                                         lambda: load_coursebook(course, user),
+                                         settings.COURSE_FRAGMENT_CACHE_TIMEOUT)
+        context['isCurrentUserOwner'] = course.owners.filter(pk=user.pk).exists()
         # If the user is a moderator of the course, set user to "" to show all contents
-        if user in context['course'].moderators.all():
+        if course.moderators.filter(pk=user.pk).exists():
+            role = 'moderator'
             user = ""
-        for entry in structure_entries:
-            index_split = entry.index.split('/')
-            # Topic
-            if len(index_split) == 1:
-                current_topic = {'topic': entry.topic, 'subtopics': [],
-                                 'topic_contents': entry.topic.get_contents(self.sorted_by,
-                                                                            self.filtered_by, user=user)}
-                topics_recursive.append(current_topic)
-            # Subtopic
-            # Only handle up to one subtopic level
-            else:
-                current_topic["subtopics"].append({'topic': entry.topic,
-                                                   'topic_contents':
-                                                       entry.topic.
-                                                  get_contents(self.sorted_by, self.filtered_by, user=user)})
+        # Hidden contents are only shown to their authors
+        elif Content.objects.filter(topic__child_topic__course=course, hidden=True,
+                                    author=user).exists():
+            role = f'author-{user.pk}'
+        else:
+            role = 'user'
+        topics_recursive = SimpleLazyObject(lambda: load_course_tree(
+            course, self.sorted_by, self.filtered_by, user=user))
 
         context["structure"] = topics_recursive
-        context['isCurrentUserOwner'] = self.request.user.profile in context['course'].owners.all()
         context['user'] = self.request.user
         context['favorite'] = favorite_list
+        # The structure is only loaded if its fragments are not cached
+        fragments = render_fragments(
+            fragment_key(course.pk, role, self.sorted_by, self.filtered_by, get_language()),
+            {'course': course, 'structure': topics_recursive, 'user': self.request.user,
+             'coursebook_markers': True})
+        favorite_ids = {content.pk for content in favorite_list}
+        context['fragments'] = {name: mark_safe(inject_coursebook(fragment, favorite_ids))
+                                for name, fragment in fragments.items()}
         if self.sorted_by is not None:
             context['sorting'] = self.sorted_by
         if self.filtered_by is not None:
@@ -590,28 +588,16 @@ class PublicCourseView(DetailView, FormMixin):
         :return: the context data
         :rtype: dict[str, Any]
         """
-        
         context = super().get_context_data(**kwargs)
-        structure_entries = CourseStructureEntry. \
-            objects.filter(course=context["course"]).order_by('index')
-        topics_recursive = []
-        current_topic = None
-
-        for entry in structure_entries:
-            index_split = entry.index.split('/')
-            # Topic
-            if len(index_split) == 1:
-                current_topic = {'topic': entry.topic, 'subtopics': [],
-                                 'topic_contents': entry.topic.get_contents(None,
-                                                                            None).filter(public=True)}
-                topics_recursive.append(current_topic)
-            # Subtopic
-            # Only handle up to one subtopic level
-            else:
-                current_topic["subtopics"].append({'topic': entry.topic,
-                                                   'topic_contents':
-                                                       entry.topic.
-                                                  get_contents(None, None).filter(public=True)})
+        course = context['course']
+        topics_recursive = SimpleLazyObject(lambda: load_course_tree(course, public=True))
 
         context["structure"] = topics_recursive
+        role = 'public-user' if self.request.user.is_authenticated else 'public'
+        fragments = render_fragments(
+            fragment_key(course.pk, role, get_language()),
+            {'course': course, 'structure': topics_recursive, 'user': self.request.user,
+             'public': True, 'coursebook_markers': True})
+        context['fragments'] = {name: mark_safe(inject_coursebook(fragment, set()))
+                                for name, fragment in fragments.items()}
         return context
\ No newline at end of file
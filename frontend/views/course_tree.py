@@ -0,0 +1,104 @@
+"""Purpose of this file
+
+This file contains the functions loading the topics and contents shown on a course page with
+a constant number of queries.
+"""
+
+from collections import defaultdict
+
+from django.db.models import Count
+
+from base.models import Content, CourseStructureEntry, Topic
+from content.models import CONTENT_TYPES
+
+
+def card_queryset():
+    """Card queryset
+
+    Returns the queryset of contents which loads everything the content cards access: the
+    topic, the author, the row of the content type and the tags. The rating aggregates are
+    stored with the contents.
+
+    :return: the queryset of contents
+    :rtype: QuerySet[Content]
+    """
+    content_types = [model._meta.get_field('content').related_query_name()
+                     for model in CONTENT_TYPES.values()]
+    return Content.objects \
+        .select_related('topic', 'author', *content_types) \
+        .prefetch_related('tags')
+
+
+def load_course_tree(course, sorted_by=None, filtered_by=None, user=None, public=False):
+    """Load course tree
+
+    Returns the topics of the course in the order of its structure, each with its subtopics
+    and with the contents visible to the user. Independent of the size of the course, three
+    queries are executed.
+
+    A node of the tree is a dictionary with the topic ('topic'), the number of all its
+    contents ('content_count') and its sorted and filtered contents ('topic_contents'). The
+    nodes of the topics additionally contain the nodes of their subtopics ('subtopics').
+
+    :param course: The course to load
+    :type course: Course
+    :param sorted_by: The sorting value which the contents should be sorted
+    :type sorted_by: str or None
+    :param filtered_by: The filtered value which the contents should be filtered
+    :type filtered_by: str or None
+    :param user: The user viewing the contents, "" for a moderator
+    :type user: Profile or str or None
+    :param public: Indicator if only public contents are shown
+    :type public: bool
+
+    :return: the nodes of the topics
+    :rtype: list[dict[str, Any]]
+    """
+    entries = list(CourseStructureEntry.objects.filter(course=course)
+                   .select_related('topic')
+                   .annotate(content_count=Count('topic__contents'))
+                   .order_by('position', 'sub_position'))
+    contents = Topic.filter_contents(
+        card_queryset().filter(topic_id__in={entry.topic_id for entry in entries}),
+        sorted_by, filtered_by, user=user)
+    if public:
+        contents = contents.filter(public=True)
+    if not contents.ordered:
+        contents = contents.order_by('pk')
+    topic_contents = defaultdict(list)
+    for content in contents:
+        topic_contents[content.topic_id].append(content)
+
+    structure = []
+    for entry in entries:
+        node = {'topic': entry.topic,
+                'content_count': entry.content_count,
+                'topic_contents': topic_contents[entry.topic_id]}
+        # Topic
+        if not entry.is_subtopic:
+            node['subtopics'] = []
+            structure.append(node)
+        # Subtopic
+        # Only handle up to one subtopic level
+        elif structure:
+            structure[-1]['subtopics'].append(node)
+    return structure
+
+
+def load_coursebook(course, profile):
+    """Load coursebook
+
+    Returns the contents of the coursebook of the user in the order they were added with
+    everything the content cards access in two queries.
+
+    :param course: The course of the coursebook
+    :type course: Course
+    :param profile: The user of the coursebook
+    :type profile: Profile
+
+    :return: the contents of the coursebook
+    :rtype: list[Content]
+    """
+    return list(card_queryset()
+                .filter(favorite__course=course, favorite__user=profile)
+                .order_by('favorite__pk'))
@@ -8,6 +8,7 @@ import re
 
 from builtins import staticmethod
 
+from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.contenttypes.models import ContentType
 from django.core import serializers
@@ -27,8 +28,11 @@ from base.models import Course, Content, Topic
 
 from content.attachment.models import ImageAttachment
 from content.models import ImageContent, MDContent, TextField, YTVideoContent, PDFContent, Latex, \
-    CONTENT_TYPES, PanoptoVideoContent, ExerciseContent, AnkiDeck, GeneralURL
+    PanoptoVideoContent, ExerciseContent, AnkiDeck, GeneralURL
+from content.previews import schedule_preview
 
+from export.helper_functions import Markdown
+from export.runner import CompileBusy
 from export.views import generate_pdf_from_latex
 
 
@@ -308,41 +312,53 @@ class BaseContentHistoryCompareView(BaseHistoryCompareView):
         """
         topic_id = self.kwargs['topic_id']
         pk = self.kwargs['pk']  # pylint: disable=invalid-name
-        with transaction.atomic(), reversion.create_revision():
-            versions = Version.objects.get(pk=request.POST.get('ver_pk')).revision.version_set.all()
-
-            # revert added attachments
-            content = Content.objects.get(pk=pk)
-            content_type = ContentType.objects.get(model='imageattachment')
-            for attachment in content.ImageAttachments.all():
-                if not versions.filter(content_type=content_type, object_id=attachment.pk).exists():
-                    attachment.delete()
-
-            for version in versions:
-                date_time = version.revision.date_created.strftime("%d. %b. %Y, %H:%M")
-                reversion.set_comment(_("Reverted to Version: %s") % date_time)
-
-                for deserialized_obj in serializers.deserialize('json', version.serialized_data):
-                    if isinstance(deserialized_obj.object, Content):
-                        # Revert deletes author and topic, so set it manually
-                        content = Content.objects.get(pk=pk)
-                        deserialized_obj.object.author_id = content.author_id
-                        deserialized_obj.object.topic_id = content.topic_id
-                        deserialized_obj.object.type = content.type
-                    elif isinstance(deserialized_obj.object, Latex):
-                        deserialized_obj.object.save()
-                        topic = Topic.objects.get(pk=topic_id)
-                        pdf = generate_pdf_from_latex(request.user.profile,
-                                                    deserialized_obj.object.content)
-                        deserialized_obj.object.pdf.save(f"{topic}" + ".pdf", ContentFile(pdf))
-                    elif isinstance(deserialized_obj.object, ImageAttachment):
-                        deserialized_obj.object.content_id = pk
-                    deserialized_obj.save()
-
-            content = Content.objects.get(pk=pk)
-            content.preview = CONTENT_TYPES.get(content.type) \
-                .objects.get(pk=content.pk).generate_preview()
-            content.save()
+        try:
+            with transaction.atomic(), reversion.create_revision():
+                versions = Version.objects.get(pk=request.POST.get('ver_pk')).revision.version_set.all()
+
+                # revert added attachments
+                content = Content.objects.get(pk=pk)
+                content_type = ContentType.objects.get(model='imageattachment')
+                for attachment in content.ImageAttachments.all():
+                    if not versions.filter(content_type=content_type, object_id=attachment.pk).exists():
+                        attachment.delete()
+
+                for version in versions:
+                    date_time = version.revision.date_created.strftime("%d. %b. %Y, %H:%M")
+                    reversion.set_comment(_("Reverted to Version: %s") % date_time)
+
+                    for deserialized_obj in serializers.deserialize('json', version.serialized_data):
+                        if isinstance(deserialized_obj.object, Content):
+                            # Revert deletes author and topic, so set it manually
+                            content = Content.objects.get(pk=pk)
+                            deserialized_obj.object.author_id = content.author_id
+                            deserialized_obj.object.topic_id = content.topic_id
+                            deserialized_obj.object.type = content.type
+                            # The rating aggregates are not versioned
+                            deserialized_obj.object.rating_sum = content.rating_sum
+                            deserialized_obj.object.rating_count = content.rating_count
+                        elif isinstance(deserialized_obj.object, Latex):
+                            deserialized_obj.object.save()
+                            topic = Topic.objects.get(pk=topic_id)
+                            pdf = generate_pdf_from_latex(request.user.profile,
+                                                        deserialized_obj.object.content)
+                            deserialized_obj.object.pdf.save(f"{topic}" + ".pdf", ContentFile(pdf))
+                        elif isinstance(deserialized_obj.object, ImageAttachment):
+                            deserialized_obj.object.content_id = pk
+                        deserialized_obj.save()
+
+                content = Content.objects.get(pk=pk)
+                if content.type == MDContent.TYPE:
+                    # The stored HTML is not versioned, render it from the reverted code
+                    md_content = content.mdcontent
+                    md_content.html = Markdown.render(content, False)
+                    md_content.save(update_fields=['html'])
+                schedule_preview(content)
+                content.save()
+        except CompileBusy:
+            # The revert was rolled back by the atomic block
+            messages.error(request, _(
+                'The server is busy compiling other LaTeX documents, please try again in a moment'))
 
         return HttpResponseRedirect(reverse_lazy(
             'frontend:content',
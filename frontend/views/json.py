@@ -4,9 +4,12 @@ This file describes the json handling on resources needed for frontend views.
 """
 
 from django.core.exceptions import ValidationError
+from django.db import transaction
 
 from base.models import CourseStructureEntry, Topic
 
+from frontend.cache import invalidate_courses
+
 
 class JsonHandler:
     """Json handler
@@ -20,7 +23,7 @@ class JsonHandler:
 
         Checks if the topics from the json data exists in the database. If the topics
         are not valid, that means topics does not exists in the course structure, a
-        validation error will be thrown.
+        validation error will be thrown. The topics are checked with a single query.
 
         :param json_data: The json data containing topics and sub topics
         :type json_data: list[dict[str, Any]]
@@ -28,23 +31,50 @@ class JsonHandler:
         :return: None if all topics in the json data exists
         :rtype: None or ValidationError
         """
+        ids = [topic['id'] for topic in json_data]
+        ids += [sub_topic['id'] for topic in json_data for sub_topic in topic.get('children', [])]
+        existing = set(Topic.objects.filter(id__in=ids).values_list('id', flat=True))
         # Main topics
         for topic in json_data:
-            if not Topic.objects.filter(id=topic['id']).exists():
+            if topic['id'] not in existing:
                 raise ValidationError(f'The topic with the id {topic["id"]} does not exist')
             # Sub topics
-            if 'children' in topic:
-                for sub_topic in topic['children']:
-                    if not Topic.objects.filter(id=sub_topic['id']).exists():
-                        raise ValidationError(
-                            f'The sub topic with the id {sub_topic["id"]} does not exist')
+            for sub_topic in topic.get('children', []):
+                if sub_topic['id'] not in existing:
+                    raise ValidationError(
+                        f'The sub topic with the id {sub_topic["id"]} does not exist')
+
+    @staticmethod
+    def json_to_positions(json_data):
+        """Json to positions
+
+        Returns the topics of the json data by their positions in the course structure.
+
+        Example:
+
+        - [{'id': 1, 'children': [{'id': 3}]}, {'id': 1}] -> {(1, 0): 1, (1, 1): 3, (2, 0): 1}
+
+        :param json_data: The json data
+        :type json_data: list[dict[str, Any]]
+
+        :return: the ids of the topics by their position and sub position
+        :rtype: dict[tuple[int, int], int]
+        """
+        positions = {}
+        for position, topic in enumerate(json_data, start=1):
+            positions[(position, 0)] = topic['id']
+            for sub_position, sub_topic in enumerate(topic.get('children', []), start=1):
+                positions[(position, sub_position)] = sub_topic['id']
+        return positions
 
     @staticmethod
     def json_to_topics_structure(course, json_data):
         """Json to topic structure
 
         Creates a course structure from the json data and override the current stored
-        entries in the database.
+        entries in the database. The current entries are loaded once and only the
+        difference is written in a single transaction: entries at a position with another
+        topic are updated, missing entries are created and remaining entries are deleted.
 
         Example json data:
 
@@ -58,48 +88,28 @@ class JsonHandler:
         :return: true if the structure was changed after its call
         :rtype: bool
         """
-        course_id = course.id
-        index = 0
-        # Main topics
-        for topic in json_data:
-            index += 1
-            current_id = topic['id']
-            current_index = f'{index}'
-            current_topic = CourseStructureEntry.objects.filter(
-                index=current_index,
-                course_id=course_id)
-            # Updates the entry in the data base if it exists, else we create a new entry
-            if current_topic.exists():
-                current_topic.update(topic_id=current_id)
-            else:
-                CourseStructureEntry.objects.create(
-                    index=current_index,
-                    course_id=course_id,
-                    topic_id=current_id)
-            # Sub topics
-            sub_index = 0
-            if 'children' in topic:
-                for sub_topic in topic['children']:
-                    sub_index += 1
-                    current_id = sub_topic['id']
-                    current_index = f'{index}/{sub_index}'
-                    current_topic = CourseStructureEntry.objects.filter(
-                        index=current_index,
-                        course_id=course_id)
-                    # Updates the entry in the data base if it exists, else we create a new entry
-                    if current_topic.exists():
-                        current_topic.update(topic_id=current_id)
-                    else:
-                        CourseStructureEntry.objects.create(
-                            index=current_index,
-                            course_id=course_id,
-                            topic_id=current_id)
-            # Clean sub topic fragments
-            JsonHandler.clean_structure_sub_topic(course=course,
-                                                  index=index,
-                                                  sub_index=sub_index + 1)
-        # Clean topic fragments
-        JsonHandler.clean_structure_topic(course=course, index=index + 1)
+        positions = JsonHandler.json_to_positions(json_data)
+        with transaction.atomic():
+            changed = []
+            removed = []
+            for entry in CourseStructureEntry.objects.select_for_update() \
+                    .filter(course=course).order_by('pk'):
+                topic_id = positions.pop((entry.position, entry.sub_position), None)
+                if topic_id is None:
+                    # Not part of the structure anymore or a duplicate of the position
+                    removed.append(entry.pk)
+                elif entry.topic_id != topic_id:
+                    entry.topic_id = topic_id
+                    changed.append(entry)
+            CourseStructureEntry.objects.bulk_update(changed, ['topic'])
+            CourseStructureEntry.objects.bulk_create(
+                CourseStructureEntry(course=course, position=position,
+                                     sub_position=sub_position, topic_id=topic_id)
+                for (position, sub_position), topic_id in positions.items())
+            if removed:
+                CourseStructureEntry.objects.filter(pk__in=removed).delete()
+        # The entries are partly updated without signals
+        invalidate_courses([course.id])
         return True
 
     @staticmethod
@@ -107,6 +117,8 @@ class JsonHandler:
         """Topic structure to json
 
         Creates a json object representing the structure of the course from the given course.
+        The entries are loaded with a single query. The json object is not cached, since the
+        editor must never save a structure based on an outdated one.
 
         :param course: The course object of the structure
         :type course: Course
@@ -116,33 +128,14 @@ class JsonHandler:
         """
         # Generates json object representing the structure of the model
         json_obj = []
-        # Saves last main topic to append its children later
-        last_main_topic = None
-        for topic in course.get_sorted_topic_list():
-            # Course structure
-            structure = CourseStructureEntry.objects.get(topic=topic, course=course)
-            # Possible sub topic
-            structure_index = structure.index.split('/')
-
-            topic_json = {'value': topic.__str__(), 'id': topic.id}
-
-            if len(structure_index) == 1:
-                # Appends the first main topic
-                if last_main_topic is not None:
-                    json_obj.append(last_main_topic)
-                # Checks if a main topic has sub topics
-                if CourseStructureEntry.objects.filter(
-                        course=course,
-                        index__startswith=str(structure_index[0])).count() > 1:
-                    topic_json['children'] = []
-                last_main_topic = topic_json
-            else:
-                last_main_topic['children'].append(topic_json)
-
-        # Appends the first topic: 'if last_main_topic is not None' does not get
-        # called if there is only one main topic
-        if last_main_topic is not None:
-            json_obj.append(last_main_topic)
+        for entry in CourseStructureEntry.objects.filter(course=course) \
+                .select_related('topic__category').order_by('position', 'sub_position'):
+            topic_json = {'value': str(entry.topic), 'id': entry.topic_id}
+            if not entry.is_subtopic:
+                json_obj.append(topic_json)
+            # Sub topics are appended to the preceding main topic
+            elif json_obj:
+                json_obj[-1].setdefault('children', []).append(topic_json)
         return json_obj
 
     @staticmethod
@@ -158,15 +151,7 @@ class JsonHandler:
         :param index: The index where we start to clean
         :type index: int
         """
-        course_id = course.id
-        topic = CourseStructureEntry.objects.filter(index=f'{index}',
-                                                    course_id=course_id)
-        while topic.exists():
-            topic.delete()
-            JsonHandler.clean_structure_sub_topic(course=course, index=index, sub_index=1)
-            index += 1
-            topic = CourseStructureEntry.objects.filter(index=f'{index}',
-                                                        course_id=course_id)
+        CourseStructureEntry.objects.filter(course=course, position__gte=index).delete()
 
     @staticmethod
     def clean_structure_sub_topic(course, index, sub_index):
@@ -183,14 +168,8 @@ class JsonHandler:
         :param sub_index: The sub index where we start
         :type sub_index: int
         """
-        course_id = course.id
-        topic = CourseStructureEntry.objects.filter(index=f'{index}/{sub_index}',
-                                                    course_id=course_id)
-        while topic.exists():
-            topic.delete()
-            sub_index += 1
-            topic = CourseStructureEntry.objects.filter(index=f'{index}/{sub_index}',
-                                                        course_id=course_id)
+        CourseStructureEntry.objects.filter(course=course, position=index,
+                                            sub_position__gte=sub_index).delete()
 
     @staticmethod
     def clean_topics(ids):
@@ -198,6 +177,4 @@ class JsonHandler:
 
         Cleans the topics if they were not used in the course structure.
         """
-        for topic_id in ids:
-            if not CourseStructureEntry.objects.filter(topic_id=topic_id).exists():
-                Topic.objects.filter(pk=topic_id).delete()
+        Topic.objects.filter(pk__in=ids, child_topic__isnull=True).delete()
@@ -3,54 +3,76 @@
 This file describes the frontend views related to search.
 """
 
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.db.models import Case, IntegerField, Value, When
+from django.db.models.functions import Upper
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
 from django.views.generic import ListView
 from django.contrib.auth.mixins import LoginRequiredMixin
 
-from base.models import Course, CourseStructureEntry
+from base.models import Topic
+
+from frontend.search import document_courses, search
 
 
 class SearchView(ListView, LoginRequiredMixin):  # pylint: disable=too-many-ancestors
     """Search view
 
-    This model represents the search for course and topic titles.
+    This model represents the full-text search for courses, topics and contents. The results
+    are ranked by their relevance and paginated.
 
-    :attr SearchView.model: The model of the view
-    :type SearchView.model: Model
     :attr SearchView.template_name: The path to the html template
     :type SearchView.template_name: str
     :attr SearchView.context_object_name: The context object name
     :type SearchView.context_object_name: str
     """
-    model = Course
     template_name = 'frontend/search.html'
-    context_object_name = 'search_data'
+    context_object_name = 'results'
+
+    def get_paginate_by(self, queryset):
+        """Paginate by
+
+        Returns the number of results per page.
+
+        :param queryset: The query set of the search
+        :type queryset: QuerySet[SearchDocument]
+
+        :return: the number of results per page
+        :rtype: int
+        """
+        return settings.SEARCH_PAGE_SIZE
+
+    def get_profile(self):
+        """Profile
+
+        Returns the user searching or None for an anonymous user.
+
+        :return: the user searching
+        :rtype: Profile or None
+        """
+        if self.request.user.is_authenticated:
+            return self.request.user.profile
+        return None
 
     def get_queryset(self):
         """Query set
 
-        Returns the query set of the search.
+        Returns the documents matching the search visible to the user, ordered by their
+        relevance.
 
         :return: The query set of the search
-        :rtype: dict[str, QuerySet[CourseStructureEntry]]
+        :rtype: QuerySet[SearchDocument]
         """
-        query = self.request.GET.get('q')
-        query = query.strip().lower()
-        courses = Course.objects.filter(title__icontains=query)
-        course_structure_entries = \
-            CourseStructureEntry.objects.filter(topic__title__icontains=query)
-        content_list = []
-        for entry in CourseStructureEntry.objects.all():
-            contents = entry.topic.get_contents('None', 'None').filter(description__icontains=query)
-            if contents:
-                content_list.append([entry, contents])
-        return {'courses': courses, 'course_structure_entries': course_structure_entries,
-                'content_list': content_list}
+        return search(self.request.GET.get('q', ''), self.get_profile())
 
     def get_context_data(self, *, object_list=None, **kwargs):
         """Context data
 
         Gets the context data of the view which can be accessed in
-        the html templates.
+        the html templates. The results of topics and contents on the page are linked to
+        the courses containing them.
 
         :param object_list: The django object list
         :type object_list: list
@@ -61,5 +83,76 @@ class SearchView(ListView, LoginRequiredMixin):  # pylint: disable=too-many-ance
         :rtype: dict[str, Any]
         """
         context = super().get_context_data(**kwargs)
-        context['search_query'] = self.request.GET.get('q')
+        public = self.get_profile() is None
+        results = list(context['results'])
+        courses = document_courses(results, public=public)
+        for result in results:
+            result.courses = courses.get(result.topic_id, [])
+        context['results'] = results
+        context['public'] = public
+        context['search_query'] = self.request.GET.get('q', '')
         return context
+
+
+def topic_search_queryset(query, category_id=None):
+    """Topic search queryset
+
+    Returns the topics whose title contains the given query ignoring the case, optionally
+    within the category with the given id. Topics whose title starts with the query are
+    ordered first, afterwards the topics are ordered by their category and title. The
+    upper case title is matched, so that the query can use the index of the topics. The
+    query is converted to upper case by the database as well, since the database and Python
+    do not convert all characters alike (e.g. SQLite only converts ASCII characters).
+
+    :param query: The searched part of the title
+    :type query: str
+    :param category_id: The id of the category or None for all categories
+    :type category_id: int or None
+
+    :return: the found topics
+    :rtype: QuerySet[Topic]
+    """
+    query = query.strip()
+    topics = Topic.objects.select_related('category').annotate(upper_title=Upper('title'))
+    if category_id is not None:
+        topics = topics.filter(category_id=category_id)
+    if query:
+        upper_query = Upper(Value(query))
+        topics = topics.filter(upper_title__contains=upper_query).annotate(
+            prefix=Case(When(upper_title__startswith=upper_query, then=Value(0)),
+                        default=Value(1), output_field=IntegerField()))
+    else:
+        topics = topics.annotate(prefix=Value(0, output_field=IntegerField()))
+    return topics.order_by('prefix', 'category__title', 'title', 'pk')
+
+
+@login_required
+@require_GET
+def search_topics(request):
+    """Search topics
+
+    Returns a page of the topics matching the query 'q' of the request, optionally within
+    the category 'category', as JSON. A page contains TOPIC_SEARCH_PAGE_SIZE topics, the
+    page is selected by 'page' starting at 1. The response contains the id and the string
+    representation of each topic ('results') and whether there are further pages ('more').
+
+    :param request: The given request
+    :type request: WSGIRequest
+
+    :return: the json response containing the page of topics
+    :rtype: JsonResponse
+    """
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+        category_id = int(request.GET['category']) if request.GET.get('category') else None
+    except ValueError:
+        return JsonResponse({'error': 'invalid parameter'}, status=400)
+    size = settings.TOPIC_SEARCH_PAGE_SIZE
+    start = (page - 1) * size
+    # One more topic is loaded to know whether there is another page
+    topics = list(topic_search_queryset(request.GET.get('q', ''), category_id)
+                  [start:start + size + 1])
+    # Use string representation instead of pure title to distinguish to which
+    # category a topic is related to
+    results = [{'id': topic.id, 'title': str(topic)} for topic in topics[:size]]
+    return JsonResponse({'results': results, 'more': len(topics) > size})
@@ -5,6 +5,7 @@ This file describes the validators needed for the views.
 
 from django.core.files.base import ContentFile
 
+from export.helper_functions import Markdown
 from export.views import generate_pdf_from_latex
 
 
@@ -36,7 +37,7 @@ class Validator:
         """Validate Markdown
 
         Validates Markdown and stores it into the database encoded as UTF-8
-        for decoding to html later.
+        together with the HTML rendered from it.
 
         :param user: The current user
         :type user: User
@@ -51,6 +52,7 @@ class Validator:
         else:
             md_text = md_content.textfield
             md_content.md.save(f"{content.topic}"+ ".md", ContentFile(md_text.encode('utf-8')))
+        md_content.html = Markdown.render(content, False, md_text)
         md_content.save()
 
     @staticmethod
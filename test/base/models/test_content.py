@@ -6,10 +6,13 @@ This file contains the test cases for /base/models/content.py.
 import shutil
 from test import utils
 
+import io
+
+from django.core.management import call_command
 from django.test import TestCase
 from django.contrib.auth.models import User  # pylint: disable=imported-auth-user
 
-from base.models import Course
+from base.models import Content, Course, CourseStructureEntry, Rating, Topic
 import base.models.profile as Profile
 
 class ModelTestCase(TestCase):
@@ -59,3 +62,123 @@ class CourseModelTestCase(ModelTestCase):
         Tests the moderator property of Course.
         """
         self.assertEqual(Course.objects.first().moderators.first(), Profile.Profile.objects.first())
+
+
+class RatingAggregateTestCase(ModelTestCase):
+    """Rating aggregate test case
+
+    Defines the test cases for the rating aggregates of the model Content.
+    """
+
+    def setUp(self):
+        """Setup
+
+        Sets up the test database with a second user.
+        """
+        super().setUp()
+        self.content = Content.objects.first()
+        self.profiles = [User.objects.first().profile,
+                         User.objects.create(username='second').profile]
+
+    def test_rate_content(self):
+        """Rate content test case
+
+        Tests that the aggregates are updated by rating, changing a rating and deleting a
+        rating and that they are read without queries.
+        """
+        self.content.rate_content(self.profiles[0], 5)
+        self.content.rate_content(self.profiles[1], 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.content.get_rate(), 3)
+            self.assertEqual(self.content.get_rate_num(), 3)
+            self.assertEqual(self.content.get_rate_amount(), 2)
+
+        rating = Rating.objects.get(user=self.profiles[1])
+        rating.rating = 4
+        rating.save()
+        self.content.refresh_from_db()
+        self.assertEqual((self.content.rating_sum, self.content.rating_count), (9, 2))
+
+        rating.delete()
+        self.content.refresh_from_db()
+        self.assertEqual((self.content.rating_sum, self.content.rating_count), (5, 1))
+
+    def test_save_stale_content(self):
+        """Save test case - stale content
+
+        Tests that saving an instance loaded before a rating keeps the aggregates.
+        """
+        stale = Content.objects.get(pk=self.content.pk)
+        self.content.rate_content(self.profiles[0], 4)
+        stale.description = 'changed'
+        stale.save()
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.description, 'changed')
+        self.assertEqual((self.content.rating_sum, self.content.rating_count), (4, 1))
+
+    def test_reconcile_ratings_command(self):
+        """Reconcile ratings command test case
+
+        Tests that drifted aggregates are corrected by the command.
+        """
+        self.content.rate_content(self.profiles[0], 3)
+        Content.objects.filter(pk=self.content.pk).update(rating_sum=42, rating_count=7)
+        call_command('reconcile_ratings', stdout=io.StringIO())
+        self.content.refresh_from_db()
+        self.assertEqual((self.content.rating_sum, self.content.rating_count), (3, 1))
+        self.assertEqual(Content.reconcile_ratings(), 0)
+
+    def test_get_contents_sorted_by_rating(self):
+        """Get contents test case - sorted by rating
+
+        Tests that the contents are sorted by their average rating with one query and that
+        the result is still a queryset.
+        """
+        topic = self.content.topic
+        second = Content.objects.create(author=self.profiles[0], topic=topic, type='Textfield',
+                                        description='second', language='de')
+        unrated = Content.objects.create(author=self.profiles[0], topic=topic, type='Textfield',
+                                         description='unrated', language='de')
+        self.content.rate_content(self.profiles[0], 2)
+        second.rate_content(self.profiles[0], 5)
+        second.rate_content(self.profiles[1], 4)
+        with self.assertNumQueries(1):
+            contents = list(topic.get_contents('Rating', None))
+        self.assertEqual(contents, [second, self.content, unrated])
+        self.assertEqual(list(topic.get_contents('Rating', None).filter(description='second')),
+                         [second])
+
+
+class CourseStructureEntryTestCase(ModelTestCase):
+    """Course structure entry test case
+
+    Defines the test cases for the positions of the model CourseStructureEntry.
+    """
+
+    def test_index(self):
+        """Index test case
+
+        Tests that the index is converted from and to the positions.
+        """
+        entry = CourseStructureEntry(index='10/2')
+        self.assertEqual((entry.position, entry.sub_position), (10, 2))
+        self.assertTrue(entry.is_subtopic)
+        self.assertEqual(entry.index, '10/2')
+        entry.index = 3
+        self.assertEqual((entry.position, entry.sub_position), (3, 0))
+        self.assertFalse(entry.is_subtopic)
+        self.assertEqual(entry.index, '3')
+
+    def test_sorted_topic_list(self):
+        """Sorted topic list test case
+
+        Tests that the topics are sorted numerically by their positions.
+        """
+        course = Course.objects.first()
+        category = course.category
+        topics = [Topic.objects.create(title=f'Topic {idx}', category=category)
+                  for idx in range(11)]
+        for idx, topic in enumerate(reversed(topics)):
+            CourseStructureEntry.objects.create(course=course, position=11 - idx,
+                                                topic=topic)
+        self.assertEqual(list(course.get_sorted_topic_list()), topics)
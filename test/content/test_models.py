@@ -3,12 +3,22 @@
 This file contains the test cases for /content/models.py.
 """
 
+import io
+import json
 import os
-from django.test import override_settings
+from datetime import timedelta
+from unittest import mock
+
+from PIL import Image
+
+from django.forms import ValidationError
+from django.test import TestCase, override_settings
+from django.utils import timezone
 
 from test.test_cases import MediaTestCase
 from test import utils
 import content.models as model
+from content.static.yt_api import YouTubeDataBackend
 
 
 @override_settings(MEDIA_ROOT=utils.MEDIA_ROOT)
@@ -35,10 +45,49 @@ class LatexTestCase(MediaTestCase):  # pylint: disable=too-few-public-methods)
         content.preview.name = preview_path
         content.save()
 
-        self.assertEqual('uploads/previews/Topic_Category.jpg', content.preview.name)
+        self.assertEqual('uploads/previews/Topic_Category-detail.webp', content.preview.name)
         self.assertTrue(bool(content.preview))
 
 
+@override_settings(MEDIA_ROOT=utils.MEDIA_ROOT)
+class PreviewThumbnailTestCase(MediaTestCase):
+    """Preview thumbnail test case
+
+    Defines the test cases for the preview thumbnails of the PDF models.
+    """
+
+    @override_settings(PREVIEW_THUMBNAIL_WIDTHS={'card': 200, 'detail': 800})
+    @mock.patch('content.models.convert_from_path')
+    def test_generate_preview_sizes(self, convert_from_path):
+        """Generate preview test case - sizes
+
+        Tests that only the first page is rasterized at the largest width and that a
+        thumbnail is saved for every size.
+        """
+        convert_from_path.return_value = [Image.new('RGB', (800, 1131), 'white')]
+        latex = model.Latex.objects.first()
+        preview_path = latex.generate_preview()
+        convert_from_path.assert_called_once_with(latex.pdf.path, first_page=1, last_page=1,
+                                                  size=(800, None))
+        self.assertEqual(preview_path, 'uploads/previews/Topic_Category-detail.webp')
+        for size, width in (('card', 200), ('detail', 800)):
+            name = model.variant_name(preview_path, size)
+            with Image.open(os.path.join(utils.MEDIA_ROOT, name)) as image:
+                self.assertEqual(image.format, 'WEBP')
+                self.assertEqual(image.width, width)
+
+    def test_variant_name(self):
+        """Variant name test case
+
+        Tests that the names of the thumbnails are derived from the preview and that
+        previews with only one variant are kept.
+        """
+        self.assertEqual(model.variant_name('uploads/previews/a-b-detail.webp', 'card'),
+                         'uploads/previews/a-b-card.webp')
+        self.assertEqual(model.variant_name('uploads/previews/a-b.jpg', 'card'),
+                         'uploads/previews/a-b.jpg')
+
+
 @override_settings(MEDIA_ROOT=utils.MEDIA_ROOT)
 class PanoptoVideoContentTestCase(MediaTestCase):  # pylint: disable=too-few-public-methods)
     """PanoptoVideoContent test case
@@ -128,3 +177,68 @@ class AnkiDeckModelTestCase(MediaTestCase):
 
         # Assert that only AnkiDeck objects are returned
         self.assertTrue(all(isinstance(content, model.AnkiDeck) for content in filtered_contents))
+
+
+@override_settings(YT_METADATA_BACKEND='content.static.yt_api.StubBackend',
+                   YT_METADATA_STUB={'abc': {'title': 'Video', 'duration': 90.0}})
+class YTVideoMetadataTestCase(TestCase):
+    """YTVideoMetadata test case
+
+    Defines the test cases for the model YTVideoMetadata and the metadata backends.
+    """
+
+    def test_lookup_cached(self):
+        """Lookup test case - cached
+
+        Tests that the metadata is fetched once and read from the cache afterwards.
+        """
+        metadata = model.YTVideoMetadata.lookup(['abc', 'unknown'])
+        self.assertEqual(metadata['abc'].duration, 90.0)
+        self.assertEqual(metadata['abc'].title, 'Video')
+        self.assertNotIn('unknown', metadata)
+        with mock.patch('content.static.yt_api.StubBackend.fetch') as fetch:
+            self.assertEqual(model.YTVideoMetadata.length('abc'), 90.0)
+            fetch.assert_not_called()
+
+    def test_lookup_stale(self):
+        """Lookup test case - stale
+
+        Tests that stale metadata is fetched again and returned if fetching fails.
+        """
+        model.YTVideoMetadata.objects.create(video_id='abc', duration=60.0,
+                                             fetched_at=timezone.now() - timedelta(days=30))
+        with mock.patch('content.static.yt_api.StubBackend.fetch', side_effect=OSError):
+            self.assertEqual(model.YTVideoMetadata.length('abc'), 60.0)
+        self.assertEqual(model.YTVideoMetadata.length('abc'), 90.0)
+
+    def test_clean(self):
+        """Clean test case
+
+        Tests that the end time of a YouTube video defaults to the cached length of the
+        video and that videos with an unknown length are rejected.
+        """
+        video = model.YTVideoContent(url='https://www.youtube.com/watch?v=abc',
+                                     start_time='0:00', end_time='0:00')
+        video.clean()
+        self.assertEqual(video.end_time, '1:30')
+        video = model.YTVideoContent(url='https://www.youtube.com/watch?v=unknown',
+                                     start_time='0:00', end_time='0:00')
+        self.assertRaises(ValidationError, video.clean)
+
+    def test_youtube_data_backend_batched(self):
+        """YouTube Data API backend test case - batched
+
+        Tests that the metadata of up to 50 videos is fetched by one request.
+        """
+        def urlopen(url, timeout):  # pylint: disable=unused-argument
+            ids = url.split('id=')[1].split('&')[0].split('%2C')
+            items = [{'id': video_id, 'snippet': {'title': video_id},
+                      'contentDetails': {'duration': 'PT1M5S'}} for video_id in ids]
+            return io.BytesIO(json.dumps({'items': items}).encode())
+
+        ids = [f'video{index}' for index in range(60)]
+        with mock.patch('urllib.request.urlopen', side_effect=urlopen) as mocked:
+            metadata = YouTubeDataBackend().fetch(ids)
+        self.assertEqual(mocked.call_count, 2)
+        self.assertEqual(len(metadata), 60)
+        self.assertEqual(metadata['video59'], {'title': 'video59', 'duration': 65.0})
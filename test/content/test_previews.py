@@ -0,0 +1,72 @@
+"""Purpose of this file
+
+This file contains the test cases for /content/previews.py.
+"""
+
+import io
+import os
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import override_settings
+
+from test.test_cases import MediaTestCase
+from test import utils
+import content.models as model
+from content.previews import generate_preview, schedule_preview
+
+
+@override_settings(MEDIA_ROOT=utils.MEDIA_ROOT)
+@mock.patch('content.models.Latex.generate_preview', return_value='uploads/previews/a-detail.webp')
+class PreviewTestCase(MediaTestCase):
+    """Preview test case
+
+    Defines the test cases for the background generation of the previews.
+    """
+
+    def test_generate_preview(self, latex_preview):  # pylint: disable=unused-argument
+        """Generate preview test case
+
+        Tests that the preview is stored with the content and that contents without PDF
+        are skipped.
+        """
+        content = model.Latex.objects.first().content
+        self.assertEqual(generate_preview(content.pk), 'uploads/previews/a-detail.webp')
+        content.refresh_from_db()
+        self.assertEqual(content.preview.name, 'uploads/previews/a-detail.webp')
+
+        text = utils.create_content(model.TextField.TYPE)
+        self.assertIsNone(generate_preview(text.pk))
+
+    def test_generate_previews_command(self, latex_preview):
+        """Generate previews command test case
+
+        Tests that the command only generates the missing previews unless all are requested.
+        """
+        call_command('generate_previews', stdout=io.StringIO())
+        call_command('generate_previews', stdout=io.StringIO())
+        self.assertEqual(latex_preview.call_count, 1)
+        call_command('generate_previews', '--all', stdout=io.StringIO())
+        self.assertEqual(latex_preview.call_count, 2)
+
+    @mock.patch('content.previews.executor')
+    def test_schedule_preview_deletes_thumbnails(self, executor, latex_preview):
+        # pylint: disable=unused-argument
+        """Schedule preview test case - previous thumbnails
+
+        Tests that the thumbnails of the previous preview are deleted after the commit.
+        """
+        content = model.Latex.objects.first().content
+        folder = os.path.join(utils.MEDIA_ROOT, 'uploads', 'previews')
+        os.makedirs(folder, exist_ok=True)
+        paths = [os.path.join(folder, f'old-{size}.webp') for size in ('card', 'detail')]
+        for path in paths:
+            with open(path, 'wb') as file:
+                file.write(b'webp')
+        content.preview = 'uploads/previews/old-detail.webp'
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule_preview(content)
+            content.save()
+            self.assertTrue(all(os.path.exists(path) for path in paths))
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+        self.assertEqual(executor.return_value.submit.call_count, 1)
@@ -0,0 +1,230 @@
+"""Purpose of this file
+
+This file contains the test cases for /export/cache.py.
+"""
+
+import io
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+from PIL import Image
+
+from django.core.files.images import ImageFile
+from django.test import SimpleTestCase, override_settings
+
+from content.attachment.forms import LatexPreviewImageAttachmentFormSet
+from export.cache import CompileCache, FragmentCache, PreviewCache
+
+# Temporary cache directory
+CACHE_DIR = tempfile.mkdtemp()
+
+
+@override_settings(LATEX_COMPILE_CACHE_DIR=CACHE_DIR, LATEX_COMPILE_CACHE_MAX_SIZE=1024)
+class CompileCacheTestCase(SimpleTestCase):
+    """Compile cache test case
+
+    Defines the test cases for the class CompileCache.
+    """
+
+    def setUp(self):
+        """Setup
+
+        Sets up an empty cache.
+        """
+        self.cache = CompileCache(namespace='test')
+        self.cache.clear()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Tear down class
+
+        Deletes the cache directory after running the tests.
+        """
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_key_referenced_file(self):
+        """Key test case - referenced file
+
+        Tests that the key changes if a file referenced by the LaTeX code changes.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            tex = rb'\includegraphics[width=\textwidth]{image.png}'
+            with open(os.path.join(directory, 'image.png'), 'wb') as file:
+                file.write(b'first')
+            key1 = CompileCache.key(tex, directory)
+            self.assertEqual(key1, CompileCache.key(tex, directory))
+            with open(os.path.join(directory, 'image.png'), 'wb') as file:
+                file.write(b'second')
+            self.assertNotEqual(key1, CompileCache.key(tex, directory))
+
+    def test_key_directory(self):
+        """Key test case - directory
+
+        Tests that the same document compiled in two directories has the same key and is
+        restored from the cache.
+        """
+        tex = rb'\includepdf[pages=-]{MD_1.pdf}'
+        keys = []
+        for _ in range(2):
+            with tempfile.TemporaryDirectory() as directory:
+                with open(os.path.join(directory, 'MD_1.pdf'), 'wb') as file:
+                    file.write(b'%PDF')
+                keys.append(CompileCache.key(tex, directory))
+                if len(keys) == 1:
+                    self.cache.set(keys[0], b'pdf', (b'log', None), tex)
+                else:
+                    self.assertEqual(self.cache.get(keys[1]), (b'pdf', (b'log', None), tex))
+        self.assertEqual(keys[0], keys[1])
+
+    def test_get_set(self):
+        """Get and set test case
+
+        Tests that a stored entry is returned and that hits and misses are counted.
+        """
+        self.assertIsNone(self.cache.get('a' * 64))
+        self.cache.set('a' * 64, b'pdf', (b'log', None), b'tex')
+        self.assertEqual(self.cache.get('a' * 64), (b'pdf', (b'log', None), b'tex'))
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_restore_set_files(self):
+        """Restore and set files test case
+
+        Tests that a compilation is stored from and restored into a compile directory.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertIsNone(self.cache.restore('f' * 64, directory))
+            for name, data in ((CompileCache.pdf_name, b'pdf'), (CompileCache.tex_name, b'tex')):
+                with open(os.path.join(directory, name), 'wb') as file:
+                    file.write(data)
+            self.cache.set_files('f' * 64, directory, (b'log', None))
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertEqual(self.cache.restore('f' * 64, directory), (b'log', None))
+            with open(os.path.join(directory, CompileCache.pdf_name), 'rb') as file:
+                self.assertEqual(file.read(), b'pdf')
+
+    def test_no_pdf(self):
+        """Set test case - no PDF
+
+        Tests that failed compilations are not stored.
+        """
+        self.cache.set('b' * 64, None, (b'log', None), b'tex')
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_evict(self):
+        """Evict test case
+
+        Tests that the least recently used entries are evicted if the cache exceeds its size.
+        """
+        self.cache.set('c' * 64, b'x' * 400, (b'', None), b'')
+        self.cache.set('d' * 64, b'x' * 400, (b'', None), b'')
+        os.utime(self.cache.entry_path('c' * 64), (0, 0))
+        self.cache.set('e' * 64, b'x' * 400, (b'', None), b'')
+        self.assertIsNone(self.cache.get('c' * 64))
+        self.assertIsNotNone(self.cache.get('d' * 64))
+        self.assertIsNotNone(self.cache.get('e' * 64))
+        self.assertLessEqual(self.cache.stats()['size'], 1024)
+
+    def test_evict_only_above_size(self):
+        """Evict test case - estimated size
+
+        Tests that the cache is only scanned if the estimated size exceeds the maximum size.
+        """
+        with mock.patch.object(self.cache, 'entries', wraps=self.cache.entries) as entries:
+            self.cache.set('c' * 64, b'x' * 400, (b'', None), b'')
+            self.cache.set('d' * 64, b'x' * 400, (b'', None), b'')
+            self.assertEqual(entries.call_count, 0)
+            self.cache.set('e' * 64, b'x' * 400, (b'', None), b'')
+            self.assertEqual(entries.call_count, 1)
+        self.assertEqual(self.cache.size, self.cache.stats()['size'])
+
+
+@override_settings(LATEX_COMPILE_CACHE_DIR=CACHE_DIR, LATEX_COMPILE_CACHE_MAX_SIZE=1024)
+class FragmentCacheTestCase(SimpleTestCase):
+    """Fragment cache test case
+
+    Defines the test cases for the class FragmentCache.
+    """
+
+    def setUp(self):
+        """Setup
+
+        Sets up an empty cache.
+        """
+        self.cache = FragmentCache(namespace='test-fragments')
+        self.cache.clear()
+
+    def test_get_set_fragment(self):
+        """Get and set fragment test case
+
+        Tests that fragments are stored with and without artifact.
+        """
+        self.assertIsNone(self.cache.get_fragment('a' * 64))
+        self.cache.set_fragment('a' * 64, b'fragment')
+        self.cache.set_fragment('b' * 64, b'fragment', b'%PDF')
+        self.assertEqual(self.cache.get_fragment('a' * 64), (b'fragment', None))
+        fragment, artifact_path = self.cache.get_fragment('b' * 64)
+        self.assertEqual(fragment, b'fragment')
+        with open(artifact_path, 'rb') as file:
+            self.assertEqual(file.read(), b'%PDF')
+
+    def test_fragment_key(self):
+        """Fragment key test case
+
+        Tests that the key depends on the revision and on the source of the template.
+        """
+        content = SimpleNamespace(pk=1, type='Textfield', topic=SimpleNamespace(title='Topic'))
+        key = FragmentCache.fragment_key(content, 1, True)
+        self.assertIsNone(FragmentCache.fragment_key(content, None, True))
+        self.assertEqual(key, FragmentCache.fragment_key(content, 1, True))
+        self.assertNotEqual(key, FragmentCache.fragment_key(content, 2, True))
+        template = SimpleNamespace(template=SimpleNamespace(source='changed'))
+        with mock.patch('export.cache.get_template', return_value=template):
+            self.assertNotEqual(key, FragmentCache.fragment_key(content, 1, True))
+
+
+class PreviewCacheTestCase(SimpleTestCase):
+    """Preview cache test case
+
+    Defines the test cases for the class PreviewCache.
+    """
+
+    @staticmethod
+    def preview_key(text, color):
+        """Preview key
+
+        Returns the key of a preview with the given text and an attachment of the given color.
+
+        :param text: The LaTeX code of the preview
+        :type text: str
+        :param color: The color of the attachment
+        :type color: tuple[int, int, int]
+
+        :return: the key of the preview
+        :rtype: str
+        """
+        file = io.BytesIO()
+        Image.new('RGB', size=(10, 10), color=color).save(file, 'png')
+        file.name = 'test.png'
+        file.seek(0)
+        image = ImageFile(file)
+        formset = LatexPreviewImageAttachmentFormSet({'form-TOTAL_FORMS': '1',
+                                                      'form-INITIAL_FORMS': '0'},
+                                                     {'form-0-image': image})
+        formset.is_valid()
+        return PreviewCache.preview_key(text, formset, SimpleNamespace(title='Topic'), 'user',
+                                        'content/export/base.tex')
+
+    def test_preview_key(self):
+        """Preview key test case
+
+        Tests that the key depends on the LaTeX code and on the data of the attachments.
+        """
+        key = self.preview_key('Lorem ipsum', (0, 0, 0))
+        self.assertEqual(key, self.preview_key('Lorem ipsum', (0, 0, 0)))
+        self.assertNotEqual(key, self.preview_key('Lorem ipsum dolor', (0, 0, 0)))
+        self.assertNotEqual(key, self.preview_key('Lorem ipsum', (1, 2, 3)))
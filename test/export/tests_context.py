@@ -0,0 +1,120 @@
+"""Purpose of this file
+
+This file contains the test cases for /export/context.py.
+"""
+
+import io
+import tempfile
+from test import utils
+from test.test_cases import MediaTestCase
+from unittest import mock
+
+from django.contrib.auth.models import User  # pylint: disable=imported-auth-user
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from base.models import Category, Content, Course, CourseStructureEntry, Favorite, Topic
+import content.models as model
+
+from export.context import course_contents, coursebook_contents
+from export.helper_functions import Latex
+
+
+@override_settings(LATEX_COMPILE_CACHE_MAX_SIZE=0)
+class ExportContextTestCase(MediaTestCase):
+    """Export context test case
+
+    Defines the test cases for the loading of the export contents.
+    """
+
+    def setUp(self):
+        """Setup
+
+        Sets up the test database.
+        """
+        super().setUp()
+        self.profile = User.objects.first().profile
+        self.category = Category.objects.first()
+
+    def create_course(self, topic_count):
+        """Create course
+
+        Creates a course whose topics contain a text and a Markdown content with image
+        attachments each.
+
+        :param topic_count: The number of topics of the course
+        :type topic_count: int
+
+        :return: the created course
+        :rtype: Course
+        """
+        course = Course.objects.create(title=f'Course {topic_count}', description='desc',
+                                       category=self.category)
+        for idx in range(topic_count):
+            topic = Topic.objects.create(title=f'Topic {idx}', category=self.category)
+            CourseStructureEntry.objects.create(course=course, index=str(topic_count - idx),
+                                                topic=topic)
+            text = Content.objects.create(author=self.profile, topic=topic,
+                                          type=model.TextField.TYPE, language='de')
+            model.TextField.objects.create(content=text, textfield='Text')
+            markdown = Content.objects.create(author=self.profile, topic=topic,
+                                              type=model.MDContent.TYPE, language='de')
+            model.MDContent.objects.create(content=markdown, textfield='![a](Image-0)')
+            utils.generate_attachment(text, 2)
+            utils.generate_attachment(markdown, 1)
+            Favorite.objects.create(user=self.profile, course=course, content=markdown)
+        return course
+
+    def count_queries(self, load):
+        """Count queries
+
+        Returns the number of queries for loading and pre rendering the contents. The cached
+        content type lookup of the revisions is done in advance.
+
+        :param load: The function loading the contents
+        :type load: Callable[[], list[Content]]
+
+        :return: the number of queries
+        :rtype: int
+        """
+        ContentType.objects.get_for_model(Content)
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch('export.helper_functions.pdfkit.from_string', return_value=b'%PDF'), \
+                CaptureQueriesContext(connection) as queries:
+            Latex.pre_render_contents(load(), True, directory, io.BytesIO())
+        return len(queries)
+
+    def test_course_contents_order(self):
+        """Course contents test case - order
+
+        Tests that the contents are ordered by the course structure.
+        """
+        course = self.create_course(3)
+        topics = [content.topic.title for content in course_contents(course)]
+        self.assertEqual(topics, ['Topic 2', 'Topic 2', 'Topic 1', 'Topic 1',
+                                  'Topic 0', 'Topic 0'])
+
+    def test_course_contents_queries(self):
+        """Course contents test case - queries
+
+        Tests that the number of queries does not grow with the size of the course.
+        """
+        small = self.create_course(2)
+        large = self.create_course(10)
+        # Structure, contents, attachments and revisions
+        self.assertEqual(self.count_queries(lambda: course_contents(small)), 4)
+        self.assertEqual(self.count_queries(lambda: course_contents(large)), 4)
+
+    def test_coursebook_contents_queries(self):
+        """Coursebook contents test case - queries
+
+        Tests that the number of queries does not grow with the size of the coursebook.
+        """
+        small = self.create_course(2)
+        large = self.create_course(10)
+        self.assertEqual(len(coursebook_contents(large, self.profile)), 10)
+        self.assertEqual(
+            self.count_queries(lambda: coursebook_contents(small, self.profile)),
+            self.count_queries(lambda: coursebook_contents(large, self.profile)))
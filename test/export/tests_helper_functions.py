@@ -3,11 +3,20 @@
 This file contains the test cases for /export/helper_functions.py.
 """
 
+import io
 import os
+import tempfile
+import threading
+import time
+from unittest import mock
 
 from test import utils
 
-from django.test import TestCase
+import reversion
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
 
 import content.models as model
 
@@ -77,6 +86,25 @@ class LaTeXTestCase(TestCase):
         self.assertIn(latex_content.textfield, pre_render.decode(helper.Latex.encoding))
         self.assertNotIn(content.description, pre_render.decode(helper.Latex.encoding))
 
+    def test_prerender_youtube_cached_length(self):
+        """Prerender test case - YouTube cached length
+
+        Tests that the length of a YouTube video is read from the cache and that the video
+        is rendered without its length if it is not cached, without fetching it.
+        """
+        content = utils.create_content(model.YTVideoContent.TYPE)
+        model.YTVideoContent.objects.create(content=content,
+                                            url='https://www.youtube.com/watch?v=abc',
+                                            start_time='0:00', end_time='1:30')
+        with mock.patch('content.static.yt_api.metadata_backend') as backend:
+            pre_render = helper.Latex.pre_render(content, True)
+            self.assertNotIn('Seconds', pre_render.decode(helper.Latex.encoding))
+            model.YTVideoMetadata.objects.create(video_id='abc', duration=90.0,
+                                                 fetched_at=timezone.now())
+            pre_render = helper.Latex.pre_render(content, True)
+            self.assertIn('1 Minutes, 30 Seconds', pre_render.decode(helper.Latex.encoding))
+            backend.assert_not_called()
+
     def test_prerender_latex_preview(self):
         """Prerender test case - LaTeX preview
 
@@ -147,3 +175,259 @@ class MarkdownTestCase(TestCase):
         self.assertEqual(md1, res1)
         md2 = helper.Markdown.render(content2, False)
         self.assertEqual(md2, res2)
+
+    def test_stored_html(self):
+        """Stored HTML test case
+
+        Tests that the HTML of a Markdown content is rendered once and read from the
+        database afterwards.
+        """
+        content = utils.create_content(model.MDContent.TYPE)
+        model.MDContent.objects.create(textfield='**Bold**', content=content)
+        self.assertEqual(helper.Markdown.stored_html(content), '<p><strong>Bold</strong></p>\n')
+        content = model.Content.objects.get(pk=content.pk)
+        with mock.patch('export.helper_functions.Markdown.render') as render:
+            self.assertEqual(helper.Markdown.stored_html(content),
+                             '<p><strong>Bold</strong></p>\n')
+            render.assert_not_called()
+
+    def test_render_markdown_command(self):
+        """Render Markdown command test case
+
+        Tests that the management command render_markdown stores the HTML of the Markdown
+        contents without HTML.
+        """
+        content = utils.create_content(model.MDContent.TYPE)
+        model.MDContent.objects.create(textfield='*Italic*', content=content)
+        call_command('render_markdown', stdout=io.StringIO())
+        self.assertEqual(model.MDContent.objects.get(content=content).html,
+                         '<p><em>Italic</em></p>\n')
+
+    @override_settings(EXPORT_MARKDOWN_WORKERS=2, EXPORT_MARKDOWN_BATCH=False)
+    def test_pre_render_contents_markdown(self):
+        """Pre render contents test case - Markdown
+
+        Tests that the Markdown contents are converted concurrently by at most the configured
+        number of threads and that all PDFs are written when the function returns.
+        """
+        contents = []
+        for idx in range(4):
+            content = utils.create_content(model.MDContent.TYPE)
+            model.MDContent.objects.create(textfield=f"# Title {idx}", content=content)
+            contents.append(content)
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def from_string(html, options):  # pylint: disable=unused-argument
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.1)
+            with lock:
+                running[0] -= 1
+            return b'%PDF'
+
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch('export.helper_functions.pdfkit.from_string', from_string):
+            output = io.BytesIO()
+            helper.Latex.pre_render_contents(contents, True, directory, output)
+            rendered = output.getvalue()
+            for content in contents:
+                self.assertIn(f'MD_{content.pk}.pdf'.encode(helper.Latex.encoding), rendered)
+                with open(os.path.join(directory, f'MD_{content.pk}.pdf'), 'rb') as file:
+                    self.assertEqual(file.read(), b'%PDF')
+        self.assertEqual(running[1], 2)
+
+
+    @mock.patch('export.helper_functions.pdfkit.from_string', return_value=b'%PDF')
+    def test_write_batch_pdf(self, from_string):
+        """Write batch PDF test case
+
+        Tests that the page ranges of the sections are read from the markers in the PDF.
+        """
+        pdftotext = mock.Mock(stdout=b'ccmdsection0ccmdsection A\fB\fccmdsection1ccmdsection C')
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch('export.helper_functions.run', return_value=pdftotext):
+            path = os.path.join(directory, helper.Markdown.batch_name)
+            self.assertEqual(helper.Markdown.write_batch_pdf(['<p>A</p>', '<p>C</p>'], path, {}),
+                             ['1-2', '3-'])
+            pdftotext.stdout = b'ccmdsection1ccmdsection C'
+            self.assertIsNone(helper.Markdown.write_batch_pdf(['<p>A</p>', '<p>C</p>'], path, {}))
+        html = from_string.call_args[0][0]
+        self.assertLess(html.index('ccmdsection0ccmdsection'), html.index('<p>A</p>'))
+        self.assertIn('page-break-before:always', html)
+
+    @override_settings(LATEX_COMPILE_CACHE_DIR=tempfile.mkdtemp(), EXPORT_MARKDOWN_BATCH=True)
+    @mock.patch('export.helper_functions.shutil.which', return_value='/usr/bin/pdftotext')
+    @mock.patch('export.helper_functions.pdfkit.from_string', return_value=b'%PDF')
+    def test_pre_render_contents_batch(self, from_string, which):  # pylint: disable=unused-argument
+        """Pre render contents test case - batch
+
+        Tests that the Markdown contents of an export are converted with a single wkhtmltopdf
+        run, that they include their pages of the batch PDF and that the batch is cached.
+        """
+        helper.fragment_cache.clear()
+        contents = []
+        for idx in range(3):
+            with reversion.create_revision():
+                content = utils.create_content(model.MDContent.TYPE)
+                model.MDContent.objects.create(textfield=f"# Title {idx}", content=content)
+            contents.append(content)
+        pdftotext = mock.Mock(stdout=b'ccmdsection0ccmdsection\fccmdsection1ccmdsection\f\f'
+                                     b'ccmdsection2ccmdsection')
+        with mock.patch('export.helper_functions.run', return_value=pdftotext) as run:
+            for _ in range(2):
+                with tempfile.TemporaryDirectory() as directory:
+                    output = io.BytesIO()
+                    helper.Latex.pre_render_contents(contents, True, directory, output)
+                    rendered = output.getvalue()
+                    self.assertIn(b'\\includepdf[pages=1-1]{MD_batch.pdf}', rendered)
+                    self.assertIn(b'\\includepdf[pages=2-3]{MD_batch.pdf}', rendered)
+                    self.assertIn(b'\\includepdf[pages=4-]{MD_batch.pdf}', rendered)
+                    with open(os.path.join(directory, helper.Markdown.batch_name), 'rb') as file:
+                        self.assertEqual(file.read(), b'%PDF')
+        self.assertEqual(from_string.call_count, 1)
+        self.assertEqual(run.call_count, 1)
+
+@override_settings(LATEX_COMPILE_CACHE_DIR=tempfile.mkdtemp(), EXPORT_MARKDOWN_BATCH=False)
+class FragmentCacheTestCase(TestCase):
+    """Fragment cache test case
+
+    Defines the test cases for the fragment cache of the export.
+    """
+
+    def setUp(self):
+        """
+        Sets up the test database
+        """
+        utils.setup_database()
+        helper.fragment_cache.clear()
+        with reversion.create_revision():
+            self.content = utils.create_content(model.MDContent.TYPE)
+            model.MDContent.objects.create(textfield="# Title", content=self.content)
+
+    def pre_render_contents(self, export_flag, directory=None):
+        """Pre render contents
+
+        Pre renders the content of the test case into the given or a temporary directory.
+
+        :param export_flag: True if export, False if simple content compilation
+        :type export_flag: bool
+        :param directory: The directory in which the LaTeX code will be compiled
+        :type directory: str or None
+
+        :return: the rendered templates
+        :rtype: bytes
+        """
+        output = io.BytesIO()
+        if directory is not None:
+            helper.Latex.pre_render_contents([self.content], export_flag, directory, output)
+        else:
+            with tempfile.TemporaryDirectory() as tempdir:
+                helper.Latex.pre_render_contents([self.content], export_flag, tempdir, output)
+        return output.getvalue()
+
+    @mock.patch('export.helper_functions.pdfkit.from_string', return_value=b'%PDF')
+    def test_pre_render_contents_cached(self, from_string):
+        """Pre render contents test case - cached
+
+        Tests that unchanged contents are taken from the cache including their Markdown PDF
+        and that changed contents are rendered again.
+        """
+        rendered = self.pre_render_contents(True)
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertEqual(self.pre_render_contents(True, directory), rendered)
+            with open(os.path.join(directory, f'MD_{self.content.pk}.pdf'), 'rb') as file:
+                self.assertEqual(file.read(), b'%PDF')
+        self.assertEqual(from_string.call_count, 1)
+
+        # A new revision invalidates the fragment
+        with reversion.create_revision():
+            self.content.description = 'changed'
+            self.content.save()
+        self.assertIn(b'changed', self.pre_render_contents(True))
+        self.assertEqual(from_string.call_count, 2)
+
+    @mock.patch('export.helper_functions.pdfkit.from_string', return_value=b'%PDF')
+    def test_pre_render_contents_no_export(self, from_string):
+        """Pre render contents test case - no export
+
+        Tests that simple content compilations do not use the cache.
+        """
+        for _ in range(2):
+            self.pre_render_contents(False)
+        self.assertEqual(from_string.call_count, 2)
+
+
+class CompileTestCase(TestCase):
+    """Compile test case
+
+    Defines the test cases for the pdflatex pass control of the class Latex.
+    """
+
+    @staticmethod
+    def fake_pdflatex(toc, output=b'Output written on texput.pdf'):
+        """Fake pdflatex
+
+        Returns a replacement of Popen which writes the table of contents returned by the
+        given function into the compile directory.
+
+        :param toc: The function returning the table of contents of the given pass
+        :type toc: Callable[[int], bytes]
+        :param output: The output of pdflatex
+        :type output: bytes
+
+        :return: the replacement of Popen
+        :rtype: mock.Mock
+        """
+        def popen(args, cwd, **kwargs):  # pylint: disable=unused-argument
+            process = mock.MagicMock()
+            process.__enter__.return_value = process
+            process.returncode = 0
+
+            def communicate(timeout=None):  # pylint: disable=unused-argument
+                with open(os.path.join(cwd, 'texput.toc'), 'wb') as file:
+                    file.write(toc(popen_mock.call_count))
+                return output, None
+            process.communicate = communicate
+            return process
+        popen_mock = mock.Mock(side_effect=popen)
+        return popen_mock
+
+    def test_compile_converged(self):
+        """Compile test case - converged
+
+        Tests that no further passes are run when the table of contents is stable.
+        """
+        popen = self.fake_pdflatex(lambda _: b'toc')
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch('export.runner.Popen', popen):
+            open(os.path.join(directory, helper.Latex.tex_file), 'wb').close()
+            _, passes = helper.Latex.compile(directory, 5)
+        self.assertEqual(passes, 2)
+
+    def test_compile_max_passes(self):
+        """Compile test case - maximum passes
+
+        Tests that the number of passes is limited if the table of contents does not converge.
+        """
+        popen = self.fake_pdflatex(lambda count: str(count).encode())
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch('export.runner.Popen', popen):
+            open(os.path.join(directory, helper.Latex.tex_file), 'wb').close()
+            _, passes = helper.Latex.compile(directory, 3)
+        self.assertEqual(passes, 3)
+
+    @override_settings(LATEX_HALT_ON_ERROR=True)
+    def test_compile_error(self):
+        """Compile test case - error
+
+        Tests that an erroneous document is compiled only once and with halt on error.
+        """
+        popen = self.fake_pdflatex(lambda count: str(count).encode(), b'! Undefined control')
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch('export.runner.Popen', popen):
+            open(os.path.join(directory, helper.Latex.tex_file), 'wb').close()
+            _, passes = helper.Latex.compile(directory, 3)
+        self.assertEqual(passes, 1)
+        self.assertIn('-halt-on-error', popen.call_args[0][0])
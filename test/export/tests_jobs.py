@@ -0,0 +1,195 @@
+"""Purpose of this file
+
+This file contains the test cases for /export/models.py, /export/jobs.py and the export
+job views of /export/views.py.
+"""
+
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from test.test_cases import MediaTestCase
+from unittest import mock
+
+from django.contrib.auth.models import User  # pylint: disable=imported-auth-user
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from base.models import Course
+
+from export.helper_functions import Latex
+from export.jobs import run_job, work
+from export.models import ExportJob
+
+# Temporary export directory
+EXPORT_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(EXPORT_JOB_ROOT=EXPORT_ROOT)
+class ExportJobTestCase(MediaTestCase):
+    """Export job test case
+
+    Defines the test cases for the export jobs.
+    """
+
+    def setUp(self):
+        """Setup
+
+        Sets up the test database and the course to export.
+        """
+        super().setUp()
+        self.course = Course.objects.first()
+        self.profile = User.objects.first().profile
+
+    @classmethod
+    def tearDownClass(cls):
+        """Tear down class
+
+        Deletes the exported files after running the tests.
+        """
+        shutil.rmtree(EXPORT_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_enqueue_identical(self):
+        """Enqueue test case - identical requests
+
+        Tests that identical export requests are collapsed into one job.
+        """
+        path = reverse('frontend:export-course', args=(self.course.pk,))
+        response1 = self.client.post(path)
+        response2 = self.client.post(path)
+        self.assertEqual(response1.status_code, 202)
+        self.assertEqual(response1.json()['job_id'], response2.json()['job_id'])
+        self.assertEqual(response1.json()['status'], ExportJob.PENDING)
+        self.assertEqual(ExportJob.objects.count(), 1)
+
+    def test_enqueue_coursebook(self):
+        """Enqueue test case - coursebook
+
+        Tests that coursebooks of different users are different jobs.
+        """
+        other = User.objects.create(username='other').profile
+        job1 = ExportJob.enqueue(self.course, self.profile, False, 'Coursebook.pdf')
+        job2 = ExportJob.enqueue(self.course, other, False, 'Coursebook.pdf')
+        self.assertNotEqual(job1.pk, job2.pk)
+        self.assertFalse(job1.may_download(other))
+
+    def test_enqueue_course_user(self):
+        """Enqueue test case - course of different users
+
+        Tests that exports of the whole course of different users are different jobs, since
+        the name of the user is printed into the PDF.
+        """
+        other = User.objects.create(username='other').profile
+        job1 = ExportJob.enqueue(self.course, self.profile, True, 'Course.pdf')
+        job2 = ExportJob.enqueue(self.course, other, True, 'Course.pdf')
+        self.assertNotEqual(job1.pk, job2.pk)
+        self.assertFalse(job1.may_download(other))
+        self.assertTrue(job1.may_download(self.profile))
+
+    def test_enqueue_get(self):
+        """Enqueue test case - GET
+
+        Tests that exports can not be enqueued by a GET request.
+        """
+        response = self.client.get(reverse('frontend:export-course', args=(self.course.pk,)))
+        self.assertEqual(response.status_code, 405)
+
+    def test_claim_next(self):
+        """Claim next test case
+
+        Tests that a job is claimed exactly once.
+        """
+        job = ExportJob.enqueue(self.course, self.profile, True, 'Course.pdf')
+        claimed = ExportJob.claim_next()
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.status, ExportJob.RUNNING)
+        self.assertIsNone(ExportJob.claim_next())
+        # A new request while the job is running is collapsed into the running job
+        self.assertEqual(ExportJob.enqueue(self.course, self.profile, True, 'Course.pdf').pk,
+                         job.pk)
+
+    def test_requeue_stale(self):
+        """Requeue stale test case
+
+        Tests that running jobs of killed workers are requeued.
+        """
+        ExportJob.enqueue(self.course, self.profile, True, 'Course.pdf')
+        job = ExportJob.claim_next()
+        ExportJob.objects.filter(pk=job.pk).update(start_date=timezone.now() - timedelta(days=1))
+        self.assertEqual(ExportJob.requeue_stale(), 1)
+        self.assertEqual(ExportJob.claim_next().pk, job.pk)
+
+    @staticmethod
+    def fake_compile(pdf):
+        """Fake compile
+
+        Returns a replacement of pdf_compile which writes the given PDF and the LaTeX code
+        into the compile directory.
+
+        :param pdf: The compiled PDF or None if the compilation fails
+        :type pdf: bytes or None
+
+        :return: the replacement of pdf_compile
+        :rtype: Callable
+        """
+        def pdf_compile(user, pk, exp_all, directory):  # pylint: disable=unused-argument
+            with open(os.path.join(directory, Latex.tex_file), 'wb') as file:
+                file.write(b'tex')
+            if pdf is not None:
+                with open(os.path.join(directory, Latex.pdf_file), 'wb') as file:
+                    file.write(pdf)
+            return b'! Error', None
+        return pdf_compile
+
+    def test_work_download(self):
+        """Work test case - download
+
+        Tests that the worker compiles the pending job and that the PDF can be downloaded
+        afterwards.
+        """
+        response = self.client.post(reverse('frontend:export-course', args=(self.course.pk,)))
+        with mock.patch('export.jobs.pdf_compile', self.fake_compile(b'%PDF')):
+            self.assertEqual(work(once=True), 1)
+        status = self.client.get(response.json()['status_url']).json()
+        self.assertEqual(status['status'], ExportJob.DONE)
+        download = self.client.get(status['download_url'])
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(b''.join(download.streaming_content), b'%PDF')
+
+    def test_run_job_compile(self):
+        """Run job test case - compile
+
+        Tests that the worker compiles the course into the export storage.
+        """
+        ExportJob.enqueue(self.course, self.profile, True, 'Course.pdf')
+        job = ExportJob.claim_next()
+        run_job(job)
+        self.assertEqual(job.status, ExportJob.DONE)
+        self.assertTrue(job.pdf.name.endswith('.pdf'))
+        self.assertGreater(job.pdf.size, 0)
+
+    def test_run_job_failed(self):
+        """Run job test case - failed
+
+        Tests that a failed compilation shows the rendering error page.
+        """
+        ExportJob.enqueue(self.course, self.profile, True, 'Course.pdf')
+        job = ExportJob.claim_next()
+        with mock.patch('export.jobs.pdf_compile', self.fake_compile(None)):
+            run_job(job)
+        self.assertEqual(job.status, ExportJob.FAILED)
+        response = self.client.get(reverse('frontend:export-download', args=(job.pk,)))
+        self.assertTemplateUsed(response, 'frontend/coursebook/rendering-error.html')
+        self.assertContains(response, '! Error')
+        self.assertEqual(job.tex_template, 'tex')
+
+    def test_download_pending(self):
+        """Download test case - pending
+
+        Tests that the download of an unfinished job is not found.
+        """
+        job = ExportJob.enqueue(self.course, self.profile, True, 'Course.pdf')
+        response = self.client.get(reverse('frontend:export-download', args=(job.pk,)))
+        self.assertEqual(response.status_code, 404)
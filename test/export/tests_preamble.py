@@ -0,0 +1,132 @@
+"""Purpose of this file
+
+This file contains the test cases for /export/preamble.py.
+"""
+
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from export.preamble import PreambleFormat
+
+# Temporary format directory
+FORMAT_DIR = tempfile.mkdtemp()
+
+# Preamble and body of a document
+DOCUMENT = '\\documentclass{article}\n%%% End of preamble\n\\begin{document}'
+
+
+def fake_pdflatex(create):
+    """Fake pdflatex
+
+    Returns a replacement of Popen which creates the format file of pdflatex -ini if
+    requested.
+
+    :param create: Indicator if the format file is created
+    :type create: bool
+
+    :return: the replacement of Popen
+    :rtype: mock.Mock
+    """
+    def popen(args, cwd=None, **kwargs):  # pylint: disable=unused-argument
+        if create and '-ini' in args:
+            name = [arg for arg in args if arg.startswith('-jobname=')][0][len('-jobname='):]
+            with open(os.path.join(cwd, f'{name}.fmt'), 'wb') as file:
+                file.write(b'format')
+        process = mock.MagicMock()
+        process.__enter__.return_value = process
+        process.communicate.return_value = (b'', None)
+        process.returncode = 0
+        return process
+    return mock.Mock(side_effect=popen)
+
+
+@override_settings(LATEX_FORMAT_DIR=FORMAT_DIR, LATEX_USE_FORMAT=True)
+class PreambleFormatTestCase(SimpleTestCase):
+    """Preamble format test case
+
+    Defines the test cases for the class PreambleFormat.
+    """
+
+    def setUp(self):
+        """Setup
+
+        Removes all formats.
+        """
+        PreambleFormat.clear()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Tear down class
+
+        Deletes the format directory after running the tests.
+        """
+        shutil.rmtree(FORMAT_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_split(self):
+        """Split test case
+
+        Tests that a template is split at the marker.
+        """
+        self.assertEqual(PreambleFormat.split(DOCUMENT),
+                         ('\\documentclass{article}\n', '\n\\begin{document}'))
+        self.assertEqual(PreambleFormat.split('\\begin{document}'),
+                         (None, '\\begin{document}'))
+
+    def test_prepare_format(self):
+        """Prepare test case - format
+
+        Tests that the format is built once and linked into the compile directory.
+        """
+        popen = fake_pdflatex(True)
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch('export.runner.Popen', popen):
+            name, body = PreambleFormat.prepare(DOCUMENT, directory)
+            self.assertEqual(body, f'% Format: {name}\n\n\\begin{{document}}')
+            self.assertTrue(os.path.exists(os.path.join(directory, f'{name}.fmt')))
+            calls = popen.call_count
+            PreambleFormat.prepare(DOCUMENT, directory)
+            self.assertEqual(popen.call_count, calls)
+
+    def test_prepare_failed(self):
+        """Prepare test case - failed
+
+        Tests that the whole template is used if the format can not be built and that the
+        build is not tried again.
+        """
+        popen = fake_pdflatex(False)
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch('export.runner.Popen', popen):
+            self.assertEqual(PreambleFormat.prepare(DOCUMENT, directory), (None, DOCUMENT))
+            calls = popen.call_count
+            self.assertEqual(PreambleFormat.prepare(DOCUMENT, directory), (None, DOCUMENT))
+            self.assertEqual(popen.call_count, calls)
+            # The build is tried again once the failure expired
+            with override_settings(LATEX_FORMAT_RETRY=0):
+                PreambleFormat.prepare(DOCUMENT, directory)
+            self.assertGreater(popen.call_count, calls)
+
+    def test_prepare_changed(self):
+        """Prepare test case - changed preamble
+
+        Tests that a changed preamble gets its own format.
+        """
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch('export.runner.Popen', fake_pdflatex(True)):
+            name1, _ = PreambleFormat.prepare(DOCUMENT, directory)
+            name2, _ = PreambleFormat.prepare('\\usepackage{tikz}\n' + DOCUMENT, directory)
+        self.assertNotEqual(name1, name2)
+        self.assertTrue(os.path.exists(PreambleFormat.path(name2)))
+
+    @override_settings(LATEX_USE_FORMAT=False)
+    def test_prepare_disabled(self):
+        """Prepare test case - disabled
+
+        Tests that no format is used if it is disabled.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertEqual(PreambleFormat.prepare(DOCUMENT, directory), (None, DOCUMENT))
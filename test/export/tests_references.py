@@ -0,0 +1,46 @@
+"""Purpose of this file
+
+This file contains the test cases for /export/references.py.
+"""
+
+from django.test import SimpleTestCase
+
+from export.references import render_markdown, resolve_tex_references
+
+
+class ReferencesTestCase(SimpleTestCase):
+    """References test case
+
+    Defines the test cases for the resolution of attachment references.
+    """
+
+    def test_render_markdown(self):
+        """Render Markdown test case
+
+        Tests that the image references are resolved while parsing, including references with
+        a title, and that references to missing attachments are kept.
+        """
+        paths = [f'/media/image{idx}.png' for idx in range(11)]
+        html = render_markdown('![a](Image-1) ![b](Image-10 "Title") ![c](Image-11)', paths)
+        self.assertIn('<img src="/media/image1.png" alt="a" />', html)
+        self.assertIn('<img src="/media/image10.png" alt="b" title="Title" />', html)
+        self.assertIn('<img src="Image-11" alt="c" />', html)
+
+    def test_render_markdown_code(self):
+        """Render Markdown test case - code
+
+        Tests that references in code are not resolved.
+        """
+        html = render_markdown('`![a](Image-0)`', ['/media/image0.png'])
+        self.assertNotIn('/media/image0.png', html)
+
+    def test_resolve_tex_references(self):
+        """Resolve TeX references test case
+
+        Tests that the references of all includegraphics commands are resolved in one scan.
+        """
+        text = r'\includegraphics[width=\textwidth]{Image-1}\includegraphics{Image-0}' \
+               r'\includegraphics{Image-2}'
+        self.assertEqual(resolve_tex_references(text, ['a.png', 'b.png']),
+                         r'\includegraphics[width=\textwidth]{b.png}\includegraphics{a.png}'
+                         r'\includegraphics{Image-2}')
@@ -0,0 +1,153 @@
+"""Purpose of this file
+
+This file contains the test cases for /export/runner.py.
+"""
+
+import sys
+import threading
+from subprocess import DEVNULL
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from export.runner import CompileBusy, CompileRunner, PreviewGate, PreviewSuperseded
+
+
+class CompileRunnerTestCase(SimpleTestCase):
+    """Compile runner test case
+
+    Defines the test cases for the class CompileRunner.
+    """
+
+    @override_settings(LATEX_COMPILE_TIMEOUT=1)
+    def test_run_timeout(self):
+        """Run test case - timeout
+
+        Tests that a process exceeding the timeout is killed and reported as error.
+        """
+        output = CompileRunner().run([sys.executable, '-c', 'import time; time.sleep(30)'],
+                                     DEVNULL, '.')
+        self.assertIn(CompileRunner.timeout_message, output[0])
+        self.assertTrue(CompileRunner.aborted(output))
+
+    @override_settings(LATEX_COMPILE_CPU_LIMIT=5, LATEX_COMPILE_MEMORY_LIMIT=2 ** 31)
+    def test_run_limits(self):
+        """Run test case - limits
+
+        Tests that the resource limits are applied to the process.
+        """
+        code = 'import resource; ' \
+               'print(resource.getrlimit(resource.RLIMIT_CPU)[0], ' \
+               'resource.getrlimit(resource.RLIMIT_AS)[0])'
+        output = CompileRunner().run([sys.executable, '-c', code], DEVNULL, '.')
+        self.assertEqual(output[0].split(), [b'5', str(2 ** 31).encode()])
+        self.assertFalse(CompileRunner.aborted(output))
+        # Without prlimit the limits are applied by a Python wrapper
+        with mock.patch('export.runner.shutil.which', return_value=None):
+            output = CompileRunner().run([sys.executable, '-c', code], DEVNULL, '.')
+        self.assertEqual(output[0].split(), [b'5', str(2 ** 31).encode()])
+
+    @override_settings(LATEX_COMPILE_CPU_LIMIT=5, EXPORT_COMPILE_CPU_LIMIT=50,
+                       LATEX_COMPILE_WAIT=10, EXPORT_COMPILE_WAIT=None)
+    def test_background(self):
+        """Background test case
+
+        Tests that the limits of the background compilations are used in the background
+        context of the current thread only.
+        """
+        runner = CompileRunner()
+        with runner.background():
+            self.assertEqual(runner.setting('COMPILE_CPU_LIMIT'), 50)
+            self.assertIsNone(runner.setting('COMPILE_WAIT'))
+            other = []
+            thread = threading.Thread(
+                target=lambda: other.append(runner.setting('COMPILE_CPU_LIMIT')))
+            thread.start()
+            thread.join()
+            self.assertEqual(other, [5])
+        self.assertEqual(runner.setting('COMPILE_CPU_LIMIT'), 5)
+
+    def test_slot_busy(self):
+        """Slot test case - busy
+
+        Tests that CompileBusy is raised if all slots are taken and that released slots
+        are available again.
+        """
+        runner = CompileRunner(slots=1)
+        acquired = threading.Event()
+        release = threading.Event()
+
+        def hold():
+            with runner.slot():
+                acquired.set()
+                release.wait()
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        acquired.wait()
+        with self.assertRaises(CompileBusy):
+            with runner.slot(wait=0.1):
+                pass
+        release.set()
+        thread.join()
+        with runner.slot(wait=0.1):
+            pass
+
+
+class PreviewGateTestCase(SimpleTestCase):
+    """Preview gate test case
+
+    Defines the test cases for the class PreviewGate.
+    """
+
+    def test_turn_superseded(self):
+        """Turn test case - superseded
+
+        Tests that a waiting preview gives up if a newer preview of the same user was
+        requested, while previews of other users are not affected.
+        """
+        gate = PreviewGate()
+        first = gate.ticket(1)
+        with gate.turn(1, first):
+            second = gate.ticket(1)
+            third = gate.ticket(1)
+            with self.assertRaises(PreviewSuperseded):
+                with gate.turn(1, second, wait=1):
+                    pass
+            with gate.turn(2, gate.ticket(2), wait=0.1):
+                pass
+        with gate.turn(1, third, wait=0.1):
+            pass
+
+    def test_turn_busy(self):
+        """Turn test case - busy
+
+        Tests that CompileBusy is raised if the previous preview of the user does not finish
+        in time.
+        """
+        gate = PreviewGate()
+        with gate.turn(1, gate.ticket(1)):
+            ticket = gate.ticket(1)
+            # The running preview is not interrupted by the newer ticket
+            with self.assertRaises(CompileBusy):
+                with gate.turn(1, ticket, wait=0.1):
+                    pass
+
+    def test_turn_pruned(self):
+        """Turn test case - pruned
+
+        Tests that the entries of a user are dropped when the turns of all tickets of the
+        user are over.
+        """
+        gate = PreviewGate()
+        first = gate.ticket(1)
+        second = gate.ticket(1)
+        with self.assertRaises(PreviewSuperseded):
+            with gate.turn(1, first, wait=0.1):
+                pass
+        self.assertTrue(gate._tickets)  # pylint: disable=protected-access
+        with gate.turn(1, second, wait=0.1):
+            pass
+        # pylint: disable=protected-access
+        self.assertEqual((gate._tickets, gate._user_locks, gate._pending), ({}, {}, {}))
+        self.assertEqual(gate.ticket(1), 1)
@@ -0,0 +1,187 @@
+"""Purpose of this file
+
+This file contains the test cases for /frontend/search.py.
+"""
+
+import io
+
+from test.test_cases import BaseCourseViewTestCase
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import override_settings
+
+from base.models import Content, Course, SearchDocument, SearchQueueEntry, Topic
+from frontend.search import SQLITE_TRIGGERS, SQLiteBackend, ensure_index, process_queue, \
+    search, sqlite_has_fts5
+
+
+class SearchQueueTestCase(BaseCourseViewTestCase):
+    """Search queue test case
+
+    Defines the test cases for the queue of the search index.
+    """
+
+    def setUp(self):
+        """Setup
+
+        Sets up the test database and processes the queue of the setup.
+        """
+        super().setUp()
+        process_queue()
+
+    def test_enqueue(self):
+        """Test enqueue
+
+        Tests that saved objects are enqueued and indexed by processing the queue.
+        """
+        self.topic1.title = 'Graphs'
+        self.topic1.save()
+        self.assertTrue(SearchQueueEntry.objects.filter(kind=SearchDocument.KIND_TOPIC,
+                                                        object_id=self.topic1.pk).exists())
+        self.assertEqual(SearchDocument.objects.get(topic=self.topic1,
+                                                    kind=SearchDocument.KIND_TOPIC).title,
+                         'Topic1')
+        process_queue()
+        self.assertFalse(SearchQueueEntry.objects.exists())
+        self.assertEqual(SearchDocument.objects.get(topic=self.topic1,
+                                                    kind=SearchDocument.KIND_TOPIC).title,
+                         'Graphs')
+
+    def test_commit(self):
+        """Test commit
+
+        Tests that the queue is processed after the commit.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            course = Course.objects.create(title='Graphs', description='desc',
+                                           category=self.cat)
+        self.assertFalse(SearchQueueEntry.objects.exists())
+        self.assertTrue(SearchDocument.objects.filter(course=course).exists())
+
+    def test_rollback(self):
+        """Test rollback
+
+        Tests that the entries of a rolled back transaction are discarded.
+        """
+        with self.assertRaises(ValueError), transaction.atomic():
+            Course.objects.create(title='Graphs', description='desc', category=self.cat)
+            raise ValueError
+        self.assertFalse(SearchQueueEntry.objects.exists())
+
+    def test_batches(self):
+        """Test batches
+
+        Tests that the queue is processed in batches and every object is indexed once per
+        batch.
+        """
+        for _ in range(2):
+            for topic in Topic.objects.all():
+                topic.save()
+        self.assertEqual(process_queue(batch_size=3), 2 * Topic.objects.count())
+        self.assertEqual(SearchDocument.objects.filter(kind=SearchDocument.KIND_TOPIC).count(),
+                         Topic.objects.count())
+
+
+    @override_settings(SEARCH_INDEX_BATCH_SIZE=2)
+    def test_commit_own_entries(self):
+        """Test commit own entries
+
+        Tests that a commit only processes the entries of its transaction and the remaining
+        entries are processed by the command.
+        """
+        SearchQueueEntry.objects.create(kind=SearchDocument.KIND_TOPIC,
+                                        object_id=self.topic2.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            for topic in Topic.objects.exclude(pk=self.topic2.pk):
+                topic.save()
+        self.assertEqual(list(SearchQueueEntry.objects.values_list('object_id', flat=True)),
+                         [self.topic2.pk])
+        call_command('rebuild_search_index', '--queue', stdout=io.StringIO())
+        self.assertFalse(SearchQueueEntry.objects.exists())
+
+
+class RebuildSearchIndexTestCase(BaseCourseViewTestCase):
+    """Rebuild search index test case
+
+    Defines the test cases for the command rebuild_search_index.
+    """
+
+    def test_rebuild(self):
+        """Test rebuild
+
+        Tests that the documents of all objects are created in chunks and the queue is
+        processed.
+        """
+        SearchDocument.objects.all().delete()
+        call_command('rebuild_search_index', '--chunk-size', '1', stdout=io.StringIO())
+        self.assertEqual(SearchDocument.objects.count(),
+                         Course.objects.count() + Topic.objects.count()
+                         + Content.objects.count())
+        self.assertFalse(SearchQueueEntry.objects.exists())
+
+    def test_rebuild_kind(self):
+        """Test rebuild kind
+
+        Tests that only the documents of the chosen kind are created.
+        """
+        SearchDocument.objects.all().delete()
+        SearchQueueEntry.objects.all().delete()
+        call_command('rebuild_search_index', '--kind', 'course', stdout=io.StringIO())
+        self.assertEqual(SearchDocument.objects.count(), Course.objects.count())
+
+
+class SearchIndexTestCase(BaseCourseViewTestCase):
+    """Search index test case
+
+    Defines the test cases for the triggers of the search index on SQLite.
+    """
+
+    def setUp(self):
+        """Setup
+
+        Sets up the test database, the test cases are skipped without the FTS5 table.
+        """
+        super().setUp()
+        if connection.vendor != 'sqlite' or not sqlite_has_fts5():
+            self.skipTest('The search index needs SQLite with FTS5.')
+        process_queue()
+
+    @staticmethod
+    def triggers():
+        """Triggers
+
+        Returns the names of the triggers of the search index.
+
+        :return: the names of the triggers
+        :rtype: set[str]
+        """
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+            return {name for name, in cursor.fetchall()} & set(SQLITE_TRIGGERS)
+
+    def test_migrate(self):
+        """Test migrate
+
+        Tests that the triggers exist after the migrations.
+        """
+        self.assertEqual(self.triggers(), set(SQLITE_TRIGGERS))
+        self.assertEqual(ensure_index(), [])
+
+    def test_ensure_index(self):
+        """Test ensure index
+
+        Tests that dropped triggers are recreated and that the documents changed without
+        them are found afterwards.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {SQLiteBackend.table}_insert')
+        course = Course.objects.create(title='Graphs', description='desc', category=self.cat)
+        process_queue()
+        self.assertFalse(search('graphs', self.user.profile).exists())
+        call_command('rebuild_search_index', '--queue', stdout=io.StringIO())
+        self.assertNotIn(f'{SQLiteBackend.table}_insert', self.triggers())
+        call_command('rebuild_search_index', '--kind', 'course', stdout=io.StringIO())
+        self.assertEqual(self.triggers(), set(SQLITE_TRIGGERS))
+        self.assertEqual([document.course_id for document in search('graphs', self.user.profile)],
+                         [course.pk])
@@ -7,7 +7,7 @@ This file contains the test cases for /frontend/forms/content.py.
 from test import utils
 from test.test_cases import MediaTestCase
 
-from unittest import skip
+from unittest import mock, skip
 
 from django.test import TestCase
 from django.urls import reverse
@@ -20,8 +20,11 @@ import content.models as model
 from base.models.profile import Profile
 from content.attachment.forms import ImageAttachmentFormSet
 from content.attachment.models import ImageAttachment
+from content.previews import run
 
 from frontend.forms import AddContentForm
+from export.cache import preview_cache
+from export.runner import CompileBusy
 from frontend.views.content import clean_attachment, approve_content, hide_content
 
 
@@ -157,6 +160,7 @@ class AddContentViewTestCase(MediaTestCase):
         self.assertEqual(content.source, "src")
         self.assertEqual(content.textfield, "test text")
         self.assertEqual(content.textfield,content.md.open().read().decode('utf-8'))
+        self.assertEqual(content.html, "<p>test text</p>\n")
 
     def test_add_md_file(self):
         """POST test case - add Markdown
@@ -570,6 +574,97 @@ class AddContentViewTestCase(MediaTestCase):
             self.assertEqual(model.Latex.objects.count(), old_objects_count)
             self.assertEqual(ImageAttachment.objects.count(), old_attachments_count)
 
+    def test_latex_preview_cached(self):
+        """POST test case LaTeX preview - cached
+
+        Tests that an identical preview request is answered from the preview cache without
+        compiling the preview again.
+        """
+        path = reverse('frontend:content-add', kwargs={
+            'course_id': 1, 'topic_id': 1, 'type': 'Latex'
+        })
+        data = {
+            'textfield': 'Lorem ipsum cached',
+            'form-TOTAL_FORMS': '0',
+            'form-INITIAL_FORMS': '0',
+            'latex-preview': True,
+        }
+        preview_cache.clear()
+        # Last parameter is used to make the request an ajax request
+        first = self.client.post(path, data, **{'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'})
+        with mock.patch('export.views.Latex.render') as render:
+            second = self.client.post(path, data, **{'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'})
+            render.assert_not_called()
+        self.assertEqual(second.reason_phrase, 'OK')
+        self.assertEqual(first.content, second.content)
+
+    @mock.patch('export.helper_functions.compile_runner.slot', side_effect=CompileBusy)
+    def test_latex_preview_busy(self, slot):  # pylint: disable=unused-argument
+        """POST test case LaTeX preview - busy
+
+        Tests that the POST preview request is rejected with the corresponding reason if
+        all compilation slots are taken.
+        """
+        path = reverse('frontend:content-add', kwargs={
+            'course_id': 1, 'topic_id': 1, 'type': 'Latex'
+        })
+        data = {
+            'textfield': 'Lorem ipsum busy',
+            'form-TOTAL_FORMS': '0',
+            'form-INITIAL_FORMS': '0',
+            'latex-preview': True,
+        }
+        # Last parameter is used to make the request an ajax request
+        response = self.client.post(path, data, **{'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.reason_phrase, 'Server busy, please try again in a moment')
+
+    @mock.patch('content.previews.executor')
+    def test_add_latex_preview_scheduled(self, executor):
+        """POST test case - add LaTeX - preview scheduled
+
+        Tests that the preview of a LaTeX Content is not generated in the request but after
+        the commit and that the content shows the placeholder until then.
+        """
+        path = reverse('frontend:content-add', kwargs={
+            'course_id': 1, 'topic_id': 1, 'type': 'Latex'
+        })
+        data = {
+            'language': 'de',
+            'textfield': '\\textbf{Preview}',
+            'source': 'src',
+            'form-TOTAL_FORMS': '0',
+            'form-INITIAL_FORMS': '0'
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post_redirects_to_content(path, data)
+        content = Content.objects.get(pk=2)
+        self.assertFalse(content.preview)
+        executor.return_value.submit.assert_called_once_with(run, content.pk)
+
+    @mock.patch('export.helper_functions.compile_runner.slot', side_effect=CompileBusy)
+    def test_add_latex_busy(self, slot):  # pylint: disable=unused-argument
+        """POST test case - add LaTeX - busy
+
+        Tests that no LaTeX Content is created if all compilation slots are taken and that
+        the form is rendered again.
+        """
+        path = reverse('frontend:content-add', kwargs={
+            'course_id': 1, 'topic_id': 1, 'type': 'Latex'
+        })
+        data = {
+            'language': 'de',
+            'textfield': '\\textbf{Busy}',
+            'source': 'src',
+            'form-TOTAL_FORMS': '0',
+            'form-INITIAL_FORMS': '0'
+        }
+        contents_count = Content.objects.count()
+        response = self.client.post(path, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(model.Latex.objects.count(), 1)
+        self.assertEqual(Content.objects.count(), contents_count)
+
     def test_add_attachments(self):
         """POST test case - add attachments
 
@@ -810,6 +905,7 @@ class EditContentViewTestCase(MediaTestCase):
         md_content = model.MDContent.objects.first()
         self.assertEqual(md_content.source, 'src text')
         self.assertEqual(md_content.textfield, 'Lorem ipsum')
+        self.assertEqual(md_content.html, '<p>Lorem ipsum</p>\n')
 
 
 class PublicContentReadingModeViewTestCase(MediaTestCase):
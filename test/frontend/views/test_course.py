@@ -7,9 +7,13 @@ from turtle import pu
 from unittest.mock import Base
 
 from test.test_cases import BaseCourseViewTestCase
+from django.contrib.auth.models import User  # pylint: disable=imported-auth-user
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from base.models import CourseStructureEntry, Topic
+from base.models import Content, CourseStructureEntry, Favorite, Rating, Tag, Topic
+from frontend.cache import fragment_key
 from frontend.forms.course import CreateTopicForm
 
 
@@ -53,13 +57,13 @@ class CourseViewTestCase(BaseCourseViewTestCase):
                                     **{'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'})
         self.assertEqual(response.status_code, 200)
         # after post the structure of topics should also be accordingly changed
-        self.assertEqual(list(CourseStructureEntry.objects.all()
-                              .values_list("index", flat=True)),
+        self.assertEqual([entry.index for entry in CourseStructureEntry.objects.all()],
                          ['1', '2', '3'])
         self.assertEqual(list(CourseStructureEntry.objects.all()
                               .values_list("topic_id", flat=True)),
                          [2, 3, 4])
-        self.assertIsNotNone(CourseStructureEntry.objects.get(index='3', topic=self.topic3))
+        self.assertIsNotNone(CourseStructureEntry.objects.get(position=3, sub_position=0,
+                                                              topic=self.topic3))
 
     def test_bad_response_course_view(self):
         """CourseView post test case - request is ajax and check is false.
@@ -116,6 +120,9 @@ class EditStructureViewTestView(BaseCourseViewTestCase):
         self.assertIsNotNone(Topic.objects.get(pk=5))
         # check if the new topic is added to the response data
         self.assertEqual(json_response['topic_id'], 5)
+        # only the new topic is returned instead of all topics
+        self.assertEqual(json_response['topic'], str(Topic.objects.get(pk=5)))
+        self.assertNotIn('topics', json_response)
 
     def test_edit_course_structure_view_invalid(self):
         """EditCourseStructureView post test case - form invalid
@@ -173,7 +180,8 @@ class PublicCourseViewTestCase(BaseCourseViewTestCase):
         # Assert that the context values are correct
         self.assertEqual(context['course'], self.course)
         # Assert that the structure is correctly populated
-        structure_entries = CourseStructureEntry.objects.filter(course=self.course).order_by('index')
+        structure_entries = CourseStructureEntry.objects.filter(course=self.course) \
+            .order_by('position', 'sub_position')
         topics_recursive = context['structure']
         topics = context['structure']
 
@@ -190,3 +198,182 @@ class PublicCourseViewTestCase(BaseCourseViewTestCase):
             topic_entry = topics_recursive[i]
             self.assertEqual(topic_entry['topic'], entry.topic)
             self.assertEqual(len(topic_entry['subtopics']), number_of_subtopics[i])
+
+
+class CourseTreeQueryTestCase(BaseCourseViewTestCase):
+    """Course tree query test case
+
+    Defines the test cases for the number of queries of the course pages.
+    """
+
+    def add_contents(self, count):
+        """Add contents
+
+        Adds the given number of tagged and rated contents to the topics of the course and
+        adds every tenth content to the coursebook of the user.
+
+        :param count: The number of contents
+        :type count: int
+        """
+        topics = [self.topic1, self.topic2, self.topic3]
+        Content.objects.bulk_create(
+            Content(author=self.user.profile, topic=topics[idx % 3], type='Textfield',
+                    description=f'Content {idx}', language='de', public=True,
+                    rating_sum=idx % 5, rating_count=1)
+            for idx in range(count))
+        # The primary keys are not set by bulk_create on every database
+        contents = list(Content.objects.order_by('pk'))
+        tag = Tag.objects.create(title='Tag')
+        Content.tags.through.objects.bulk_create(
+            Content.tags.through(content_id=content.pk, tag_id=tag.pk) for content in contents)
+        Favorite.objects.bulk_create(
+            Favorite(user=self.user.profile, course=self.course1, content=content)
+            for content in contents[::10])
+
+    def count_queries(self, path, count):
+        """Count queries
+
+        Returns the number of queries of rendering the given course page with the given
+        number of contents.
+
+        :param path: The path of the course page
+        :type path: str
+        :param count: The number of contents
+        :type count: int
+
+        :return: the number of queries
+        :rtype: int
+        """
+        Content.objects.all().delete()
+        self.add_contents(count)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f'Content {count - 1}')
+        return len(queries)
+
+    def test_course_view_queries(self):
+        """CourseView get test case - queries
+
+        Tests that the number of queries does not depend on the number of contents.
+        """
+        path = reverse('frontend:course', kwargs={'pk': self.course1.pk})
+        self.assertEqual(self.count_queries(path, 10), self.count_queries(path, 1000))
+
+    def test_sorted_course_view_queries(self):
+        """CourseView post test case - sorted by rating
+
+        Tests that the contents are sorted by rating without additional queries.
+        """
+        path = reverse('frontend:course', kwargs={'pk': self.course1.pk})
+        self.add_contents(10)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(path, {'sort': 'Rating', 'filter': 'None'})
+        rates = [content.get_rate() for content in response.context['structure'][0]['topic_contents']]
+        self.assertEqual(rates, sorted(rates, reverse=True))
+        Content.objects.all().delete()
+        self.add_contents(100)
+        with CaptureQueriesContext(connection) as more_queries:
+            self.client.post(path, {'sort': 'Rating', 'filter': 'None'})
+        self.assertEqual(len(queries), len(more_queries))
+
+    def test_public_course_view_queries(self):
+        """PublicCourseView get test case - queries
+
+        Tests that the number of queries does not depend on the number of contents.
+        """
+        self.course1.public = True
+        self.course1.save()
+        self.client.logout()
+        path = reverse('frontend:public', kwargs={'pk': self.course1.pk})
+        self.assertEqual(self.count_queries(path, 10), self.count_queries(path, 1000))
+
+
+class CourseFragmentCacheTestCase(BaseCourseViewTestCase):
+    """Course fragment cache test case
+
+    Defines the test cases for the cached fragments of the course pages.
+    """
+
+    def setUp(self):
+        """Setup
+
+        Sets up the test database with a content in the course.
+        """
+        super().setUp()
+        self.path = reverse('frontend:course', kwargs={'pk': self.course1.pk})
+        self.content = Content.objects.create(author=self.user.profile, topic=self.topic1,
+                                              type='Textfield', description='Cached content',
+                                              language='de')
+        self.other_user = User.objects.create(username='other')
+
+    def test_cached_fragments(self):
+        """CourseView get test case - cached fragments
+
+        Tests that the structure is only loaded on the first request and that a changed
+        content is shown.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.path)
+        with CaptureQueriesContext(connection) as cached_queries:
+            response = self.client.get(self.path)
+        self.assertLess(len(cached_queries), len(queries))
+        self.assertContains(response, 'Cached content')
+
+        self.content.description = 'Changed content'
+        self.content.save()
+        response = self.client.get(self.path)
+        self.assertContains(response, 'Changed content')
+
+    def test_invalidation(self):
+        """Invalidation test case
+
+        Tests that ratings and structure changes invalidate the fragments of the course
+        while favorites only invalidate the coursebook of their user.
+        """
+        key = fragment_key(self.course1.pk, 'user')
+        Rating.objects.create(user=self.other_user.profile, content=self.content, rating=4)
+        self.assertNotEqual(key, fragment_key(self.course1.pk, 'user'))
+
+        key = fragment_key(self.course1.pk, 'user')
+        CourseStructureEntry.objects.filter(position=2, sub_position=1).delete()
+        self.assertNotEqual(key, fragment_key(self.course1.pk, 'user'))
+
+        key = fragment_key(self.course1.pk, 'user')
+        Favorite.objects.create(user=self.user.profile, course=self.course1,
+                                content=self.content)
+        self.assertEqual(key, fragment_key(self.course1.pk, 'user'))
+
+    def test_coursebook_injected(self):
+        """CourseView get test case - coursebook
+
+        Tests that the shared fragment shows the coursebook links of the requesting user.
+        """
+        add_path = reverse('frontend:coursebook-add-courseview', args=(
+            self.course1.pk, self.topic1.pk, self.content.pk))
+        remove_path = reverse('frontend:coursebook-remove-courseview', args=(
+            self.course1.pk, self.topic1.pk, self.content.pk))
+        Favorite.objects.create(user=self.user.profile, course=self.course1,
+                                content=self.content)
+        response = self.client.get(self.path)
+        self.assertContains(response, remove_path)
+        self.assertNotContains(response, add_path)
+
+        self.client.force_login(self.other_user)
+        response = self.client.get(self.path)
+        self.assertContains(response, add_path)
+        self.assertNotContains(response, remove_path)
+
+    def test_hidden_content(self):
+        """CourseView get test case - hidden content
+
+        Tests that a hidden content is only shown to its author.
+        """
+        self.content.hidden = True
+        self.content.save()
+        self.client.force_login(self.other_user)
+        self.assertNotContains(self.client.get(self.path), 'Cached content')
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(self.path), 'Cached content')
+        self.client.force_login(self.other_user)
+        self.assertNotContains(self.client.get(self.path), 'Cached content')
@@ -15,7 +15,7 @@ from django.urls import reverse
 
 from content.attachment.models import ImageAttachment
 from frontend.views.history import Reversion
-from base.models import Content, Course
+from base.models import Content, Course, SearchDocument
 
 import content.models as model
 
@@ -173,6 +173,15 @@ class ContentHistoryCompareViewTestCase(MediaTestCase):
         # topic id should not be changed
         self.assertEqual(text1.content.topic_id, 1)
 
+    def test_textfield_revert_indexed(self):
+        """Revert version test case - search index
+
+        Tests that the search document of a content is updated by a revert.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.textfield_path, {'ver_pk': '2'})
+        self.assertEqual(SearchDocument.objects.get(content_id=2).body, 'Hello!')
+
     def assert_revert_to_2nd_version(self):
         """assert revert to 2nd version
 
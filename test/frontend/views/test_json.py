@@ -5,6 +5,8 @@ This file contains the test cases for /frontend/views/json.py.
 
 from test.test_cases import BaseCourseViewTestCase
 from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from frontend.views.json import JsonHandler
 
@@ -178,7 +180,7 @@ class CleanTestCase(BaseCourseViewTestCase):
         JsonHandler.clean_structure_sub_topic(self.course1, 2, 1)
         # the course should only has two topics now
         self.assertEqual(self.course1.topics.all().count(), 2)
-        self.assertEqual(list(CourseStructureEntry.objects.all().values_list("index", flat=True)),
+        self.assertEqual([entry.index for entry in CourseStructureEntry.objects.all()],
                          ['1', '2'])
 
     def test_clean_structure_sub_topic_deletion_many(self):
@@ -194,7 +196,7 @@ class CleanTestCase(BaseCourseViewTestCase):
         ids = self.course1.topics.all().values_list("pk", flat=True)
         # the course should be same as before
         self.assertEqual(list(ids), [2, 3, 4])
-        self.assertEqual(list(CourseStructureEntry.objects.all().values_list("index", flat=True)),
+        self.assertEqual([entry.index for entry in CourseStructureEntry.objects.all()],
                          ['1', '2', '2/1'])
 
     def test_clean_structure_topics_no_deletion(self):
@@ -207,7 +209,8 @@ class CleanTestCase(BaseCourseViewTestCase):
         # There should be no topics deleted
         ids = self.course1.topics.all().values_list("pk", flat=True)
         self.assertEqual(list(ids), [2, 3, 4])
-        self.assertIsNotNone(CourseStructureEntry.objects.get(index='2/1', topic=self.topic3))
+        self.assertIsNotNone(CourseStructureEntry.objects.get(position=2, sub_position=1,
+                                                              topic=self.topic3))
 
     def test_clean_structure_topics_deletion_one(self):
         """Clean structure topics test case - Deletion of one topic
@@ -319,6 +322,18 @@ class JsonTestCase(BaseCourseViewTestCase):
                           {'value': 'Topic2 (Category)', 'id': 3,
                            'children': [{'value': 'Topic3 (Category)', 'id': 4}]}])
 
+    def test_topics_structure_to_json_current(self):
+        """Topics structure to json test case - Current
+
+        Tests that the json object is loaded with a single query and always reflects the
+        current structure, also if a topic is used twice.
+        """
+        with self.assertNumQueries(1):
+            json_obj = JsonHandler.topics_structure_to_json(self.course1)
+        CourseStructureEntry.objects.create(course=self.course1, position=3, topic=self.topic1)
+        self.assertEqual(JsonHandler.topics_structure_to_json(self.course1),
+                         json_obj + [{'value': 'Topic1 (Category)', 'id': self.topic1.id}])
+
     def test_json_to_topics_structure_empty(self):
         """Json to topics structure - Empty json data
 
@@ -338,14 +353,15 @@ class JsonTestCase(BaseCourseViewTestCase):
                      {'value': 'Topic1 (Category)', 'id': 2,
                      'children': [{'value': 'Topic3 (Category)', 'id': 4}]}]
         JsonHandler.json_to_topics_structure(self.course1, json_data)
-        self.assertEqual(list(CourseStructureEntry.objects.all()
-                              .values_list("index", flat=True)),
+        self.assertEqual([entry.index for entry in CourseStructureEntry.objects.all()],
                          ['1', '2', '2/1'])
         self.assertEqual(list(CourseStructureEntry.objects.all()
                               .values_list("topic_id", flat=True)),
                          [2, 3, 4])
-        self.assertIsNotNone(CourseStructureEntry.objects.get(index='2/1', topic=self.topic3))
-        self.assertIsNotNone(CourseStructureEntry.objects.get(index='1', topic=self.topic2))
+        self.assertIsNotNone(CourseStructureEntry.objects.get(position=2, sub_position=1,
+                                                              topic=self.topic3))
+        self.assertIsNotNone(CourseStructureEntry.objects.get(position=1, sub_position=0,
+                                                              topic=self.topic2))
 
     def test_update_json_to_topics_structure_update_main_create_sub(self):
         """Json to topics structure - Update main topic and creating sub topic
@@ -369,14 +385,15 @@ class JsonTestCase(BaseCourseViewTestCase):
                       'children': [{'value': 'Topic3 (Category)', 'id': 4}]},
                      {'value': 'Topic1 (Category)', 'id': 2}]
         JsonHandler.json_to_topics_structure(self.course1, json_data)
-        self.assertEqual(list(CourseStructureEntry.objects.all()
-                              .values_list("index", flat=True)),
+        self.assertEqual([entry.index for entry in CourseStructureEntry.objects.all()],
                          ['1', '2', '1/1'])
         self.assertEqual(list(CourseStructureEntry.objects.all()
                               .values_list("topic_id", flat=True)),
                          [2, 3, 4])
-        self.assertIsNotNone(CourseStructureEntry.objects.get(index='1/1', topic=self.topic3))
-        self.assertIsNotNone(CourseStructureEntry.objects.get(index='1', topic=self.topic2))
+        self.assertIsNotNone(CourseStructureEntry.objects.get(position=1, sub_position=1,
+                                                              topic=self.topic3))
+        self.assertIsNotNone(CourseStructureEntry.objects.get(position=1, sub_position=0,
+                                                              topic=self.topic2))
 
     def test_json_to_topics_structure_new_main(self):
         """Json to topics structure - New main topics
@@ -390,13 +407,13 @@ class JsonTestCase(BaseCourseViewTestCase):
                       'children': [{'value': 'Topic3 (Category)', 'id': 4}]},
                      {'value': 'Topic4 (Category)', 'id': 5}]  # entry for a new topic
         JsonHandler.json_to_topics_structure(self.course1, json_data)
-        self.assertEqual(list(CourseStructureEntry.objects.all()
-                              .values_list("index", flat=True)),
+        self.assertEqual([entry.index for entry in CourseStructureEntry.objects.all()],
                          ['1', '2', '2/1', '3'])
         self.assertEqual(list(CourseStructureEntry.objects.all()
                               .values_list("topic_id", flat=True)),
                          [2, 3, 4, 5])
-        self.assertIsNotNone(CourseStructureEntry.objects.get(index='3', topic=topic4))
+        self.assertIsNotNone(CourseStructureEntry.objects.get(position=3, sub_position=0,
+                                                              topic=topic4))
 
     def test_new_children_json_to_topics_structure(self):
         """Json to topics structure - New sub topics
@@ -415,11 +432,35 @@ class JsonTestCase(BaseCourseViewTestCase):
                      ]
         JsonHandler.json_to_topics_structure(self.course1, json_data)
         # the new structure should subject to the new json data
-        self.assertEqual(list(CourseStructureEntry.objects.all()
-                              .values_list("index", flat=True)),
+        self.assertEqual([entry.index for entry in CourseStructureEntry.objects.all()],
                          ['1', '2', '2/1', '1/1', '2/2'])
         self.assertEqual(list(CourseStructureEntry.objects.all()
                               .values_list("topic_id", flat=True)),
                          [2, 3, 4, 5, 6])
-        self.assertIsNotNone(CourseStructureEntry.objects.get(index='2/2', topic=topic4))
-        self.assertIsNotNone(CourseStructureEntry.objects.get(index='1/1', topic=topic5))
+        self.assertIsNotNone(CourseStructureEntry.objects.get(position=2, sub_position=2,
+                                                              topic=topic4))
+        self.assertIsNotNone(CourseStructureEntry.objects.get(position=1, sub_position=1,
+                                                              topic=topic5))
+
+    def test_json_to_topics_structure_queries(self):
+        """Json to topics structure - Queries
+
+        Tests that the number of queries of saving a structure does not depend on the number
+        of topics and that removed entries are deleted.
+        """
+        topics = [Topic.objects.create(title=f'Topic{idx}', category=self.cat)
+                  for idx in range(4, 154)]
+        json_data = [{'id': topic.id, 'children': [{'id': self.topic3.id}]}
+                     for topic in topics[:75]]
+        with CaptureQueriesContext(connection) as queries:
+            JsonHandler.json_to_topics_structure(self.course1, json_data)
+        self.assertLessEqual(len(queries), 10)
+        self.assertEqual(CourseStructureEntry.objects.count(), 150)
+
+        json_data = [{'id': topic.id} for topic in reversed(topics)]
+        with CaptureQueriesContext(connection) as queries:
+            JsonHandler.json_to_topics_structure(self.course1, json_data)
+        self.assertLessEqual(len(queries), 15)
+        self.assertEqual(list(self.course1.get_sorted_topic_list()), topics[::-1])
+        with self.assertNumQueries(1):
+            JsonHandler.validate_topics(json_data)
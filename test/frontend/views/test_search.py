@@ -0,0 +1,230 @@
+"""Purpose of this file
+
+This file contains the test cases for /frontend/views/search.py.
+"""
+
+from test.test_cases import BaseCourseViewTestCase
+
+from django.contrib.auth.models import User  # pylint: disable=imported-auth-user
+from django.test import override_settings
+from django.urls import reverse
+
+from base.models import Category, Content, Course, Topic
+from content.models import TextField
+from frontend.search import process_queue
+
+
+class TopicSearchTestCase(BaseCourseViewTestCase):
+    """Topic search test case
+
+    Defines the test cases for the topic search of the structure editor.
+    """
+
+    def setUp(self):
+        """Setup
+
+        Sets up the test database with topics in a second category.
+        """
+        super().setUp()
+        self.other_cat = Category.objects.create(title="Another Category")
+        self.other_topic = Topic.objects.create(title="Subtopic1", category=self.other_cat)
+
+    def search(self, **params):
+        """Search
+
+        Searches the topics with the given parameters.
+
+        :param params: The parameters of the search
+        :type params: dict[str, Any]
+
+        :return: the json response of the search
+        :rtype: dict[str, Any]
+        """
+        response = self.client.get(reverse('frontend:topic-search'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_prefix_first(self):
+        """Test prefix first
+
+        Tests that the topics starting with the query are found before the topics only
+        containing it, ignoring the case.
+        """
+        data = self.search(q='topic1')
+        self.assertEqual([entry['id'] for entry in data['results']],
+                         [self.topic1.pk, self.other_topic.pk])
+        self.assertEqual(data['results'][0]['title'], str(self.topic1))
+        self.assertFalse(data['more'])
+
+    def test_category(self):
+        """Test category
+
+        Tests that only the topics of the given category are found.
+        """
+        data = self.search(q='topic1', category=self.cat.pk)
+        self.assertEqual([entry['id'] for entry in data['results']], [self.topic1.pk])
+
+    @override_settings(TOPIC_SEARCH_PAGE_SIZE=2)
+    def test_pages(self):
+        """Test pages
+
+        Tests that the topics are returned page by page in the order of their category and
+        title, if no query is given.
+        """
+        ids = []
+        page = 0
+        more = True
+        while more:
+            page += 1
+            data = self.search(page=page)
+            self.assertLessEqual(len(data['results']), 2)
+            ids.extend(entry['id'] for entry in data['results'])
+            more = data['more']
+        self.assertEqual(ids, list(Topic.objects.order_by('category__title', 'title', 'pk')
+                                   .values_list('pk', flat=True)))
+        self.assertEqual(page, 3)
+
+    def test_non_ascii(self):
+        """Test non ASCII
+
+        Tests that the case of a query with non ASCII characters is ignored like the case of
+        the titles.
+        """
+        topic = Topic.objects.create(title="Prüfung", category=self.other_cat)
+        self.assertEqual([entry['id'] for entry in self.search(q='prüf')['results']],
+                         [topic.pk])
+        self.assertEqual([entry['id'] for entry in self.search(q='%')['results']], [])
+
+    def test_invalid_page(self):
+        """Test invalid page
+
+        Tests that an invalid page is rejected.
+        """
+        response = self.client.get(reverse('frontend:topic-search'), {'page': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+
+class SearchViewTestCase(BaseCourseViewTestCase):
+    """Search view test case
+
+    Defines the test cases for the full-text search of courses, topics and contents.
+    """
+
+    def setUp(self):
+        """Setup
+
+        Sets up the test database with a text content and a hidden content of another user.
+        """
+        super().setUp()
+        self.other = User.objects.create(username='other')
+        self.content = Content.objects.create(author=self.user.profile, topic=self.topic1,
+                                              type=TextField.TYPE, language='de',
+                                              description='Graph traversal', public=True)
+        TextField.objects.create(content=self.content, source='src',
+                                 textfield='Dijkstra computes shortest paths')
+        self.hidden = Content.objects.create(author=self.other.profile, topic=self.topic2,
+                                             type=TextField.TYPE, language='de',
+                                             description='Dijkstra notes', hidden=True)
+
+    def search(self, query, **params):
+        """Search
+
+        Searches with the given query and returns the found documents.
+
+        :param query: The query of the search
+        :type query: str
+        :param params: The further parameters of the search
+        :type params: dict[str, Any]
+
+        :return: the found documents
+        :rtype: list[SearchDocument]
+        """
+        # The queue is processed after the commit, which never happens in a test case
+        process_queue()
+        response = self.client.get(reverse('frontend:search'), {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.context['results']
+
+    def test_content_text(self):
+        """Test content text
+
+        Tests that the text of a content is found by the prefix of a word and linked to the
+        courses of its topic.
+        """
+        results = self.search('dijks')
+        self.assertEqual([result.content_id for result in results], [self.content.pk])
+        self.assertEqual(results[0].courses, [self.course1])
+
+    def test_text_update(self):
+        """Test text update
+
+        Tests that the document of a content is updated when its text changes.
+        """
+        self.content.textfield.textfield = 'Prim computes spanning trees'
+        self.content.textfield.save()
+        self.assertEqual(self.search('dijkstra'), [])
+        self.assertEqual(len(self.search('spanning')), 1)
+
+    def test_ranking(self):
+        """Test ranking
+
+        Tests that a match in the title is ranked before a match in the body.
+        """
+        course = Course.objects.create(title='Dijkstra Seminar', description='Seminar',
+                                       category=self.cat)
+        results = self.search('dijkstra')
+        self.assertEqual([result.course_id or result.content_id for result in results],
+                         [course.pk, self.content.pk])
+
+    def test_hidden(self):
+        """Test hidden
+
+        Tests that hidden contents are only found by their authors and the moderators of
+        their courses.
+        """
+        self.assertEqual(len(self.search('notes')), 0)
+        self.client.force_login(self.other)
+        self.assertEqual(len(self.search('notes')), 1)
+        self.client.force_login(self.user)
+        self.course1.moderators.add(self.user.profile)
+        self.assertEqual(len(self.search('notes')), 1)
+
+    def test_anonymous(self):
+        """Test anonymous
+
+        Tests that anonymous users only find public courses and the public contents of them.
+        """
+        self.client.logout()
+        self.assertEqual(self.search('graph'), [])
+        self.course1.public = True
+        self.course1.save()
+        results = self.search('graph')
+        self.assertEqual([result.content_id for result in results], [self.content.pk])
+
+    def test_delete(self):
+        """Test delete
+
+        Tests that the document of a deleted content is removed from the index.
+        """
+        self.content.delete()
+        self.assertEqual(self.search('dijkstra'), [])
+
+    @override_settings(SEARCH_PAGE_SIZE=2)
+    def test_pages(self):
+        """Test pages
+
+        Tests that the results are paginated.
+        """
+        first = self.search('topic')
+        second = self.search('topic', page=2)
+        self.assertEqual(len(first), 2)
+        self.assertTrue(second)
+        self.assertFalse({result.pk for result in first} & {result.pk for result in second})
+
+    def test_syntax(self):
+        """Test syntax
+
+        Tests that the syntax of the full-text search in a query is ignored.
+        """
+        self.assertEqual(len(self.search('"dijkstra* (')), 1)
+        self.assertEqual(self.search('*'), [])
@@ -0,0 +1,57 @@
+"""Purpose of this file
+
+This file contains the test runner of this project, which runs the tests with their own
+directories for the files cached on the disk.
+"""
+
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """Test runner
+
+    Runs the tests like the default runner, but stores the compiled LaTeX documents, the
+    format files of the preambles and the cache entries in a temporary directory of the test
+    run. Thereby the tests never write into the cache of the checkout and no test run is
+    served the documents, failed formats or cached pages of a previous run.
+
+    :attr TestRunner.cache_dir: The temporary cache directory of the test run
+    :type TestRunner.cache_dir: str or None
+    """
+    cache_dir = None
+    _cache_settings = None
+
+    def setup_test_environment(self, **kwargs):
+        """Setup test environment
+
+        Sets up the test environment with a temporary cache directory.
+
+        :param kwargs: The keyword arguments of the default runner
+        :type kwargs: Any
+        """
+        super().setup_test_environment(**kwargs)
+        self.cache_dir = tempfile.mkdtemp()
+        self._cache_settings = override_settings(
+            LATEX_COMPILE_CACHE_DIR=os.path.join(self.cache_dir, 'latex'),
+            LATEX_FORMAT_DIR=os.path.join(self.cache_dir, 'latex-formats'),
+            CACHES={'default': {**settings.CACHES['default'],
+                                'LOCATION': os.path.join(self.cache_dir, 'django')}})
+        self._cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        """Teardown test environment
+
+        Deletes the temporary cache directory and tears down the test environment.
+
+        :param kwargs: The keyword arguments of the default runner
+        :type kwargs: Any
+        """
+        self._cache_settings.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
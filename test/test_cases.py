@@ -8,6 +8,7 @@ from test import utils
 import reversion
 from reversion import set_comment
 
+from django.core.cache import cache
 from django.test import TestCase, override_settings
 from django.contrib.auth.models import User  # pylint: disable=imported-auth-user
 
@@ -24,8 +25,10 @@ class MediaTestCase(TestCase):
     def setUp(self):
         """Setup
 
-        Sets up the test database.
+        Sets up the test database and clears the cache, which is not rolled back with the
+        database.
         """
+        cache.clear()
         utils.setup_database()
         self.client.force_login(User.objects.first())
 
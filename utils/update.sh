@@ -22,5 +22,10 @@ pip install --upgrade -r requirements.txt
 ./manage.py migrate
 ./manage.py collectstatic --noinput
 ./manage.py compilemessages --ignore=cache --ignore=venv
+./manage.py build_latex_format || echo "LaTeX format not built, compiling with the full preamble"
+./manage.py fetch_video_metadata || echo "Metadata of the YouTube videos not fetched"
+./manage.py render_markdown
+./manage.py reconcile_ratings
+./manage.py generate_previews
 
 touch collab_coursebook/wsgi.py